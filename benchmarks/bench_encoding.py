@@ -0,0 +1,82 @@
+"""
+bench_encoding.py
+
+Microbenchmark reporting the bytes on the wire and the encode time per publish
+cycle for each PayloadEncoder mode, from the original full-precision stdlib
+JSON payload to aliased, rounded, orjson-encoded and compressed payloads.
+
+Each cycle encodes one batch of synthetic samples shaped like the default
+collectors' telemetry, as published by TBClientWrapper.send_telemetry_batch.
+
+Usage:
+    python -m benchmarks.bench_encoding [--samples N] [--iterations N]
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from monitoring_service.encoding import PayloadEncoder, orjson
+
+ALIASES = {
+    "cpu_usage": "cpu",
+    "cpu_temp": "ct",
+    "gpu_temp": "gt",
+    "ram_usage": "ram",
+    "disk_usage": "disk",
+}
+PRECISION = {key: 1 for key in ALIASES}
+
+
+def _make_batch(samples):
+    rng = random.Random(0)
+    ts = 1_700_000_000_000
+    return [
+        {
+            "ts": ts + i * 1000,
+            "values": {
+                "cpu_usage": rng.uniform(0, 100),
+                "cpu_temp": rng.uniform(40, 80),
+                "gpu_temp": rng.uniform(40, 80),
+                "ram_usage": rng.uniform(20, 60),
+                "disk_usage": rng.uniform(30, 31),
+            },
+        }
+        for i in range(samples)
+    ]
+
+
+def _modes():
+    modes = [("json, full keys (original)", lambda batch: json.dumps(batch).encode("utf-8"))]
+    backends = ["json"] + (["orjson"] if orjson is not None else [])
+    for backend in backends:
+        plain = PayloadEncoder(backend=backend)
+        compact = PayloadEncoder(aliases=ALIASES, precision=PRECISION, backend=backend)
+        compressed = PayloadEncoder(aliases=ALIASES, precision=PRECISION, backend=backend, compress_threshold=1)
+        modes.append((f"{backend}, compact separators", plain.dumps))
+        modes.append((f"{backend}, aliases + rounding", lambda batch, e=compact: e.dumps(e.transform_samples(batch))))
+        modes.append((f"{backend}, aliases + rounding + zlib",
+                      lambda batch, e=compressed: e.encode(e.transform_samples(batch))))
+    return modes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=60, help="samples per publish cycle")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    batch = _make_batch(args.samples)
+    print(f"{args.samples} samples per cycle")
+    baseline = None
+    for name, encode in _modes():
+        size = len(encode(batch))
+        per_cycle_us = timeit.timeit(lambda: encode(batch), number=args.iterations) / args.iterations * 1e6
+        if baseline is None:
+            baseline = size
+        print(f"{name:40s} {size:8d} bytes ({size / baseline:6.1%})  {per_cycle_us:10.1f} us/cycle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+bench_gpu_temp.py
+
+Microbenchmark comparing the per-call cost of the old GPU temperature path
+(spawning `vcgencmd measure_temp`) with GpuTempReader's persistent sysfs
+descriptor.
+
+On machines without vcgencmd an `echo` of the same output stands in for it,
+which still measures the fork/exec cost that dominated the old path. Without a
+sysfs sensor a synthetic one is created in a temporary directory.
+
+Usage:
+    python -m benchmarks.bench_gpu_temp [--iterations N]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import timeit
+
+from monitoring_service.gpu_temp import GpuTempReader
+
+
+def _old_path(command):
+    result = subprocess.run(command, capture_output=True, text=True)
+    temp_str = result.stdout.strip()
+    return float(temp_str.split('=')[1].replace("'C", ""))
+
+
+def _make_sensor(sys_root):
+    zone = os.path.join(sys_root, "class", "thermal", "thermal_zone0")
+    os.makedirs(zone)
+    with open(os.path.join(zone, "type"), "w") as f:
+        f.write("cpu-thermal\n")
+    with open(os.path.join(zone, "temp"), "w") as f:
+        f.write("48300\n")
+
+
+def _per_call_us(func, iterations):
+    return timeit.timeit(func, number=iterations) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    vcgencmd = shutil.which("vcgencmd")
+    command = [vcgencmd, "measure_temp"] if vcgencmd else ["echo", "temp=48.3'C"]
+
+    logger = logging.getLogger("bench_gpu_temp")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reader = GpuTempReader(logger, vcgencmd_path=os.path.join(tmp, "missing"))
+        if reader.source is None:
+            _make_sensor(tmp)
+            reader = GpuTempReader(logger, sys_root=tmp, vcgencmd_path=os.path.join(tmp, "missing"))
+
+        old_us = _per_call_us(lambda: _old_path(command), args.iterations)
+        new_us = _per_call_us(reader.read, args.iterations * 50)
+        reader.close()
+
+    print(f"subprocess ({' '.join(command)}): {old_us:10.1f} us/call")
+    print(f"sysfs pread ({reader.source}): {new_us:10.1f} us/call")
+    print(f"speed-up: {old_us / new_us:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
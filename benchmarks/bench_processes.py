@@ -0,0 +1,56 @@
+"""
+bench_processes.py
+
+Microbenchmark of the top-N process collector's cost per collection, against a
+synthetic /proc with a configurable number of processes, and of the share of
+one CPU that cost amounts to at a given collection interval.
+
+Usage:
+    python -m benchmarks.bench_processes [--processes 300] [--interval 10] [--iterations N]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from monitoring_service.collectors.processes import ProcessesCollector
+
+
+def _make_proc(root, processes):
+    for pid in range(1, processes + 1):
+        os.makedirs(os.path.join(root, str(pid)))
+        fields = ["S"] + ["0"] * 10 + [str(pid * 7), str(pid)] + ["0"] * 6 + ["100", "0", str(pid * 50)]
+        with open(os.path.join(root, str(pid), "stat"), "w") as f:
+            f.write(f"{pid} (worker-{pid}) {' '.join(fields + ['0'] * 30)}\n")
+        with open(os.path.join(root, str(pid), "cmdline"), "w") as f:
+            f.write(f"/usr/bin/worker\0--id\0{pid}\0")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=300)
+    parser.add_argument("--interval", type=float, default=10.0, help="collection interval in seconds")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench_processes")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    with tempfile.TemporaryDirectory() as root:
+        _make_proc(root, args.processes)
+        collector = ProcessesCollector("processes", logger, proc_path=root, budget=1.0)
+        collector.collect()
+        start = time.thread_time()
+        for _ in range(args.iterations):
+            collector.collect()
+        per_call = (time.thread_time() - start) / args.iterations
+
+    print(f"{args.processes} processes: {per_call * 1e3:8.2f} ms CPU per collection")
+    print(f"overhead at {args.interval:g} s interval: {per_call / args.interval * 100:.3f}% of one CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+fixtures.py
+
+Synthetic environment shared by the benchmarks: a fake /proc and /sys tree
+that the collectors can be pointed at, an in-process stand-in for the MQTT
+client, and a static attributes source. Together they let the hot paths be
+measured on any Linux machine, without a Raspberry Pi or a broker.
+
+Classes:
+    FakeMqttClient
+    StaticAttributes
+
+Functions:
+    make_tree(root, cores)
+    collector_options(root)
+
+Usage:
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root)
+        collector = TelemetryCollector(collectors=collector_options(root))
+"""
+
+import os
+
+import orjson
+import psutil
+
+MEMINFO = """MemTotal:        3884376 kB
+MemFree:          842684 kB
+MemAvailable:    2611864 kB
+Buffers:          143456 kB
+Cached:          1603736 kB
+SwapCached:            0 kB
+Active:          1521980 kB
+Inactive:        1191036 kB
+Shmem:             45160 kB
+Slab:             156412 kB
+SReclaimable:     105944 kB
+SwapTotal:        102396 kB
+SwapFree:         102396 kB
+"""
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def make_tree(root, cores=4):
+    """
+    Creates a synthetic /proc and /sys tree under `root` and points psutil at it.
+
+    :param root: directory to create the tree in
+    :param cores: number of per-core lines in /proc/stat
+    """
+    stat = ["cpu  %d 0 %d %d 100 0 20 0 0 0" % (4000 * cores, 1000 * cores, 50000 * cores)]
+    stat += ["cpu%d 4000 0 1000 50000 25 0 5 0 0 0" % core for core in range(cores)]
+    _write(os.path.join(root, "proc", "stat"), "\n".join(stat) + "\nintr 0\nctxt 0\n")
+    _write(os.path.join(root, "proc", "meminfo"), MEMINFO)
+
+    zone = os.path.join(root, "sys", "class", "thermal", "thermal_zone0")
+    _write(os.path.join(zone, "type"), "cpu-thermal\n")
+    _write(os.path.join(zone, "temp"), "48312\n")
+
+    os.makedirs(os.path.join(root, "mnt"), exist_ok=True)
+    psutil.PROCFS_PATH = os.path.join(root, "proc")
+
+
+def collector_options(root):
+    """
+    :param root: directory passed to `make_tree()`
+    :return: TelemetryCollector `collectors` mapping reading from the synthetic tree
+    """
+    return {
+        "cpu_usage": {"stat_path": os.path.join(root, "proc", "stat")},
+        "cpu_temp": {"path": os.path.join(root, "sys", "class", "thermal", "thermal_zone0", "temp")},
+        "gpu_temp": {"sys_root": os.path.join(root, "sys"), "vcgencmd_path": os.path.join(root, "missing")},
+        "ram_usage": {},
+        "disk_usage": {"mount_path": os.path.join(root, "mnt")},
+    }
+
+
+class FakeMqttClient:
+    """
+    In-process stand-in for TBDeviceMqttClient.
+
+    Serialises every payload with orjson, as the real client does, so publish
+    benchmarks include the encoding cost, and records the bytes that would
+    have gone over the wire.
+
+    Args:
+        host (str): Ignored.
+        username (str): Ignored.
+    """
+
+    def __init__(self, host=None, username=None, **kwargs):
+        self.connected = False
+        self.messages = 0
+        self.bytes_sent = 0
+
+    def connect(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def _publish(self, payload):
+        self.messages += 1
+        self.bytes_sent += len(orjson.dumps(payload))
+
+    def send_telemetry(self, telemetry):
+        self._publish(telemetry)
+
+    def send_attributes(self, attributes):
+        self._publish(attributes)
+
+    def disconnect(self):
+        self.connected = False
+
+
+class StaticAttributes:
+    """
+    Attributes source returning fixed values, so benchmarks never touch the network.
+    """
+
+    def as_dict(self):
+        return {"device_name": "bench", "ip_address": "192.0.2.10", "mac_address": "02:00:00:00:00:01"}
@@ -0,0 +1,203 @@
+"""
+suite.py
+
+Benchmark suite for the collection and publish hot paths. Measures, against
+the synthetic /proc and /sys tree and the fake MQTT client in
+`benchmarks.fixtures`:
+
+    - the cost of each collector in TelemetryCollector,
+    - a full TelemetryCollector.get_telemetry() pass,
+    - TBClientWrapper publish overhead for single samples and batches,
+    - end-to-end MonitoringAgent cycle latency,
+    - TelemetryHistory appends, and downsampled queries over a week of 1 s samples,
+    - allocations per cycle (tracemalloc) and peak RSS.
+
+Results are written as JSON. Given a baseline file from an earlier run, the
+suite compares each result against it and exits with status 1 if any result
+regressed by more than the tolerance, so CI can gate on it.
+
+Usage:
+    python -m benchmarks.suite [--iterations N] [--output results.json]
+    python -m benchmarks.suite --baseline baseline.json [--tolerance 0.25]
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import FakeMqttClient, StaticAttributes, collector_options, make_tree
+from monitoring_service.TBClientWrapper import TBClientWrapper
+from monitoring_service.agent import ATTRIBUTES_JOB, PUBLISH_JOB, MonitoringAgent
+from monitoring_service.history import DEFAULT_CAPACITY, TelemetryHistory
+from monitoring_service.sample_buffer import SampleBuffer
+from monitoring_service.telemetry import TelemetryCollector
+
+# Result fields compared against a baseline; all are lower-is-better
+COMPARED_FIELDS = ("p50_us", "alloc_bytes_per_cycle", "alloc_blocks_per_cycle")
+
+
+def _quiet_logger():
+    logger = logging.getLogger("benchmarks")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def _time_calls(func, iterations, warmup=10):
+    for _ in range(warmup):
+        func()
+    timings = []
+    clock = time.perf_counter
+    for _ in range(iterations):
+        start = clock()
+        func()
+        timings.append(clock() - start)
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "mean_us": sum(timings) / iterations * 1e6,
+        "min_us": timings[0] * 1e6,
+        "p50_us": timings[iterations // 2] * 1e6,
+        "p95_us": timings[min(iterations - 1, int(iterations * 0.95))] * 1e6,
+    }
+
+
+def _allocations(func, cycles):
+    func()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    for _ in range(cycles):
+        func()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    return {
+        "cycles": cycles,
+        "alloc_bytes_per_cycle": sum(max(0, stat.size_diff) for stat in stats) / cycles,
+        "alloc_blocks_per_cycle": sum(max(0, stat.count_diff) for stat in stats) / cycles,
+        "peak_traced_bytes": peak,
+    }
+
+
+def _sample_batch(samples):
+    return [{"ts": 1_700_000_000_000 + i * 1000,
+             "values": {"cpu_usage": 12.5, "cpu_temp": 48.3, "gpu_temp": 47.9, "ram_usage": 32.8,
+                        "disk_usage": 41.2}}
+            for i in range(samples)]
+
+
+def run(iterations):
+    """
+    Runs every benchmark.
+
+    :param iterations: timed calls per benchmark
+    :return: dictionary of benchmark name to result fields
+    """
+    logger = _quiet_logger()
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root)
+        telemetry_collector = TelemetryCollector(collectors=collector_options(root), logger=logger)
+
+        for metric in telemetry_collector.metrics:
+            results[f"collector.{metric}"] = _time_calls(lambda: telemetry_collector.collect_metric(metric),
+                                                         iterations)
+        results["telemetry.get_telemetry"] = _time_calls(telemetry_collector.get_telemetry, iterations)
+
+        client = TBClientWrapper("localhost", "token", logger, client_class=FakeMqttClient)
+        client.connect(background=False)
+        sample = _sample_batch(1)[0]["values"]
+        batch = _sample_batch(60)
+        results["publish.send_telemetry"] = _time_calls(lambda: client.send_telemetry(sample), iterations)
+        results["publish.send_telemetry_batch_60"] = _time_calls(lambda: client.send_telemetry_batch(batch),
+                                                                 max(1, iterations // 10))
+
+        agent = MonitoringAgent("localhost", "token", logger, telemetry_collector, StaticAttributes(), client,
+                                poll_period=1, sample_buffer=SampleBuffer())
+        due = [*telemetry_collector.metrics, PUBLISH_JOB, ATTRIBUTES_JOB]
+        results["agent.cycle"] = _time_calls(lambda: agent._run_tick(due), iterations)
+        results["agent.cycle_memory"] = _allocations(lambda: agent._run_tick(due), max(1, iterations // 10))
+
+        history = TelemetryHistory(os.path.join(root, "history.bin"), telemetry_collector.keys())
+        values = _sample_batch(1)[0]["values"]
+        timestamps = itertools.count(1_700_000_000_000, 1000)
+        for _ in range(DEFAULT_CAPACITY):
+            history.append(next(timestamps), values)
+        results["history.append"] = _time_calls(lambda: history.append(next(timestamps), values), iterations)
+        results["history.query_week_step_1m"] = _time_calls(lambda: history.query(step=60_000),
+                                                            max(1, iterations // 100))
+        results["history.query_week_step_1h"] = _time_calls(lambda: history.query(step=3_600_000),
+                                                            max(1, iterations // 100))
+        history.close()
+
+        telemetry_collector.close()
+
+    results["process"] = {"max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with a baseline run.
+
+    :param results: results of this run
+    :param baseline: results of the baseline run
+    :param tolerance: allowed relative increase, e.g. 0.25 for 25%
+    :return: list of (benchmark, field, baseline value, current value) that regressed
+    """
+    regressions = []
+    for name, fields in results.items():
+        for field in COMPARED_FIELDS:
+            base = baseline.get(name, {}).get(field)
+            current = fields.get(field)
+            if base is None or current is None or base <= 0:
+                continue
+            if current > base * (1 + tolerance):
+                regressions.append((name, field, base, current))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--output", help="file to write the JSON results to, defaults to stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": run(args.iterations),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(report["results"], baseline, args.tolerance)
+        for name, field, base, current in regressions:
+            print(f"REGRESSION {name} {field}: {base:.1f} -> {current:.1f} ({current / base - 1:+.0%})",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
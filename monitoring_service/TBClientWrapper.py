@@ -3,17 +3,46 @@ TBClientWrapper.py
 
 Defines the TBClientWrapper class, which manages the connection to the ThingsBoard.
 This class connects to ThingsBoard and sends a dictionary containing telemetry data.
+When an outbox is configured, samples that cannot be delivered are stored on disk
+and replayed in batches once the broker is reachable again. When a payload encoder
+is configured, telemetry keys are aliased and values rounded before they are sent
+or stored.
+
+The wrapper owns the connection state. Connecting never blocks the caller: attempts
+run in the background and failed or lost connections are retried with exponential
+backoff and full jitter, so a fleet does not reconnect in lockstep after an outage.
+
+Telemetry publishes are tracked until the broker acknowledges them. At most
+`max_inflight` may be unacknowledged at once; beyond that `send_telemetry_batch`
+raises PublishWindowFull so the caller keeps the samples, and publishes that are
+rejected, time out or are lost with the connection go to the outbox.
 
 Classes:
     TBClientWrapper
 
 Usage:
-    Instantiate TBClientWrapper and call .connect() to begin the monitoring loop.
+    Instantiate TBClientWrapper and call .connect() to start connecting in the background.
     call .send_telemetry to send telemetry data.
+    call .send_telemetry_batch to send several timestamped samples in one message.
     call .send_attributes to send attributes data.
+    call .set_rpc_handler and .subscribe_to_shared_attributes to receive commands.
+    call .drain_outbox every `replay_interval` seconds to replay stored samples.
 """
 
-from tb_device_mqtt import TBDeviceMqttClient
+import random
+import threading
+import time
+
+from tb_device_mqtt import TBDeviceMqttClient, TBPublishInfo
+
+from monitoring_service.inflight import InflightWindow, PublishWindowFull
+
+STATE_DISCONNECTED = "disconnected"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+
+# Seconds between checks for the broker's CONNACK while connecting
+_CONNACK_POLL = 0.1
 
 
 class TBClientWrapper:
@@ -22,60 +51,478 @@ class TBClientWrapper:
 
     Uses tb_device_mqtt to connect, send telemetry and disconnect from ThingsBoard.
 
+    Telemetry is never sent while the client is disconnected, since the underlying
+    client blocks until a connection exists. With an outbox the sample is stored
+    with its collection timestamp instead, otherwise it is dropped.
+
+    `connect()` starts a background thread that drives `poll_connection()`. Retry n
+    waits a random time between 0 and min(backoff_max, backoff_base * 2**n) seconds
+    ("full jitter"). A connection lost after it was established is torn down and
+    re-established the same way, the first retry also jittered. State changes are
+    passed to `state_callbacks` as (old_state, new_state).
+
+    Args:
+        tb_server (str): ThingsBoard host to connect to.
+        tb_token (str): Device access token.
+        logger (Logger): Logger to use.
+        client_class (type): MQTT client class, replaceable for testing.
+        outbox (TelemetryOutbox): Optional store for samples that could not be sent.
+        replay_batch_size (int): Maximum number of stored samples sent per replay batch.
+        replay_interval (float): Minimum seconds between replay batches, so replay
+            does not starve live samples.
+        encoder (PayloadEncoder): Optional encoder applied to telemetry values.
+        backoff_base (float): Upper bound in seconds of the first retry delay.
+        backoff_max (float): Largest upper bound in seconds of a retry delay.
+        connect_timeout (float): Seconds to wait for the broker to accept a connection.
+        check_interval (float): Seconds between connection checks while connected.
+        max_inflight (int): Telemetry publishes allowed unacknowledged at once, 0 for no limit.
+        ack_timeout (float): Seconds to wait for the broker to acknowledge a publish.
+        state_callbacks (list): Callables called with (old_state, new_state).
+        clock (callable): Monotonic clock returning seconds.
+
     Raises:
-        Exception: If cannot connect to ThingsBoard.
         Exception: If cannot disconnect from ThingsBoard.
     """
 
-    def __init__(self, tb_server, tb_token, logger, client_class=TBDeviceMqttClient):
+    def __init__(self,
+                 tb_server,
+                 tb_token,
+                 logger,
+                 client_class=TBDeviceMqttClient,
+                 outbox=None,
+                 replay_batch_size=500,
+                 replay_interval=1.0,
+                 encoder=None,
+                 backoff_base=1.0,
+                 backoff_max=120.0,
+                 connect_timeout=10.0,
+                 check_interval=1.0,
+                 max_inflight=20,
+                 ack_timeout=30.0,
+                 state_callbacks=None,
+                 clock=time.monotonic):
         self.client = client_class(tb_server, username=tb_token)
         self.logger = logger
+        self.outbox = outbox
+        self.replay_batch_size = replay_batch_size
+        self.replay_interval = replay_interval
+        self.encoder = encoder
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+        self.check_interval = check_interval
+        self.state_callbacks = list(state_callbacks or [])
+        self.clock = clock
+        self._last_replay = None
+        self._replay_lock = threading.Lock()
+        self.window = InflightWindow(max_inflight=max_inflight, ack_timeout=ack_timeout, clock=clock)
+        self._hook_acknowledgements()
+
+        self.state = STATE_DISCONNECTED
+        self.connect_attempts = 0
+        self.outages = 0
+        self.last_outage_seconds = 0.0
+        self._outage_seconds = 0.0
+        self._outage_started = None
+        self._failures = 0
+        self._next_attempt = 0.0
+        self._connect_deadline = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def connect(self, background=True):
+        """
+        Starts connecting to ThingsBoard without blocking the caller.
 
-    def connect(self):
+        :param background: run the reconnect engine on a daemon thread. If False, one
+            attempt is made now and the caller must keep calling `poll_connection()`.
+        :return: True if the client is already connected
         """
-        Initialises the connection to ThingsBoard.
+        if self._outage_started is None and self.state != STATE_CONNECTED:
+            self._outage_started = self.clock()
+        if not background:
+            self.poll_connection()
+            return self.is_connected()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="tb-connection", daemon=True)
+            self._thread.start()
+        return self.is_connected()
+
+    def _run(self):
+        delay = 0.0
+        while not self._stop.wait(delay):
+            try:
+                delay = self.poll_connection()
+            except Exception as e:
+                self.logger.error("Connection engine error %s", e)
+                delay = self.check_interval
+
+    def poll_connection(self):
+        """
+        Advances the connection state machine by one step: notices a lost or
+        established connection, and makes a connection attempt once it is due.
+
+        :return: seconds until the next call is useful
         """
+        with self._lock:
+            now = self.clock()
+            transitions = []
+            delay = self._step(now, transitions)
+        for old, new in transitions:
+            self._notify(old, new)
+        if delay is not None:
+            return delay
+
+        # Connect outside the lock so a broker that never answers cannot stall connection_stats()
+        error = None
         try:
             self.client.connect()
         except Exception as e:
-            self.logger.error(f"Could not connect to ThingsBoard server {e}")
-            raise
+            error = e
+        with self._lock:
+            transitions = []
+            delay = self._attempted(now, error, transitions)
+        for old, new in transitions:
+            self._notify(old, new)
+        return delay
+
+    def _step(self, now, transitions):
+        if self.client.is_connected():
+            if self.state != STATE_CONNECTED:
+                self._connected(now, transitions)
+            return self.check_interval
+
+        if self.state == STATE_CONNECTED:
+            self._outage_started = now
+            self.outages += 1
+            self._teardown()
+            # The client discards its unacknowledged messages when the connection drops
+            self._store(self.window.fail_all(), "connection lost before acknowledgement")
+            self._failed(now, transitions, "Connection to ThingsBoard lost")
+        elif self.state == STATE_CONNECTING:
+            if now < self._connect_deadline:
+                return _CONNACK_POLL
+            self._teardown()
+            self._failed(now, transitions, f"ThingsBoard did not accept the connection within "
+                                           f"{self.connect_timeout}s")
+
+        if now < self._next_attempt:
+            return self._next_attempt - now
+
+        # An attempt is due; the caller makes it without holding the lock
+        self.connect_attempts += 1
+        self._connect_deadline = now + self.connect_timeout
+        self._transition(STATE_CONNECTING, transitions)
+        return None
+
+    def _attempted(self, now, error, transitions):
+        if error is not None:
+            self._failed(now, transitions, f"Could not connect to ThingsBoard server {error}")
+            return self._next_attempt - now
+        if self.client.is_connected():
+            self._connected(now, transitions)
+            return self.check_interval
+        return _CONNACK_POLL
+
+    def _connected(self, now, transitions):
+        if self._outage_started is not None:
+            self.last_outage_seconds = now - self._outage_started
+            self._outage_seconds += self.last_outage_seconds
+            self._outage_started = None
+        self.logger.info("Connected to ThingsBoard, %.1fs without a connection.", self.last_outage_seconds)
+        self._failures = 0
+        self._transition(STATE_CONNECTED, transitions)
+
+    def _failed(self, now, transitions, message):
+        delay = self.backoff_delay(self._failures)
+        self._failures += 1
+        self._next_attempt = now + delay
+        self.logger.warning("%s, retrying in %.1fs.", message, delay)
+        self._transition(STATE_DISCONNECTED, transitions)
+
+    def backoff_delay(self, failures):
+        """
+        :param failures: consecutive failed attempts so far
+        :return: random delay in seconds before the next attempt
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** failures))
+
+    def _teardown(self):
+        # Stop the client's own network loop so it does not reconnect in lockstep behind our back
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+    def _transition(self, state, transitions):
+        if state != self.state:
+            transitions.append((self.state, state))
+            self.state = state
+
+    def _notify(self, old, new):
+        for callback in self.state_callbacks:
+            try:
+                callback(old, new)
+            except Exception as e:
+                self.logger.error("Connection state callback failed %s", e)
+
+    def connection_stats(self):
+        """
+        :return: dictionary of connection metrics: connected (0/1), connect_attempts,
+            outages since first connected, and outage_seconds including any current outage
+        """
+        with self._lock:
+            outage_seconds = self._outage_seconds
+            if self._outage_started is not None:
+                outage_seconds += self.clock() - self._outage_started
+            return {
+                "connected": int(self.state == STATE_CONNECTED),
+                "connect_attempts": self.connect_attempts,
+                "outages": self.outages,
+                "outage_seconds": round(outage_seconds, 3),
+            }
+
+    def publish_stats(self):
+        """
+        :return: dictionary of delivery metrics: inflight publishes, delivered and
+            delivery_failures so far, and delivery latency percentiles in milliseconds
+        """
+        return self.window.stats()
+
+    def is_connected(self):
+        """
+        :return: True if the client currently has a broker connection.
+        """
+        return bool(self.client.is_connected())
+
+    def _hook_acknowledgements(self):
+        paho_client = getattr(self.client, "_client", None)
+        if not isinstance(self.client, TBDeviceMqttClient) or paho_client is None:
+            return
+        on_publish = paho_client.on_publish
+
+        def acknowledged(client, userdata, mid, rc=None, properties=None):
+            success = rc is None or getattr(rc, "value", rc) == 0
+            self._store(self.window.ack(mid, success), "rejected by the broker")
+            if on_publish is not None:
+                on_publish(client, userdata, mid, rc, properties)
+
+        paho_client.on_publish = acknowledged
+
+    def _publish(self, payload, samples):
+        result = self.client.send_telemetry(payload)
+        if not isinstance(result, TBPublishInfo):
+            return
+        rc = result.rc()
+        code = getattr(rc, "value", rc)
+        if code != 0:
+            raise RuntimeError(f"publish not queued, {TBPublishInfo.ERRORS_DESCRIPTION.get(code, code)}")
+        infos = result.message_info if isinstance(result.message_info, list) else [result.message_info]
+        self._store(self.window.track([info.mid for info in infos], samples), "rejected by the broker")
 
-    def send_telemetry(self, telemetry: dict):
+    def _expire(self):
+        expired = self.window.expire()
+        if expired:
+            self._store(expired, f"not acknowledged within {self.window.ack_timeout}s")
+
+    def send_telemetry(self, telemetry: dict, ts=None):
         """
         Sends a telemetry dictionary to ThingsBoard.
 
         :param telemetry: dictionary containing the telemetry data
+        :param ts: collection timestamp in milliseconds, defaults to now
+        :return: True if the telemetry was handed to the client
         """
         if not telemetry:
             self.logger.warning("Telemetry data is empty. Skipping send.")
+            return False
+
+        if ts is None:
+            ts = int(time.time() * 1000)
+        if self.encoder is not None:
+            telemetry = self.encoder.transform(telemetry)
+
+        if not self.is_connected():
+            self._store([{"ts": ts, "values": telemetry}], "not connected")
+            return False
+
+        self._expire()
+        sample = {"ts": ts, "values": telemetry}
+        try:
+            self._publish(telemetry if self.outbox is None else sample, [sample])
+            return True
+        except Exception as e:
+            self.logger.error("Failed to send telemetry to ThingsBoard %s", e)
+            self._store([{"ts": ts, "values": telemetry}], "send failed")
+            return False
+
+    def send_telemetry_batch(self, samples: list):
+        """
+        Sends several timestamped samples to ThingsBoard as a single payload.
+
+        :param samples: list of {"ts": ts, "values": values} dictionaries
+        :return: True if the batch was handed to the client
+        :raises PublishWindowFull: if `max_inflight` publishes await acknowledgement;
+            the samples are neither sent nor stored
+        """
+        if not samples:
+            self.logger.warning("Telemetry batch is empty. Skipping send.")
+            return False
+        if self.encoder is not None:
+            samples = self.encoder.transform_samples(samples)
+
+        if not self.is_connected():
+            self._store(samples, "not connected")
+            return False
+
+        self._expire()
+        if self.window.full:
+            raise PublishWindowFull(f"{len(self.window)} publishes awaiting acknowledgement")
+        try:
+            self._publish(samples, samples)
+            return True
+        except Exception as e:
+            self.logger.error("Failed to send telemetry batch to ThingsBoard %s", e)
+            self._store(samples, "send failed")
+            return False
+
+    def _store(self, samples, reason):
+        if not samples:
             return
+        if self.outbox is None:
+            self.logger.warning("%d telemetry samples dropped, %s.", len(samples), reason)
+            return
+        for sample in samples:
+            self.outbox.put(sample["ts"], sample["values"])
+        self.logger.warning("%d telemetry samples stored in outbox, %s. %d samples pending.",
+                            len(samples), reason, len(self.outbox))
+
+    def pending(self):
+        """
+        :return: number of samples waiting in the outbox
+        """
+        return 0 if self.outbox is None else len(self.outbox)
+
+    def drain_outbox(self):
+        """
+        Replays one batch of stored samples if connected, oldest first.
+
+        Batches are at most `replay_batch_size` samples and at least `replay_interval`
+        seconds apart, and wait while the in-flight window is full. Safe to call from
+        several threads; a call made while another replay is running does nothing.
+
+        :return: number of samples replayed
+        """
+        if not self._replay_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._replay()
+        finally:
+            self._replay_lock.release()
+
+    def _replay(self):
+        if not self.is_connected():
+            return 0
+        if self.outbox is None or not len(self.outbox):
+            return 0
+        self._expire()
+        if self.window.full:
+            return 0
+
+        now = self.clock()
+        if self._last_replay is not None and now - self._last_replay < self.replay_interval:
+            return 0
+        self._last_replay = now
 
+        batch = self.outbox.peek(self.replay_batch_size)
+        samples = [payload for _, payload in batch]
         try:
-            self.client.send_telemetry(telemetry)
+            self._publish(samples, samples)
         except Exception as e:
-            self.logger.error(f"Failed to send telemetry to ThingsBoard {e}")
+            self.logger.error("Failed to replay telemetry from outbox %s", e)
+            return 0
+        self.outbox.ack(batch[-1][0])
+        self.logger.info("Replayed %d stored samples, %d pending.", len(batch), len(self.outbox))
+        return len(batch)
 
     def send_attributes(self, attributes: dict):
         """
         Sends attributes dictionary to ThingsBoard.
 
         :param attributes: dictionary containing the attributes data
+        :return: True if the attributes were handed to the client
         """
         if not attributes:
             self.logger.warning("Attributes data is empty. Skipping send.")
-            return
+            return False
+        if not self.is_connected():
+            self.logger.warning("Attributes not sent, not connected.")
+            return False
         try:
             self.client.send_attributes(attributes)
+            return True
+        except Exception as e:
+            self.logger.error("Failed to send attributes data to ThingsBoard %s", e)
+            return False
+
+    def set_rpc_handler(self, handler):
+        """
+        Routes server-side RPC requests to `handler`, called on the MQTT network thread.
+
+        :param handler: callable taking (request_id, {"method": ..., "params": ...})
+        """
+        self.client.set_server_side_rpc_request_handler(handler)
+
+    def send_rpc_reply(self, request_id, response):
+        """
+        Replies to a server-side RPC request.
+
+        :param request_id: id the request was received with
+        :param response: JSON-serialisable reply
+        :return: True if the reply was handed to the client
+        """
+        if not self.is_connected():
+            self.logger.warning("RPC reply %s not sent, not connected.", request_id)
+            return False
+        try:
+            self.client.send_rpc_reply(request_id, response)
+            return True
+        except Exception as e:
+            self.logger.error("Failed to send RPC reply to ThingsBoard %s", e)
+            return False
+
+    def subscribe_to_shared_attributes(self, callback):
+        """
+        Calls `callback` with each shared attribute update pushed by the server.
+
+        :param callback: callable taking (attributes, exception)
+        """
+        self.client.subscribe_to_all_attributes(callback)
+
+    def request_shared_attributes(self, keys, callback):
+        """
+        Requests the current value of shared attributes.
+
+        :param keys: shared attribute names
+        :param callback: callable taking ({"shared": {...}}, exception)
+        """
+        try:
+            self.client.request_attributes(shared_keys=list(keys), callback=callback)
         except Exception as e:
-            self.logger.error(f"Failed to send attributes data to ThingsBoard {e}")
+            self.logger.error("Failed to request shared attributes from ThingsBoard %s", e)
 
     def disconnect(self):
         """
-        Disconnects from ThingsBoard.
+        Stops the reconnect engine and disconnects from ThingsBoard.
         """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
         try:
             self.client.disconnect()
         except Exception as e:
-            self.logger.error(f"Failed to disconnect ThingsBoard {e}")
+            self.logger.error("Failed to disconnect ThingsBoard %s", e)
             raise
@@ -0,0 +1,123 @@
+"""
+adaptive.py
+
+Defines the AdaptiveInterval class, which picks how often the agent samples
+and publishes from what the metrics are doing: fast while a metric is above
+its threshold or changing quickly, such as `cpu_temp` climbing towards
+throttling, and gradually back to a slow floor rate once everything is stable.
+
+The interval drops to `min_interval` as soon as a rule triggers, but only
+relaxes one step at a time, after `relax_after` seconds without any trigger.
+Together with the hysteresis on each rule this keeps a metric hovering around
+its threshold from flipping the rate back and forth.
+
+Classes:
+    AdaptiveInterval
+
+Usage:
+    adaptive = AdaptiveInterval(min_interval=5, max_interval=60,
+                                rules={"cpu_temp": {"threshold": 70, "hysteresis": 3, "rate": 0.5}})
+    interval = adaptive.observe(time.monotonic(), telemetry)
+"""
+
+
+class AdaptiveInterval:
+    """
+    Chooses an interval between `min_interval` and `max_interval` from the sampled values.
+
+    Rules are keyed by metric and may set:
+
+        threshold: the rule triggers once the value reaches this level, and
+            releases when it falls below threshold - hysteresis.
+        hysteresis: margin below the threshold before the rule releases.
+        rate: the rule triggers once the value changes faster than this many
+            units per second (smoothed over samples), and releases below half of it.
+
+    Args:
+        min_interval (float): Interval in seconds while any rule is triggered.
+        max_interval (float): Interval in seconds once everything is stable.
+        rules (dict): Rules keyed by metric.
+        relax_after (float): Seconds without triggers before each relaxation step.
+        relax_factor (float): Factor the interval grows by at each relaxation step.
+        smoothing (float): Weight of the newest rate of change in the smoothed rate, 0 to 1.
+    """
+
+    def __init__(self, min_interval, max_interval, rules=None, relax_after=60.0, relax_factor=2.0, smoothing=0.5):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Adaptive intervals must satisfy 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.rules = dict(rules or {})
+        self.relax_after = relax_after
+        self.relax_factor = relax_factor
+        self.smoothing = smoothing
+        self.interval = max_interval
+        self.active = set()
+        self._last = {}
+        self._rates = {}
+        self._calm_since = None
+
+    def _rate(self, key, now, value):
+        previous = self._last.get(key)
+        self._last[key] = (now, value)
+        if previous is None or now <= previous[0]:
+            return self._rates.get(key, 0.0)
+        rate = abs(value - previous[1]) / (now - previous[0])
+        smoothed = self._rates.get(key)
+        if smoothed is not None:
+            rate = self.smoothing * rate + (1 - self.smoothing) * smoothed
+        self._rates[key] = rate
+        return rate
+
+    def _evaluate(self, key, rule, now, value):
+        threshold = rule.get("threshold")
+        if threshold is not None:
+            name = f"{key}>={threshold:g}"
+            if value >= threshold or (name in self.active and value >= threshold - rule.get("hysteresis", 0.0)):
+                self.active.add(name)
+            else:
+                self.active.discard(name)
+
+        limit = rule.get("rate")
+        if limit is not None:
+            name = f"{key} changing >{limit:g}/s"
+            rate = self._rate(key, now, value)
+            if rate > limit or (name in self.active and rate > limit / 2):
+                self.active.add(name)
+            else:
+                self.active.discard(name)
+
+    def observe(self, now, values):
+        """
+        Updates the rules with a sample and returns the interval to use.
+
+        :param now: monotonic time of the sample in seconds
+        :param values: dictionary of telemetry values; missing and non-numeric values are ignored
+        :return: the interval in seconds
+        """
+        for key, rule in self.rules.items():
+            value = values.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self._evaluate(key, rule, now, value)
+
+        if self.active:
+            self._calm_since = None
+            self.interval = self.min_interval
+        elif self._calm_since is None:
+            self._calm_since = now
+        elif now - self._calm_since >= self.relax_after and self.interval < self.max_interval:
+            self.interval = min(self.max_interval, self.interval * self.relax_factor)
+            self._calm_since = now
+        return self.interval
+
+    def set_max_interval(self, max_interval):
+        """
+        Changes the interval used once everything is stable, e.g. after the poll
+        period changed. A stable interval moves straight to the new value, and a
+        faster one is kept but clamped to it.
+
+        :param max_interval: new interval in seconds, raised to `min_interval` if below it
+        """
+        stable = self.interval >= self.max_interval
+        self.max_interval = max(max_interval, self.min_interval)
+        self.interval = self.max_interval if stable else min(self.interval, self.max_interval)
@@ -10,15 +10,43 @@ Classes:
     MonitoringAgent
 
 Usage:
-    Instantiate MonitoringAgent and call .start() to begin the monitoring loop.
+    Instantiate MonitoringAgent and call .start() to begin the monitoring loop,
+    or run `asyncio.run(agent.start_async())` to collect metrics concurrently.
 """
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from monitoring_service.collectors.base import CollectorError
+from monitoring_service.inflight import PublishWindowFull
+from monitoring_service.remote import SET_POLL_PERIOD, SNAPSHOT, START_BURST, STOP_BURST
+from monitoring_service.sample_buffer import SampleBuffer
+from monitoring_service.scheduler import Scheduler
+
+PUBLISH_JOB = "publish"
+AGGREGATE_JOB = "aggregate"
+ATTRIBUTES_JOB = "attributes"
+INSTRUMENTATION_JOB = "instrumentation"
+COMMANDS_JOB = "commands"
+BURST_JOB = "burst"
+REPLAY_JOB = "replay"
 
 
 class MonitoringAgent:
     """
-    Manages telemetry sending to ThingsBoard. Uses poll_period to determine when to send data to ThingsBoard.
-    Logs the collected telemetry before sending to ThingsBoard.
+    Manages telemetry sending to ThingsBoard. Telemetry is sampled every sample_period seconds
+    into a buffer, and the buffer is published every poll_period seconds as batched,
+    timestamped payloads. With the default sample_period each sample is published on its own.
+    Individual metrics and the attributes can be given their own intervals; metrics that fall
+    due on the same tick are collected together into one sample. With an aggregator, samples
+    are summarised per window (min/max/mean/last/p95) and only the summaries are published.
+    With a deadband filter, values are only published when they change meaningfully or
+    their heartbeat elapses.
+    With instrumentation, cycle and publish latencies, publish failures and queue depths
+    are measured and published periodically as `agent_*` telemetry.
+    Each publish cycle is logged as one summary line. The collected telemetry is logged in
+    detail every `log_every` cycles, and always for samples with errors and for attributes
+    that changed.
 
     Args:
         tb_host (str): ThingsBoard host to connect to.
@@ -26,7 +54,47 @@ class MonitoringAgent:
         logger (Logger): Logger to use.
         telemetry_collector (TelemetryCollector): Telemetry collector instance.
         tb_client (ThingsBoardClient): ThingsBoard client instance.
-        poll_period (int): Time in seconds between telemetry updates.
+        poll_period (int): Time in seconds between telemetry publishes.
+        sample_period (float): Time in seconds between telemetry samples, defaults to poll_period.
+        sample_buffer (SampleBuffer): Buffer holding samples until the next publish.
+        attributes_full_resend (float): Seconds between full attribute resends. In between,
+            only attributes whose value changed are sent.
+        intervals (dict): Seconds between collections keyed by collector name, or "attributes".
+            Collectors default to their declared interval, else sample_period; attributes
+            default to poll_period.
+        scheduler (Scheduler): Scheduler driving the loop, replaceable for testing.
+        max_workers (int): Size of the thread pool running blocking collectors in async mode.
+        collector_timeout (float): Seconds a collector may take in async mode before its
+            value is reported as None.
+        collector_timeouts (dict): Per-metric overrides of collector_timeout.
+        aggregator (WindowAggregator): If set, samples are aggregated and only the
+            window summaries are buffered for publishing.
+        aggregation_window (float): Seconds per aggregation window, defaults to poll_period.
+        deadband (DeadbandFilter): If set, only values that moved outside their deadband,
+            or whose heartbeat elapsed, are buffered for publishing.
+        log_every (int): Log the collected telemetry in detail every this many publish cycles.
+        instrumentation (Instrumentation): If set, the agent's own measurements are
+            recorded into it and published.
+        instrumentation_interval (float): Seconds between publishes of the agent's own
+            measurements.
+        history (TelemetryHistory): If set, every collected sample is also recorded locally.
+        adaptive (AdaptiveInterval): If set, every collected sample is passed to it and
+            the jobs in `adaptive_jobs` run at most its interval apart.
+        adaptive_jobs (list): Jobs sped up by `adaptive`, defaults to publishing and the
+            collectors named in its rules. Each returns to its configured interval
+            once the adaptive interval relaxes past it.
+        sinks (SinkFanout): If set, telemetry batches are queued on its sinks, each
+            published by its own worker, instead of being sent to `tb_client` directly.
+            Attributes and the agent's own measurements still go to `tb_client`. Give
+            the workers `instrumentation` so publish latency and failures are still recorded.
+        remote (RemoteControl): If set, its queued commands are applied every
+            `command_interval` seconds: changing the poll period, publishing an
+            immediate snapshot of every metric, and burst captures that sample at a
+            high rate for a limited time and upload the samples as one batch.
+        command_interval (float): Seconds between checks for remote commands.
+        replay_interval (float): If set, samples stored in the client's outbox are
+            replayed this many seconds apart, one batch at a time, independently of
+            the poll period.
     """
     def __init__(self,
                  tb_host,
@@ -35,7 +103,28 @@ class MonitoringAgent:
                  telemetry_collector,
                  attributes_collector,
                  tb_client,
-                 poll_period=60
+                 poll_period=60,
+                 sample_period=None,
+                 sample_buffer=None,
+                 attributes_full_resend=3600,
+                 intervals=None,
+                 scheduler=None,
+                 max_workers=4,
+                 collector_timeout=5.0,
+                 collector_timeouts=None,
+                 aggregator=None,
+                 aggregation_window=None,
+                 deadband=None,
+                 log_every=1,
+                 instrumentation=None,
+                 instrumentation_interval=300,
+                 history=None,
+                 adaptive=None,
+                 adaptive_jobs=None,
+                 sinks=None,
+                 remote=None,
+                 command_interval=1.0,
+                 replay_interval=None
                  ):
         self.tb_host = tb_host
         self.access_token = access_token
@@ -43,16 +132,78 @@ class MonitoringAgent:
         self.telemetry_collector = telemetry_collector
         self.attributes_collector = attributes_collector
         self.poll_period = poll_period
+        self.sample_period = sample_period or poll_period
+        self.sample_buffer = sample_buffer if sample_buffer is not None else SampleBuffer()
         self.tb_client = tb_client
+        self.attributes_full_resend = attributes_full_resend
+        self._sent_attributes = {}
+        self._next_full_resend = 0.0
+        self._reported_overruns = 0
+        self.max_workers = max_workers
+        self.collector_timeout = collector_timeout
+        self.collector_timeouts = dict(collector_timeouts or {})
+        self._pending_collections = {}
+        self._pending_publishes = {}
+        self._uploads = []
+        self.aggregator = aggregator
+        self.deadband = deadband
+        self.log_every = max(1, int(log_every))
+        self._cycle = 0
+        self._cycle_samples = 0
+        self._cycle_errors = 0
+        self.instrumentation = instrumentation
+        self.history = history
+        self.sinks = sinks
+        self.remote = remote
+        self._burst = None
+
+        intervals = dict(intervals or {})
+        self.scheduler = scheduler or Scheduler()
+        self._metrics = list(self.telemetry_collector.metrics)
+        default_intervals = self.telemetry_collector.default_intervals()
+        for metric in self._metrics:
+            self.scheduler.add(metric, intervals.pop(metric, default_intervals.get(metric, self.sample_period)))
+        if self.aggregator is not None:
+            self.scheduler.add(AGGREGATE_JOB, aggregation_window or self.poll_period)
+        self.scheduler.add(PUBLISH_JOB, self.poll_period)
+        self.scheduler.add(ATTRIBUTES_JOB, intervals.pop(ATTRIBUTES_JOB, self.poll_period))
+        if self.instrumentation is not None:
+            self.scheduler.add(INSTRUMENTATION_JOB, instrumentation_interval)
+        if self.remote is not None:
+            self.scheduler.add(COMMANDS_JOB, command_interval)
+        if replay_interval is not None:
+            self.scheduler.add(REPLAY_JOB, replay_interval)
+        for name in intervals:
+            self.logger.warning("Ignoring interval for unknown metric: %s", name)
+
+        self.adaptive = adaptive
+        self._adaptive_jobs = {}
+        # The stable adaptive interval defaults to the poll period and then follows its changes
+        self._adaptive_follows_poll = adaptive is not None and adaptive.max_interval == self.poll_period
+        if self.adaptive is not None:
+            if adaptive_jobs is None:
+                adaptive_jobs = [PUBLISH_JOB, *(name for name in self.adaptive.rules if name in self._metrics)]
+            for job in adaptive_jobs:
+                try:
+                    self._adaptive_jobs[job] = self.scheduler.interval(job)
+                except KeyError:
+                    self.logger.warning("Ignoring adaptive job that is not scheduled: %s", job)
+            self._adapt_jobs(self.adaptive.interval)
 
     def start(self):
         """
         Starts the monitoring loop that periodically collects and sends telemetry and attribute data.
 
-        This method runs indefinitely, sleeping for `poll_period` seconds between each
-        telemetry/attributes collection cycle. It logs each tick and handles timing delays.
+        This method runs indefinitely, sampling telemetry every `sample_period` seconds and
+        publishing the buffered samples every `poll_period` seconds, unless a metric or the
+        attributes have their own interval. Ticks are aligned to absolute monotonic deadlines,
+        so the schedule does not drift; ticks missed because a cycle overran are skipped,
+        counted and logged.
 
-        Attributes data sent on every cycle in case of change. ThingsBoard will only log on change.
+        Attributes are checked on their interval but only the changed fields are sent, with a
+        full resend every `attributes_full_resend` seconds.
+        Samples stored in the outbox during a broker outage are replayed every
+        `replay_interval` seconds when that is set.
 
         Raises:
             Any unexpected exceptions from telemetry collection or transmission will propagate.
@@ -61,31 +212,375 @@ class MonitoringAgent:
         self.logger.info("MonitoringAgent started.")
         # Main loop
         while True:
-            start_time = time.time()
-            self._read_and_send_telemetry()
+            due = self.scheduler.wait()
+            self._run_tick(due)
+
+    def _run_tick(self, due):
+        start = time.perf_counter()
+        snapshots, uploads = self._run_commands() if COMMANDS_JOB in due else ([], [])
+        metrics = [name for name in due if name in self._metrics]
+        if metrics:
+            self._read_telemetry(metrics)
+        if snapshots:
+            ts = int(time.time() * 1000)
+            uploads.append(self._snapshot(snapshots, ts, *self.telemetry_collector.get_telemetry(self._metrics)))
+        if BURST_JOB in due and self._burst is not None:
+            ts = int(time.time() * 1000)
+            telemetry, _ = self.telemetry_collector.get_telemetry(self._burst["metrics"])
+            uploads.append(self._add_burst_sample(ts, telemetry))
+        uploads = [batch for batch in uploads if batch]
+        if uploads:
+            self._publish(uploads)
+        if AGGREGATE_JOB in due:
+            self._summarise_window()
+        if PUBLISH_JOB in due:
+            batches = self._drain_batches()
+            self._publish(batches)
+            self._end_cycle(batches)
+        if ATTRIBUTES_JOB in due:
             self._read_and_send_attributes()
-            end_time = time.time()
-            elapsed = end_time - start_time
-            delay = max(0, int(self.poll_period - elapsed))
-            time.sleep(delay)
+        if INSTRUMENTATION_JOB in due:
+            self._send_instrumentation()
+        if REPLAY_JOB in due:
+            self.tb_client.drain_outbox()
+
+        self._report_overruns()
+        self._observe("cycle", time.perf_counter() - start)
+
+    def _observe(self, name, seconds):
+        if self.instrumentation is not None:
+            self.instrumentation.observe(name, seconds)
+
+    def _send_instrumentation(self):
+        self.instrumentation.set_gauge("overruns", self.scheduler.overruns)
+        self.instrumentation.set_gauge("buffer_depth", len(self.sample_buffer))
+        self.instrumentation.set_gauge("outbox_depth", self.tb_client.pending())
+        for name, value in self.tb_client.connection_stats().items():
+            self.instrumentation.set_gauge(name, value)
+        for name, value in self.tb_client.publish_stats().items():
+            self.instrumentation.set_gauge(name, value)
+        if self.adaptive is not None:
+            self.instrumentation.set_gauge("adaptive_interval", self.adaptive.interval)
+        if self.sinks is not None:
+            for name, value in self.sinks.stats().items():
+                self.instrumentation.set_gauge(name, value)
+        self.tb_client.send_telemetry(self.instrumentation.telemetry())
+
+    def _report_overruns(self):
+        if self.scheduler.overruns > self._reported_overruns:
+            self.logger.warning("Cycle overran, %d ticks skipped (%d in total).",
+                                self.scheduler.overruns - self._reported_overruns, self.scheduler.overruns)
+            self._reported_overruns = self.scheduler.overruns
+
+    def _log_details(self):
+        return self._cycle % self.log_every == 0
+
+    def _end_cycle(self, batches):
+        self.logger.info("cycle=%d samples=%d errors=%d published=%d batches=%d overruns=%d",
+                         self._cycle, self._cycle_samples, self._cycle_errors,
+                         sum(len(batch) for batch in batches), len(batches), self.scheduler.overruns)
+        self._cycle += 1
+        self._cycle_samples = 0
+        self._cycle_errors = 0
+
+    async def start_async(self):
+        """
+        Runs the monitoring loop on asyncio, collecting due metrics concurrently.
+
+        Follows the same schedule as `start()`. Cheap collectors run inline; every other
+        due collector is read in a bounded thread pool with its own timeout, so the cycle
+        takes as long as the slowest collector rather than the sum of all of them. A collector that times out, or
+        is still running from an earlier tick, contributes None and an error entry.
+        Publishing runs on a separate single thread so a slow broker never delays
+        collection. While a publish, attribute, instrumentation or replay job is still
+        running there, the next one is skipped instead of queued; telemetry samples stay
+        in the sample buffer until the publisher catches up.
+
+        Raises:
+            Any unexpected exceptions from telemetry collection will propagate.
+        """
+        self.logger.info("MonitoringAgent started (async).")
+        loop = asyncio.get_running_loop()
+        collectors = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector")
+        publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="publisher")
+        try:
+            while True:
+                await asyncio.sleep(self.scheduler.next_delay())
+                due = self.scheduler.due()
+                await self._run_tick_async(due, loop, collectors, publisher)
+        finally:
+            collectors.shutdown(wait=False, cancel_futures=True)
+            publisher.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_tick_async(self, due, loop, collectors, publisher):
+        start = time.perf_counter()
+        snapshots, uploads = self._run_commands() if COMMANDS_JOB in due else ([], [])
+        metrics = [name for name in due if name in self._metrics]
+        if metrics:
+            ts = int(time.time() * 1000)
+            self._record_sample(ts, *await self._gather_async(metrics, loop, collectors))
+        if snapshots:
+            ts = int(time.time() * 1000)
+            uploads.append(self._snapshot(snapshots, ts, *await self._gather_async(self._metrics, loop, collectors)))
+        if BURST_JOB in due and self._burst is not None:
+            ts = int(time.time() * 1000)
+            telemetry, _ = await self._gather_async(self._burst["metrics"], loop, collectors)
+            uploads.append(self._add_burst_sample(ts, telemetry))
+        # Uploads wait here while an earlier upload is still being published
+        self._uploads.extend(batch for batch in uploads if batch)
+        if self._uploads and self._submit(loop, publisher, COMMANDS_JOB, self._publish, self._uploads):
+            self._uploads = []
+        if AGGREGATE_JOB in due:
+            self._summarise_window()
+        if PUBLISH_JOB in due:
+            batches = []
+            if PUBLISH_JOB in self._pending_publishes:
+                # Samples stay in the bounded sample buffer until the publisher catches up
+                self.logger.warning("Previous publish still running, samples stay buffered.")
+            else:
+                batches = self._drain_batches()
+                self._submit(loop, publisher, PUBLISH_JOB, self._publish, batches)
+            self._end_cycle(batches)
+        if ATTRIBUTES_JOB in due:
+            self._submit(loop, publisher, ATTRIBUTES_JOB, self._read_and_send_attributes)
+        if INSTRUMENTATION_JOB in due:
+            self._submit(loop, publisher, INSTRUMENTATION_JOB, self._send_instrumentation)
+        if REPLAY_JOB in due:
+            self._submit(loop, publisher, REPLAY_JOB, self.tb_client.drain_outbox)
+
+        self._report_overruns()
+        self._observe("cycle", time.perf_counter() - start)
+
+    async def _gather_async(self, metrics, loop, collectors):
+        results = await asyncio.gather(*(self._collect_async(metric, loop, collectors) for metric in metrics))
+        telemetry = {}
+        errors = []
+        for values, error in results:
+            telemetry.update(values)
+            if error:
+                errors.append(error)
+        return telemetry, errors
+
+    def _submit(self, loop, executor, job, func, *args):
+        # One submission per job at a time, so a blocked publisher cannot queue work without bound
+        if job in self._pending_publishes:
+            self.logger.warning("Skipping %s, the previous one is still running.", job)
+            return False
 
-    def _read_and_send_telemetry(self):
+        def finished(future):
+            self._pending_publishes.pop(job, None)
+            if not future.cancelled() and future.exception() is not None:
+                self.logger.error("Publishing failed: %s", future.exception())
+
+        future = loop.run_in_executor(executor, func, *args)
+        self._pending_publishes[job] = future
+        future.add_done_callback(finished)
+        return True
+
+    async def _collect_async(self, metric, loop, collectors):
+        if self.telemetry_collector.is_cheap(metric):
+            return self.telemetry_collector.collect_metric(metric)
+        if metric in self._pending_collections:
+            return {metric: None}, CollectorError.now(metric, "still running from an earlier tick")
+
+        timeout = self.collector_timeouts.get(metric, self.collector_timeout)
+        future = loop.run_in_executor(collectors, self.telemetry_collector.collect_metric, metric)
+        self._pending_collections[metric] = future
+        future.add_done_callback(lambda _: self._pending_collections.pop(metric, None))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return {metric: None}, CollectorError.now(metric, f"timed out after {timeout}s")
+
+    def _read_telemetry(self, metrics=None):
         # TODO: move error logging into telemetry.py, remove from this function
-        self.logger.info("Reading telemetry...")
-        telemetry, errors = self.telemetry_collector.get_telemetry()
-        self.logger.info(f"Collected telemetry: {telemetry}")
+        self.logger.debug("Reading telemetry...")
+        ts = int(time.time() * 1000)
+        telemetry, errors = self.telemetry_collector.get_telemetry(metrics)
+        self._record_sample(ts, telemetry, errors)
+
+    def _record_sample(self, ts, telemetry, errors):
+        self._cycle_samples += 1
+        self._cycle_errors += len(errors)
+        if errors or self._log_details():
+            self.logger.info("Collected telemetry: %s", telemetry)
+        for err in errors:
+            self.logger.error("Telemetry error: %s", err)
+        if self.history is not None:
+            self.history.append(ts, telemetry)
+        if self.adaptive is not None:
+            self._adapt(telemetry)
+        if self.aggregator is not None:
+            self.aggregator.add(telemetry)
+        else:
+            self._buffer_sample(ts, telemetry)
+
+    def _adapt(self, telemetry):
+        previous = self.adaptive.interval
+        interval = self.adaptive.observe(self.scheduler.clock(), telemetry)
+        if interval != previous:
+            self.logger.info("Adaptive interval %gs -> %gs (%s)", previous, interval,
+                             ", ".join(sorted(self.adaptive.active)) or "stable")
+            self._adapt_jobs(interval)
+
+    def _adapt_jobs(self, interval):
+        for job, configured in self._adaptive_jobs.items():
+            self.scheduler.set_interval(job, min(configured, interval))
+
+    def _summarise_window(self):
+        summary = self.aggregator.summarise()
+        if summary:
+            if self._log_details():
+                self.logger.info("Window summary: %s", summary)
+            self._buffer_sample(int(time.time() * 1000), summary)
+
+    def _buffer_sample(self, ts, values):
+        if self.deadband is not None:
+            values = self.deadband.filter(values)
+            if not values:
+                return
+        overwritten = self.sample_buffer.append(ts, values)
+        if overwritten is not None:
+            self._forget([overwritten])
+
+    def _forget(self, samples):
+        # Values dropped before publishing must not stay the deadband reference
+        if self.deadband is not None:
+            for sample in samples:
+                self.deadband.forget(sample["values"])
+
+    def _drain_batches(self):
+        if self.sample_buffer.dropped:
+            self.logger.warning("Sample buffer overflowed, %d samples dropped.", self.sample_buffer.dropped)
+            self.sample_buffer.dropped = 0
+        return self.sample_buffer.drain_batches()
+
+    def _publish(self, batches):
+        if self.sinks is not None:
+            self.sinks.publish(batches)
+            return
+        self.logger.debug("Sending %d telemetry batches...", len(batches))
+        for index, batch in enumerate(batches):
+            start = time.perf_counter()
+            try:
+                sent = self.tb_client.send_telemetry_batch(batch)
+            except PublishWindowFull as e:
+                # Hold the rest back; they go out with the next publish once acknowledgements catch up
+                held = [sample for pending in batches[index:] for sample in pending]
+                self._forget(self.sample_buffer.requeue(held))
+                self.logger.warning("Publish window full (%s), %d samples held back.", e, len(held))
+                if self.instrumentation is not None:
+                    self.instrumentation.increment("publish_deferred")
+                break
+            if self.instrumentation is not None:
+                self.instrumentation.observe("publish", time.perf_counter() - start)
+                if not sent:
+                    self.instrumentation.increment("publish_failures")
+
+    def _run_commands(self):
+        snapshots = []
+        uploads = []
+        for command in self.remote.pending():
+            try:
+                if command.action == SNAPSHOT:
+                    # Answered once the snapshot is collected later in this tick
+                    snapshots.append(command.request_id)
+                    continue
+                if command.action == SET_POLL_PERIOD:
+                    result = self._set_poll_period(command.params["poll_period"])
+                elif command.action == START_BURST:
+                    result = self._start_burst(**command.params)
+                elif command.action == STOP_BURST:
+                    if self._burst is None:
+                        raise ValueError("no burst is running")
+                    samples = self._finish_burst()
+                    uploads.append(samples)
+                    result = {"burst": "stopped", "samples": len(samples)}
+                else:
+                    raise ValueError(f"unsupported action {command.action}")
+            except (ValueError, KeyError) as e:
+                self.logger.warning("Remote command %s rejected: %s", command.action, e)
+                result = {"error": str(e)}
+            self.remote.reply(command.request_id, result)
+        return snapshots, uploads
+
+    def _set_poll_period(self, poll_period):
+        previous = self.poll_period
+        self.poll_period = poll_period
+        jobs = [PUBLISH_JOB]
+        if self.sample_period == previous:
+            # Sampling that followed the poll period keeps following it
+            self.sample_period = poll_period
+            jobs += [metric for metric in self._metrics
+                     if self._adaptive_jobs.get(metric, self.scheduler.interval(metric)) == previous]
+        for job in jobs:
+            if job in self._adaptive_jobs:
+                self._adaptive_jobs[job] = poll_period
+            else:
+                self.scheduler.set_interval(job, poll_period)
+        if self.adaptive is not None:
+            if self._adaptive_follows_poll:
+                self.adaptive.set_max_interval(poll_period)
+            self._adapt_jobs(self.adaptive.interval)
+        self.logger.info("Poll period changed from %gs to %gs.", previous, poll_period)
+        return {"poll_period": poll_period}
+
+    def _snapshot(self, request_ids, ts, telemetry, errors):
         for err in errors:
-            self.logger.error(f"Telemetry error: {err}")
+            self.logger.error("Telemetry error: %s", err)
+        self.logger.info("Snapshot: %s", telemetry)
+        for request_id in request_ids:
+            self.remote.reply(request_id, {"ts": ts, "values": telemetry})
+        return [{"ts": ts, "values": telemetry}]
+
+    def _start_burst(self, rate_hz, duration, metrics=None, max_samples=None):
+        if self._burst is not None:
+            raise ValueError("a burst is already running")
+        metrics = list(metrics or self._metrics)
+        unknown = [metric for metric in metrics if metric not in self._metrics]
+        if unknown:
+            raise ValueError(f"unknown metrics {', '.join(unknown)}")
+        self._burst = {
+            "metrics": metrics,
+            "ends": self.scheduler.clock() + duration,
+            "max_samples": max_samples or int(rate_hz * duration) + 1,
+            "samples": [],
+        }
+        self.scheduler.add(BURST_JOB, 1.0 / rate_hz, delay=0)
+        self.logger.info("Burst started: %s at %g Hz for %gs.", ", ".join(metrics), rate_hz, duration)
+        return {"burst": "started", "rate_hz": rate_hz, "duration": duration, "metrics": metrics}
 
-        self.logger.info("Sending telemetry...")
-        self.tb_client.send_telemetry(telemetry)
-        self.logger.info("Telemetry sent.")
+    def _add_burst_sample(self, ts, telemetry):
+        samples = self._burst["samples"]
+        samples.append({"ts": ts, "values": telemetry})
+        if len(samples) >= self._burst["max_samples"] or self.scheduler.clock() >= self._burst["ends"]:
+            return self._finish_burst()
+        return None
+
+    def _finish_burst(self):
+        samples = self._burst["samples"]
+        self._burst = None
+        self.scheduler.remove(BURST_JOB)
+        self.logger.info("Burst finished, uploading %d samples as one batch.", len(samples))
+        return samples
 
     def _read_and_send_attributes(self):
-        self.logger.info("Reading attributes...")
+        self.logger.debug("Reading attributes...")
         attributes = self.attributes_collector.as_dict()
-        self.logger.info(f"Collected attributes: {attributes}")
 
-        self.logger.info("Sending attributes...")
-        self.tb_client.send_attributes(attributes)
-        self.logger.info("Attributes sent.")
+        now = time.monotonic()
+        full_resend = now >= self._next_full_resend
+        if full_resend:
+            changed = attributes
+        else:
+            changed = {key: value for key, value in attributes.items()
+                       if key not in self._sent_attributes or self._sent_attributes[key] != value}
+        if not changed:
+            self.logger.debug("Attributes unchanged, not sending.")
+            return
+
+        if self.tb_client.send_attributes(changed):
+            self._sent_attributes.update(changed)
+            if full_resend:
+                self._next_full_resend = now + self.attributes_full_resend
+            self.logger.info("Sent %s attributes: %s", "all" if full_resend else "changed", changed)
@@ -0,0 +1,158 @@
+"""
+aggregation.py
+
+Defines the MetricWindow and WindowAggregator classes, which summarise fast
+local sampling into per-window aggregates (min, max, mean, last and an
+approximate 95th percentile) so only the summaries need to be published.
+
+Each metric is held in a fixed-size `array('d')` ring buffer allocated once,
+so memory is O(window) per metric and adding a sample allocates nothing.
+
+Classes:
+    MetricWindow
+    WindowAggregator
+
+Usage:
+    aggregator = WindowAggregator(capacity=600)
+    aggregator.add(telemetry)
+    summary = aggregator.summarise()
+"""
+
+import heapq
+import math
+from array import array
+
+AGGREGATES = ("min", "max", "mean", "last", "p95")
+
+
+class MetricWindow:
+    """
+    Fixed-capacity ring buffer of float samples for one metric.
+
+    Once full, each new sample overwrites the oldest one.
+
+    Args:
+        capacity (int): Number of samples held.
+    """
+
+    __slots__ = ("capacity", "count", "last", "_values", "_index")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0
+        self.last = None
+        self._values = array("d", bytes(8 * capacity))
+        self._index = 0
+
+    def add(self, value):
+        """
+        :param value: sample to add
+        """
+        self._values[self._index] = value
+        self._index = (self._index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.last = value
+
+    def reset(self):
+        """
+        Empties the window without reallocating it.
+        """
+        self.count = 0
+        self._index = 0
+        self.last = None
+
+    def _filled(self):
+        # Order does not matter for any aggregate except last, which is tracked separately
+        return memoryview(self._values)[:self.count]
+
+    def p95(self):
+        """
+        Nearest-rank 95th percentile, found with a partial heap of the top 5% of
+        samples instead of a full sort.
+
+        :return: the 95th percentile, or None if the window is empty
+        """
+        if not self.count:
+            return None
+        rank = math.ceil(0.95 * self.count)
+        return heapq.nlargest(self.count - rank + 1, self._filled())[-1]
+
+    def summary(self, aggregates):
+        """
+        :param aggregates: names from AGGREGATES to compute
+        :return: dictionary of aggregate name to value, empty if the window is empty
+        """
+        if not self.count:
+            return {}
+        values = self._filled()
+        result = {}
+        for aggregate in aggregates:
+            if aggregate == "min":
+                result["min"] = min(values)
+            elif aggregate == "max":
+                result["max"] = max(values)
+            elif aggregate == "mean":
+                result["mean"] = sum(values) / self.count
+            elif aggregate == "last":
+                result["last"] = self.last
+            elif aggregate == "p95":
+                result["p95"] = self.p95()
+        return result
+
+
+class WindowAggregator:
+    """
+    Accumulates samples per metric and emits their aggregates at the end of each window.
+
+    Non-numeric and None values are ignored. Aggregates are reported as
+    `<metric>_<aggregate>`, except `last`, which keeps the bare metric name so
+    existing dashboards keep showing the latest value.
+
+    Args:
+        capacity (int): Samples held per metric, normally window / sample_period.
+        aggregates (list): Aggregates computed for metrics without their own setting.
+        metrics (dict): Per-metric list of aggregates, overriding `aggregates`.
+
+    Raises:
+        ValueError: If an unknown aggregate is requested.
+    """
+
+    def __init__(self, capacity, aggregates=AGGREGATES, metrics=None):
+        self.capacity = capacity
+        self.aggregates = tuple(aggregates)
+        self.metrics = {key: tuple(value) for key, value in (metrics or {}).items()}
+        for requested in (self.aggregates, *self.metrics.values()):
+            unknown = set(requested) - set(AGGREGATES)
+            if unknown:
+                raise ValueError(f"Unknown aggregates: {', '.join(sorted(unknown))}")
+        self._windows = {}
+
+    def add(self, values):
+        """
+        Adds one sample of each numeric metric in `values`.
+
+        :param values: dictionary of telemetry data
+        """
+        windows = self._windows
+        for key, value in values.items():
+            if value is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            window = windows.get(key)
+            if window is None:
+                window = windows[key] = MetricWindow(self.capacity)
+            window.add(value)
+
+    def summarise(self):
+        """
+        Computes the aggregates of the current window and starts a new one.
+
+        :return: dictionary of telemetry data, empty if no samples were added
+        """
+        summary = {}
+        for key, window in self._windows.items():
+            aggregates = self.metrics.get(key, self.aggregates)
+            for aggregate, value in window.summary(aggregates).items():
+                summary[key if aggregate == "last" else f"{key}_{aggregate}"] = value
+            window.reset()
+        return summary
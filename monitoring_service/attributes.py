@@ -4,6 +4,11 @@ attributes.py
 Defines the AttributesCollector class, which gathers machine attribute data
 such as device name, IP address, and MAC address.
 
+Values are cached with a per-field time-to-live. The IP address is also
+refreshed as soon as a network change is seen, either through a netlink
+route/address subscription or, where netlink is unavailable, by comparing
+the kernel routing table between calls.
+
 Classes:
     AttributesCollector
 
@@ -13,20 +18,78 @@ Usage:
 """
 
 import socket
+import time
 import uuid
 
+# Netlink multicast groups for link, IPv4/IPv6 address and IPv4 route changes
+_RTMGRP_LINK = 0x1
+_RTMGRP_IPV4_IFADDR = 0x10
+_RTMGRP_IPV4_ROUTE = 0x40
+_RTMGRP_IPV6_IFADDR = 0x100
+
+DEFAULT_TTLS = {
+    "ip_address": 300,
+    "mac_address": 86400,
+}
+
 
 class AttributesCollector:
     """
-    Collects static machine attribute data during initialization.
+    Collects machine attribute data, caching each field until it expires.
 
     Attributes gathered include device name, IP address, and MAC address.
-    Data is collected when the class is instantiated and exposed via `as_dict()`.
+    Each field is looked up on first use and then served from the cache until
+    its TTL in `ttls` expires (a TTL of None never expires). A network change
+    invalidates the IP address immediately. Failed lookups are not cached.
+
+    Args:
+        device_name (str): Name reported as the device_name attribute.
+        logger (logging.Logger): Logger used to report lookup errors.
+        ttls (dict): Seconds each field is cached for, merged over DEFAULT_TTLS.
+        route_path (str): Routing table compared between calls when netlink is unavailable.
     """
 
-    def __init__(self, device_name, logger):
+    def __init__(self, device_name, logger, ttls=None, route_path="/proc/net/route"):
         self.device_name = device_name
         self.logger = logger
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.route_path = route_path
+        self._cache = {}
+        self._routes = None
+        self._netlink = self._open_netlink()
+
+    def _open_netlink(self):
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, _RTMGRP_LINK | _RTMGRP_IPV4_IFADDR | _RTMGRP_IPV4_ROUTE | _RTMGRP_IPV6_IFADDR))
+            sock.setblocking(False)
+            return sock
+        except (AttributeError, OSError):
+            return None
+
+    def _network_changed(self):
+        if self._netlink is not None:
+            changed = False
+            while True:
+                try:
+                    if not self._netlink.recv(65536):
+                        break
+                    changed = True
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    # Receive buffer overran, events were lost, so assume a change
+                    return True
+            return changed
+
+        try:
+            with open(self.route_path, "r") as f:
+                routes = f.read()
+        except OSError:
+            return False
+        changed = self._routes is not None and routes != self._routes
+        self._routes = routes
+        return changed
 
     def _get_ip_address(self):
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -34,7 +97,7 @@ class AttributesCollector:
             s.connect(("8.8.8.8", 80))
             return s.getsockname()[0]
         except Exception as e:
-            self.logger.error(f"Error getting IP address: {e}")
+            self.logger.error("Error getting IP address: %s", e)
             return None
         finally:
             s.close()
@@ -47,20 +110,42 @@ class AttributesCollector:
             )
             return mac_address
         except Exception as e:
-            self.logger.error(f"Error getting MAC address: {e}")
+            self.logger.error("Error getting MAC address: %s", e)
             return None
 
+    def _cached(self, field, getter, now):
+        if field in self._cache:
+            value, expires_at = self._cache[field]
+            if expires_at is None or now < expires_at:
+                return value
+        value = getter()
+        if value is not None:
+            ttl = self.ttls.get(field)
+            self._cache[field] = (value, None if ttl is None else now + ttl)
+        return value
+
     def as_dict(self):
         """
         Return a dictionary containing the machine attribute data.
 
         :return: dictionary containing the machine attribute data.
         """
+        if self._network_changed():
+            self._cache.pop("ip_address", None)
 
-        ip_address = self._get_ip_address()
-        mac_address = self._get_mac_address()
+        now = time.monotonic()
+        ip_address = self._cached("ip_address", self._get_ip_address, now)
+        mac_address = self._cached("mac_address", self._get_mac_address, now)
         return {
             "device_name": self.device_name,
             "ip_address": ip_address,
             "mac_address": mac_address,
         }
+
+    def close(self):
+        """
+        Closes the netlink socket, if one is open.
+        """
+        if self._netlink is not None:
+            self._netlink.close()
+            self._netlink = None
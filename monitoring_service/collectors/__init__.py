@@ -0,0 +1,27 @@
+"""
+collectors
+
+Telemetry collector plugins. Each collector is a subclass of Collector that
+declares the metric keys it produces, a cost class and a default interval.
+Collectors are looked up by name through CollectorRegistry and their modules
+are imported only when the collector is enabled.
+
+Built-in collectors:
+    cpu_usage   -> collectors.cpu.CpuUsageCollector
+    cpu_temp    -> collectors.cpu_temp.CpuTempCollector
+    gpu_temp    -> collectors.gpu_temp.GpuTempCollector
+    ram_usage   -> collectors.memory.MemoryCollector
+    disk_usage  -> collectors.disk.DiskUsageCollector
+    disks       -> collectors.disks.DisksCollector
+    thermal     -> collectors.thermal.ThermalCollector
+    processes   -> collectors.processes.ProcessesCollector
+    cgroups     -> collectors.cgroups.CgroupCollector
+
+Third-party collectors are registered under the `monitoring_service.collectors`
+entry point group, or referenced in config.json as "module:Class".
+"""
+
+from monitoring_service.collectors.base import Collector, CollectorError
+from monitoring_service.collectors.registry import CollectorRegistry
+
+__all__ = ["Collector", "CollectorError", "CollectorRegistry"]
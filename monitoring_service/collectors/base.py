@@ -0,0 +1,80 @@
+"""
+base.py
+
+Defines the Collector base class implemented by every telemetry collector
+plugin, and the CollectorError record used to report collection failures.
+
+Classes:
+    Collector
+    CollectorError
+"""
+
+import time
+from collections import namedtuple
+
+COST_CHEAP = "cheap"
+COST_MODERATE = "moderate"
+COST_EXPENSIVE = "expensive"
+
+
+class CollectorError(namedtuple("CollectorError", ["collector", "message", "ts"])):
+    """
+    A failure reported by one collector during one collection.
+
+    Attributes:
+        collector (str): Name of the collector that failed.
+        message (str): Human-readable description of the failure.
+        ts (float): Wall-clock time of the failure, in seconds since the epoch.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def now(cls, collector, message):
+        return cls(collector, message, time.time())
+
+    def __str__(self):
+        return f"{self.collector}: {self.message}"
+
+
+class Collector:
+    """
+    Base class for telemetry collector plugins.
+
+    Subclasses set the class attributes below and implement `collect()`.
+    Options from the collector's section in config.json are passed to
+    `__init__` as keyword arguments.
+
+    Class attributes:
+        keys (tuple): Metric keys the collector reports. Reported as None if collection fails.
+        cost (str): COST_CHEAP for non-blocking reads of /proc or /sys that can run
+            inline, COST_MODERATE or COST_EXPENSIVE for calls that may block.
+        default_interval (float): Seconds between collections, or None to use the
+            agent's sample period.
+
+    Args:
+        name (str): Name the collector was enabled under.
+        logger (logging.Logger): Logger for the collector's own diagnostics.
+    """
+
+    keys = ()
+    cost = COST_MODERATE
+    default_interval = None
+
+    def __init__(self, name, logger, **options):
+        self.name = name
+        self.logger = logger
+        if options:
+            raise TypeError(f"Unknown options for collector {name}: {', '.join(options)}")
+
+    def collect(self):
+        """
+        Reads the collector's metrics.
+
+        :return: dictionary of telemetry data
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Releases any resources held by the collector.
+        """
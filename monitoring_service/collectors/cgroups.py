@@ -0,0 +1,189 @@
+"""
+cgroups.py
+
+Per-unit resource collector for systemd services and slices, reading their
+cgroup v2 cpu.stat, memory.current, memory.peak and io.stat files. The files
+of each unit are opened once and re-read with `os.pread`, and CPU and I/O
+rates are computed from the deltas between collections.
+"""
+
+import glob
+import os
+import re
+import time
+
+from monitoring_service.collectors.base import Collector, COST_CHEAP
+
+_FILES = ("cpu.stat", "memory.current", "memory.peak", "io.stat")
+
+
+def unit_label(unit):
+    """
+    :param unit: systemd unit name or cgroup path, e.g. "nginx.service" or "system.slice"
+    :return: key-safe label, with a trailing ".service" dropped
+    """
+    name = unit.rstrip("/").rsplit("/", 1)[-1]
+    if name.endswith(".service"):
+        name = name[:-len(".service")]
+    return re.sub(r"[^0-9A-Za-z]+", "_", name).strip("_").lower() or "root"
+
+
+def _parse_cpu_stat(data):
+    for line in data.splitlines():
+        if line.startswith(b"usage_usec "):
+            return int(line.split()[1])
+    return None
+
+
+def _parse_io_stat(data):
+    read_bytes = write_bytes = 0
+    for line in data.splitlines():
+        for field in line.split()[1:]:
+            if field.startswith(b"rbytes="):
+                read_bytes += int(field[7:])
+            elif field.startswith(b"wbytes="):
+                write_bytes += int(field[7:])
+    return read_bytes, write_bytes
+
+
+class _Unit:
+    __slots__ = ("name", "label", "path", "fds", "usage", "io", "seen", "next_resolve")
+
+    def __init__(self, name):
+        self.name = name
+        self.label = unit_label(name)
+        self.path = None
+        self.fds = {}
+        self.usage = None
+        self.io = None
+        self.seen = None
+        self.next_resolve = 0.0
+
+
+class CgroupCollector(Collector):
+    """
+    Reports, for each unit, `cgroup_<unit>_cpu` (percent of one core),
+    `cgroup_<unit>_mem_mb`, `cgroup_<unit>_mem_peak_mb`, and
+    `cgroup_<unit>_io_read_bps` and `_io_write_bps`, where <unit> is the unit
+    name without ".service". Rates are None on the first collection of a unit,
+    and every metric is None while the unit is not running.
+
+    A unit's cgroup is recreated when it restarts, so a failing read closes its
+    descriptors and the unit is looked up again, at most every
+    `resolve_interval` seconds while it stays missing.
+
+    Options:
+        units (list): systemd unit names, e.g. "nginx.service" or "user.slice", or
+            cgroup paths relative to `cgroup_root`.
+        cgroup_root (str): Mount point of the cgroup v2 hierarchy.
+        resolve_interval (float): Seconds between lookups of a missing unit.
+    """
+
+    cost = COST_CHEAP
+
+    def __init__(self, name, logger, units=(), cgroup_root="/sys/fs/cgroup", resolve_interval=30.0, **options):
+        super().__init__(name, logger, **options)
+        self.cgroup_root = cgroup_root
+        self.resolve_interval = resolve_interval
+        self.units = [_Unit(unit) for unit in ([units] if isinstance(units, str) else units)]
+        if not self.units:
+            self.logger.warning("No units configured for the cgroups collector")
+        self.keys = tuple(f"cgroup_{unit.label}_{metric}" for unit in self.units
+                          for metric in ("cpu", "mem_mb", "mem_peak_mb", "io_read_bps", "io_write_bps"))
+        for unit in self.units:
+            self._open(unit, time.monotonic())
+
+    def _find(self, name):
+        root = self.cgroup_root
+        if "/" in name:
+            path = os.path.join(root, name.strip("/"))
+            return path if os.path.isdir(path) else None
+        if name == "-.slice":
+            return root
+        if name.endswith(".slice"):
+            # Slices nest by dash: a-b.slice lives in a.slice
+            parts = name[:-len(".slice")].split("-")
+            path = os.path.join(root, *("-".join(parts[:i + 1]) + ".slice" for i in range(len(parts))))
+            return path if os.path.isdir(path) else None
+        for pattern in ("system.slice", "", "*", "*/*", "*/*/*", "*/*/*/*"):
+            matches = glob.glob(os.path.join(root, pattern, glob.escape(name)))
+            if matches:
+                return sorted(matches)[0]
+        return None
+
+    def _open(self, unit, now):
+        unit.next_resolve = now + self.resolve_interval
+        unit.path = self._find(unit.name)
+        if unit.path is None:
+            self.logger.warning("cgroup of %s not found under %s", unit.name, self.cgroup_root)
+            return
+        for file_name in _FILES:
+            try:
+                unit.fds[file_name] = os.open(os.path.join(unit.path, file_name), os.O_RDONLY)
+            except OSError:
+                # memory.peak needs Linux 5.19; a controller may not be enabled for the unit
+                continue
+
+    def _close(self, unit):
+        for fd in unit.fds.values():
+            os.close(fd)
+        unit.fds = {}
+        unit.path = None
+        unit.usage = unit.io = unit.seen = None
+
+    def _read(self, unit, file_name):
+        fd = unit.fds.get(file_name)
+        if fd is None:
+            return None
+        return os.pread(fd, 65536, 0)
+
+    def _collect_unit(self, unit, now, values):
+        prefix = f"cgroup_{unit.label}"
+        for metric in ("cpu", "mem_mb", "mem_peak_mb", "io_read_bps", "io_write_bps"):
+            values[f"{prefix}_{metric}"] = None
+        if unit.path is None:
+            if now < unit.next_resolve:
+                return
+            self._open(unit, now)
+            if unit.path is None:
+                return
+
+        try:
+            cpu_stat = self._read(unit, "cpu.stat")
+            current = self._read(unit, "memory.current")
+            peak = self._read(unit, "memory.peak")
+            io_stat = self._read(unit, "io.stat")
+        except OSError as e:
+            # The unit stopped or restarted and its cgroup was removed
+            self.logger.warning("Lost the cgroup of %s: %s", unit.name, e)
+            self._close(unit)
+            return
+
+        if current is not None:
+            values[f"{prefix}_mem_mb"] = round(int(current) / 1048576, 1)
+        if peak is not None:
+            values[f"{prefix}_mem_peak_mb"] = round(int(peak) / 1048576, 1)
+
+        usage = None if cpu_stat is None else _parse_cpu_stat(cpu_stat)
+        io = None if io_stat is None else _parse_io_stat(io_stat)
+        elapsed = None if unit.seen is None else now - unit.seen
+        if elapsed:
+            if usage is not None and unit.usage is not None and usage >= unit.usage:
+                values[f"{prefix}_cpu"] = round((usage - unit.usage) / 1e6 / elapsed * 100, 1)
+            if io is not None and unit.io is not None and io[0] >= unit.io[0] and io[1] >= unit.io[1]:
+                values[f"{prefix}_io_read_bps"] = round((io[0] - unit.io[0]) / elapsed, 1)
+                values[f"{prefix}_io_write_bps"] = round((io[1] - unit.io[1]) / elapsed, 1)
+        unit.usage = usage
+        unit.io = io
+        unit.seen = now
+
+    def collect(self):
+        now = time.monotonic()
+        values = {}
+        for unit in self.units:
+            self._collect_unit(unit, now, values)
+        return values
+
+    def close(self):
+        for unit in self.units:
+            self._close(unit)
@@ -0,0 +1,36 @@
+"""
+cpu.py
+
+CPU utilisation collector, computed from /proc/stat deltas by CpuSampler.
+"""
+
+from monitoring_service.collectors.base import Collector, COST_CHEAP
+from monitoring_service.cpu_sampler import CpuSampler
+
+
+class CpuUsageCollector(Collector):
+    """
+    Reports overall CPU usage with iowait, steal and softirq shares, plus
+    `cpuN_usage` for each core.
+
+    Options:
+        stat_path (str): Path to the kernel CPU statistics file.
+    """
+
+    keys = ("cpu_usage", "cpu_iowait", "cpu_steal", "cpu_softirq")
+    cost = COST_CHEAP
+
+    def __init__(self, name, logger, stat_path="/proc/stat", **options):
+        super().__init__(name, logger, **options)
+        self.sampler = CpuSampler(stat_path)
+        # Declare the per-core keys too, so failed reads and the history cover them
+        try:
+            with open(stat_path, "r") as f:
+                cores = [line.split()[0] for line in f if line.startswith("cpu") and line[3:4].isdigit()]
+        except OSError as e:
+            self.logger.warning("Cannot read %s: %s", stat_path, e)
+            cores = []
+        self.keys = CpuUsageCollector.keys + tuple(f"{core}_usage" for core in cores)
+
+    def collect(self):
+        return self.sampler.sample()
@@ -0,0 +1,28 @@
+"""
+cpu_temp.py
+
+CPU temperature collector reading a single sysfs thermal zone.
+"""
+
+from monitoring_service.collectors.base import Collector, COST_CHEAP
+
+
+class CpuTempCollector(Collector):
+    """
+    Reports `cpu_temp` in degrees Celsius.
+
+    Options:
+        path (str): Thermal zone temperature file, in millidegrees.
+    """
+
+    keys = ("cpu_temp",)
+    cost = COST_CHEAP
+
+    def __init__(self, name, logger, path="/sys/class/thermal/thermal_zone0/temp", **options):
+        super().__init__(name, logger, **options)
+        self.path = path
+
+    def collect(self):
+        with open(self.path, "r") as f:
+            temp_str = f.readline()
+            return {"cpu_temp": float(temp_str) / 1000.0}
@@ -0,0 +1,29 @@
+"""
+disk.py
+
+Disk usage collector using psutil.
+"""
+
+import psutil
+
+from monitoring_service.collectors.base import Collector
+
+
+class DiskUsageCollector(Collector):
+    """
+    Reports `disk_usage` as a percentage of the filesystem at `mount_path`.
+    statvfs can block on a slow or hung filesystem, so this collector is not
+    run inline.
+
+    Options:
+        mount_path (str): Mount point to report on.
+    """
+
+    keys = ("disk_usage",)
+
+    def __init__(self, name, logger, mount_path="/", **options):
+        super().__init__(name, logger, **options)
+        self.mount_path = mount_path
+
+    def collect(self):
+        return {"disk_usage": psutil.disk_usage(self.mount_path).percent}
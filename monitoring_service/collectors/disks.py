@@ -0,0 +1,211 @@
+"""
+disks.py
+
+Multi-mount disk usage and per-device I/O throughput collector. The mount
+table is cached and only parsed again when the kernel flags
+/proc/self/mountinfo as changed; statvfs calls are time-boxed in a thread pool
+so a hung network mount reports None instead of stalling collection.
+"""
+
+import fnmatch
+import os
+import re
+import select
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from monitoring_service.collectors.base import Collector, COST_MODERATE
+
+# Kernel diskstats counts sectors of 512 bytes regardless of the device
+SECTOR_SIZE = 512
+
+# Filesystems without disk usage, skipped when a glob matches them
+PSEUDO_FILESYSTEMS = frozenset((
+    "autofs", "binfmt_misc", "bpf", "cgroup", "cgroup2", "configfs", "debugfs", "devpts", "devtmpfs",
+    "efivarfs", "fusectl", "hugetlbfs", "mqueue", "nsfs", "overlay", "proc", "pstore", "ramfs",
+    "rpc_pipefs", "securityfs", "squashfs", "sysfs", "tmpfs", "tracefs",
+))
+
+
+def _unescape(field):
+    # mountinfo escapes space, tab, newline and backslash as octal
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), field)
+
+
+def parse_mountinfo(text):
+    """
+    :param text: contents of /proc/<pid>/mountinfo
+    :return: dictionary of mount point to (device number "major:minor", filesystem type)
+    """
+    mounts = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if "-" not in fields:
+            continue
+        separator = fields.index("-")
+        mounts[_unescape(fields[4])] = (fields[2], fields[separator + 1])
+    return mounts
+
+
+def mount_label(mount_point):
+    """
+    :param mount_point: mount point path
+    :return: key-safe name for the mount, "root" for /
+    """
+    label = re.sub(r"[^0-9A-Za-z]+", "_", mount_point).strip("_")
+    return label or "root"
+
+
+class DisksCollector(Collector):
+    """
+    Reports `disk_usage_<mount>` for each matched mount, and for each device
+    `disk_<device>_read_bps`, `_write_bps`, `_read_iops` and `_write_iops`.
+    Throughput is omitted on the first collection, which only records the
+    counters.
+
+    Options:
+        mounts (list): Mount points or glob patterns. Globs skip pseudo filesystems.
+        devices (list): Device names or glob patterns from /proc/diskstats. Defaults
+            to the devices backing the matched mounts.
+        statvfs_timeout (float): Seconds to wait for statvfs before reporting None.
+        mountinfo_path (str): Path to the mount table.
+        diskstats_path (str): Path to the kernel disk statistics file.
+    """
+
+    cost = COST_MODERATE
+
+    def __init__(self, name, logger, mounts=("/",), devices=None, statvfs_timeout=2.0,
+                 mountinfo_path="/proc/self/mountinfo", diskstats_path="/proc/diskstats", **options):
+        super().__init__(name, logger, **options)
+        self.patterns = [mounts] if isinstance(mounts, str) else list(mounts)
+        self.device_patterns = None if devices is None else list(devices)
+        self.statvfs_timeout = statvfs_timeout
+        self.mounts = {}
+        self.devices = set()
+        self.keys = ()
+
+        self._mountinfo = open(mountinfo_path, "rb")
+        self._mount_poll = select.poll()
+        self._mount_poll.register(self._mountinfo, select.POLLPRI | select.POLLERR)
+        self._diskstats = open(diskstats_path, "rb")
+        self._counters = {}
+        self._last_read = None
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="statvfs")
+        self._pending = {}
+        self.refresh_mounts()
+
+    def refresh_mounts(self):
+        """
+        Parses the mount table again and re-resolves the watched mounts and devices.
+        """
+        self._mountinfo.seek(0)
+        table = parse_mountinfo(self._mountinfo.read().decode("utf-8", "replace"))
+
+        mounts = {}
+        for pattern in self.patterns:
+            if not any(char in pattern for char in "*?["):
+                if pattern in table:
+                    mounts[pattern] = table[pattern][0]
+                else:
+                    self.logger.warning("Mount point %s is not mounted", pattern)
+                continue
+            for mount_point, (device, fstype) in table.items():
+                if fnmatch.fnmatchcase(mount_point, pattern) and fstype not in PSEUDO_FILESYSTEMS:
+                    mounts[mount_point] = device
+        self.mounts = {mount_point: mounts[mount_point] for mount_point in sorted(mounts)}
+
+        stats = self._read_diskstats()
+        if self.device_patterns is None:
+            numbers = set(self.mounts.values())
+            self.devices = {name for name, (number, _) in stats.items() if number in numbers}
+        else:
+            self.devices = {name for name in stats
+                            if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.device_patterns)}
+
+        keys = [f"disk_usage_{mount_label(mount_point)}" for mount_point in self.mounts]
+        for device in sorted(self.devices):
+            keys += [f"disk_{device}_read_bps", f"disk_{device}_write_bps",
+                     f"disk_{device}_read_iops", f"disk_{device}_write_iops"]
+        self.keys = tuple(keys)
+
+    def _mounts_changed(self):
+        return any(events & (select.POLLPRI | select.POLLERR) for _, events in self._mount_poll.poll(0))
+
+    def _read_diskstats(self):
+        # name -> (device number, (reads, sectors read, writes, sectors written))
+        self._diskstats.seek(0)
+        stats = {}
+        for line in self._diskstats.read().decode("ascii", "replace").splitlines():
+            fields = line.split()
+            if len(fields) < 10:
+                continue
+            stats[fields[2]] = (f"{fields[0]}:{fields[1]}",
+                                (int(fields[3]), int(fields[5]), int(fields[7]), int(fields[9])))
+        return stats
+
+    @staticmethod
+    def _usage(mount_point):
+        st = os.statvfs(mount_point)
+        used = st.f_blocks - st.f_bfree
+        total = used + st.f_bavail
+        return round(used / total * 100, 1) if total else 0.0
+
+    def _collect_usage(self, values):
+        futures = {}
+        for mount_point in self.mounts:
+            key = f"disk_usage_{mount_label(mount_point)}"
+            pending = self._pending.get(mount_point)
+            if pending is not None and not pending.done():
+                values[key] = None
+                continue
+            self._pending.pop(mount_point, None)
+            futures[self._pool.submit(self._usage, mount_point)] = (mount_point, key)
+
+        done, not_done = wait(futures, timeout=self.statvfs_timeout)
+        for future, (mount_point, key) in futures.items():
+            if future in not_done:
+                self._pending[mount_point] = future
+                self.logger.warning("statvfs of %s did not return within %ss", mount_point, self.statvfs_timeout)
+                values[key] = None
+            elif future.exception() is not None:
+                self.logger.warning("statvfs of %s failed: %s", mount_point, future.exception())
+                values[key] = None
+            else:
+                values[key] = future.result()
+
+    def _collect_throughput(self, values):
+        now = time.monotonic()
+        stats = self._read_diskstats()
+        elapsed = None if self._last_read is None else now - self._last_read
+        self._last_read = now
+        for device in sorted(self.devices):
+            if device not in stats:
+                continue
+            counters = stats[device][1]
+            previous = self._counters.get(device)
+            self._counters[device] = counters
+            if previous is None or not elapsed:
+                continue
+            reads, sectors_read, writes, sectors_written = (current - last for current, last in
+                                                            zip(counters, previous))
+            if min(reads, sectors_read, writes, sectors_written) < 0:
+                # Counter wrapped or the device was replaced
+                continue
+            values[f"disk_{device}_read_bps"] = round(sectors_read * SECTOR_SIZE / elapsed, 1)
+            values[f"disk_{device}_write_bps"] = round(sectors_written * SECTOR_SIZE / elapsed, 1)
+            values[f"disk_{device}_read_iops"] = round(reads / elapsed, 2)
+            values[f"disk_{device}_write_iops"] = round(writes / elapsed, 2)
+
+    def collect(self):
+        if self._mounts_changed():
+            self.logger.warning("Mount table changed, refreshing watched mounts")
+            self.refresh_mounts()
+        values = {}
+        self._collect_usage(values)
+        self._collect_throughput(values)
+        return values
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._mountinfo.close()
+        self._diskstats.close()
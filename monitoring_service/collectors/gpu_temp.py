@@ -0,0 +1,39 @@
+"""
+gpu_temp.py
+
+GPU/SoC temperature collector backed by GpuTempReader.
+"""
+
+from monitoring_service.collectors.base import Collector, COST_CHEAP, COST_MODERATE
+from monitoring_service.gpu_temp import GpuTempReader
+
+
+class GpuTempCollector(Collector):
+    """
+    Reports `gpu_temp` in degrees Celsius, or None if the board has no GPU sensor.
+
+    The collector is cheap only when a sysfs sensor was found; the vcgencmd
+    fallback spawns a process, so it runs in the worker pool in async mode.
+
+    Options:
+        sys_root (str): Root of the sysfs tree to search for the sensor.
+        vcgencmd_path (str): Path to the vcgencmd binary used as a fallback.
+        vcgencmd_timeout (float): Seconds to wait for vcgencmd before reporting None.
+    """
+
+    keys = ("gpu_temp",)
+    cost = COST_MODERATE
+
+    def __init__(self, name, logger, sys_root="/sys", vcgencmd_path="/usr/bin/vcgencmd", vcgencmd_timeout=2.0,
+                 **options):
+        super().__init__(name, logger, **options)
+        self.reader = GpuTempReader(logger, sys_root=sys_root, vcgencmd_path=vcgencmd_path,
+                                    vcgencmd_timeout=vcgencmd_timeout)
+        if self.reader.reads_sysfs:
+            self.cost = COST_CHEAP
+
+    def collect(self):
+        return {"gpu_temp": self.reader.read()}
+
+    def close(self):
+        self.reader.close()
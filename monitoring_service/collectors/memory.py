@@ -0,0 +1,21 @@
+"""
+memory.py
+
+RAM usage collector using psutil.
+"""
+
+import psutil
+
+from monitoring_service.collectors.base import Collector, COST_CHEAP
+
+
+class MemoryCollector(Collector):
+    """
+    Reports `ram_usage` as a percentage of total memory.
+    """
+
+    keys = ("ram_usage",)
+    cost = COST_CHEAP
+
+    def collect(self):
+        return {"ram_usage": psutil.virtual_memory().percent}
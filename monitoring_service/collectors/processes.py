@@ -0,0 +1,181 @@
+"""
+processes.py
+
+Top-N process collector. Ranks processes by CPU and by resident memory from
+/proc/<pid>/stat, caching each process's name, command line and previous CPU
+ticks so a cycle costs one small read per process. The scan is capped by a
+time budget, and the collector reports its own CPU overhead.
+"""
+
+import bisect
+import heapq
+import os
+import time
+
+from monitoring_service.collectors.base import Collector, COST_MODERATE
+
+# Fields of /proc/<pid>/stat counted from the one after the command name
+_UTIME, _STIME, _STARTTIME, _RSS = 11, 12, 19, 21
+
+
+class _Process:
+    __slots__ = ("start", "name", "cmd", "ticks", "seen", "cpu", "rss")
+
+    def __init__(self, start, name):
+        self.start = start
+        self.name = name
+        self.cmd = None
+        self.ticks = None
+        self.seen = None
+        self.cpu = None
+        self.rss = 0
+
+
+class ProcessesCollector(Collector):
+    """
+    Reports, for rank i from 1 to `top_n`, `top_cpu_<i>_name`, `_pid`, `_cpu`
+    (percent of one core) and `_cmd` for the busiest processes, and
+    `top_rss_<i>_name`, `_pid`, `_rss_mb` and `_cmd` for the largest. Also
+    reports `processes_total`, `processes_scanned`, `processes_scan_ms` and
+    `processes_overhead_pct`, the collector's own CPU time as a percentage of
+    the time since its previous collection.
+
+    A process's CPU share is measured from the previous time it was scanned,
+    so it is first ranked on the collection after it appears; idle processes
+    are not ranked by CPU. When a scan runs past `budget`, it stops and the
+    next one resumes where it left off; the processes it did not reach keep
+    their previous figures.
+
+    Options:
+        top_n (int): Processes reported per ranking.
+        budget (float): Seconds a scan may take before it stops.
+        cmdline (bool): Report each ranked process's command line.
+        cmdline_length (int): Characters of the command line to report.
+        proc_path (str): Path to procfs.
+    """
+
+    cost = COST_MODERATE
+
+    def __init__(self, name, logger, top_n=5, budget=0.05, cmdline=True, cmdline_length=120,
+                 proc_path="/proc", **options):
+        super().__init__(name, logger, **options)
+        self.top_n = top_n
+        self.budget = budget
+        self.cmdline = cmdline
+        self.cmdline_length = cmdline_length
+        self.proc_path = proc_path
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._processes = {}
+        self._resume_pid = 0
+        self._last_collect = None
+
+        fields = {"cpu": ("name", "pid", "cpu"), "rss": ("name", "pid", "rss_mb")}
+        keys = []
+        for ranking, names in fields.items():
+            for rank in range(1, top_n + 1):
+                keys += [f"top_{ranking}_{rank}_{field}" for field in names + (("cmd",) if cmdline else ())]
+        self.keys = tuple(keys) + ("processes_total", "processes_scanned", "processes_scan_ms",
+                                   "processes_overhead_pct")
+
+    def _read_stat(self, pid, now):
+        try:
+            fd = os.open(f"{self.proc_path}/{pid}/stat", os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            data = os.read(fd, 1024)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+        if not data:
+            return None
+
+        # The command name may itself contain spaces and parentheses
+        name_end = data.rindex(b")")
+        fields = data[name_end + 2:].split()
+        start = int(fields[_STARTTIME])
+        process = self._processes.get(pid)
+        if process is None or process.start != start:
+            # New process, or its PID was reused since the last scan
+            process = _Process(start, data[data.index(b"(") + 1:name_end].decode("utf-8", "replace"))
+            self._processes[pid] = process
+
+        ticks = int(fields[_UTIME]) + int(fields[_STIME])
+        if process.ticks is not None and now > process.seen:
+            process.cpu = (ticks - process.ticks) / self.clock_ticks / (now - process.seen) * 100
+        process.ticks = ticks
+        process.seen = now
+        process.rss = int(fields[_RSS]) * self.page_size
+        return process
+
+    def _command(self, pid, process):
+        if process.cmd is None:
+            try:
+                with open(f"{self.proc_path}/{pid}/cmdline", "rb") as f:
+                    raw = f.read(self.cmdline_length * 4)
+                cmd = " ".join(raw.decode("utf-8", "replace").replace("\0", " ").split())
+            except OSError:
+                cmd = ""
+            # Kernel threads have no command line
+            process.cmd = cmd[:self.cmdline_length] or f"[{process.name}]"
+        return process.cmd
+
+    def _scan(self, pids, started):
+        deadline = started + self.budget
+        clock = time.monotonic
+        first = bisect.bisect_left(pids, self._resume_pid)
+        self._resume_pid = 0
+        scanned = 0
+        for pid in pids[first:] + pids[:first]:
+            if scanned and clock() >= deadline:
+                self._resume_pid = pid
+                break
+            if self._read_stat(pid, clock()) is None:
+                self._processes.pop(pid, None)
+            scanned += 1
+        return scanned
+
+    def _report(self, values, ranking, ranked, field, value):
+        for rank in range(1, self.top_n + 1):
+            prefix = f"top_{ranking}_{rank}"
+            if rank <= len(ranked):
+                pid, process = ranked[rank - 1]
+                values[f"{prefix}_name"] = process.name
+                values[f"{prefix}_pid"] = pid
+                values[f"{prefix}_{field}"] = round(value(process), 1)
+                if self.cmdline:
+                    values[f"{prefix}_cmd"] = self._command(pid, process)
+            else:
+                for name in ("name", "pid", field) + (("cmd",) if self.cmdline else ()):
+                    values[f"{prefix}_{name}"] = None
+
+    def collect(self):
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+
+        pids = sorted(int(entry) for entry in os.listdir(self.proc_path) if entry.isdigit())
+        for pid in self._processes.keys() - set(pids):
+            del self._processes[pid]
+        scanned = self._scan(pids, started)
+
+        processes = self._processes.items()
+        by_cpu = heapq.nlargest(self.top_n, ((pid, process) for pid, process in processes if process.cpu),
+                                key=lambda item: item[1].cpu)
+        by_rss = heapq.nlargest(self.top_n, processes, key=lambda item: item[1].rss)
+
+        values = {}
+        self._report(values, "cpu", by_cpu, "cpu", lambda process: process.cpu)
+        self._report(values, "rss", by_rss, "rss_mb", lambda process: process.rss / 1048576)
+        values["processes_total"] = len(pids)
+        values["processes_scanned"] = scanned
+        values["processes_scan_ms"] = round((time.monotonic() - started) * 1000, 2)
+
+        cpu_used = time.thread_time() - cpu_started
+        if self._last_collect is not None and started > self._last_collect:
+            values["processes_overhead_pct"] = round(cpu_used / (started - self._last_collect) * 100, 3)
+        else:
+            values["processes_overhead_pct"] = None
+        self._last_collect = started
+        return values
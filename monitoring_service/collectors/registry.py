@@ -0,0 +1,97 @@
+"""
+registry.py
+
+Defines the CollectorRegistry class, which maps collector names to collector
+classes without importing them. A collector's module is imported only when the
+collector is created, so a deployment pays the import and start-up cost of the
+collectors it enables and nothing else.
+
+Classes:
+    CollectorRegistry
+
+Usage:
+    registry = CollectorRegistry(logger)
+    collector = registry.create("disk_usage", {"mount_path": "/"})
+"""
+
+import importlib
+from importlib.metadata import entry_points
+
+ENTRY_POINT_GROUP = "monitoring_service.collectors"
+
+BUILTIN_COLLECTORS = {
+    "cpu_usage": "monitoring_service.collectors.cpu:CpuUsageCollector",
+    "cpu_temp": "monitoring_service.collectors.cpu_temp:CpuTempCollector",
+    "gpu_temp": "monitoring_service.collectors.gpu_temp:GpuTempCollector",
+    "ram_usage": "monitoring_service.collectors.memory:MemoryCollector",
+    "disk_usage": "monitoring_service.collectors.disk:DiskUsageCollector",
+    "disks": "monitoring_service.collectors.disks:DisksCollector",
+    "thermal": "monitoring_service.collectors.thermal:ThermalCollector",
+    "processes": "monitoring_service.collectors.processes:ProcessesCollector",
+    "cgroups": "monitoring_service.collectors.cgroups:CgroupCollector",
+}
+
+DEFAULT_COLLECTORS = ("cpu_usage", "cpu_temp", "gpu_temp", "ram_usage", "disk_usage")
+
+
+class CollectorRegistry:
+    """
+    Resolves collector names to classes and creates collector instances.
+
+    A name is resolved, in order, from the built-in table, from the
+    `monitoring_service.collectors` entry point group, or as a literal
+    "module:Class" reference.
+
+    Args:
+        logger (logging.Logger): Logger passed to each collector.
+        builtins (dict): Mapping of collector name to "module:Class".
+
+    Raises:
+        KeyError: If a collector name cannot be resolved.
+    """
+
+    def __init__(self, logger, builtins=None):
+        self.logger = logger
+        self.builtins = dict(BUILTIN_COLLECTORS if builtins is None else builtins)
+        self._entry_points = None
+
+    def _plugin_entry_points(self):
+        if self._entry_points is None:
+            self._entry_points = {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+        return self._entry_points
+
+    def available(self):
+        """
+        :return: sorted names of built-in and installed plugin collectors
+        """
+        return sorted(set(self.builtins) | set(self._plugin_entry_points()))
+
+    def load(self, name):
+        """
+        Imports and returns the collector class registered under `name`.
+
+        :param name: collector name or "module:Class" reference
+        :return: the collector class
+        """
+        reference = self.builtins.get(name)
+        if reference is None:
+            entry_point = self._plugin_entry_points().get(name)
+            if entry_point is not None:
+                return entry_point.load()
+            if ":" not in name:
+                raise KeyError(f"Unknown collector: {name}")
+            reference = name
+
+        module_name, _, class_name = reference.partition(":")
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def create(self, name, options=None):
+        """
+        Creates the collector registered under `name`.
+
+        :param name: collector name or "module:Class" reference
+        :param options: keyword arguments from the collector's config section
+        :return: collector instance
+        """
+        collector_class = self.load(name)
+        return collector_class(name, self.logger, **(options or {}))
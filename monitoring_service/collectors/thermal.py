@@ -0,0 +1,152 @@
+"""
+thermal.py
+
+Multi-zone temperature collector. Every thermal zone and hwmon temperature
+input is discovered once at start-up and kept open; each collection reads them
+all with `os.preadv` into one reusable buffer. The Raspberry Pi firmware's
+throttling and under-voltage flags are reported alongside when available.
+"""
+
+import fnmatch
+import glob
+import os
+import re
+
+from monitoring_service.collectors.base import Collector, COST_CHEAP
+
+# Bits of the firmware's get_throttled value, as documented for `vcgencmd get_throttled`
+THROTTLE_FLAGS = (
+    ("under_voltage", 0),
+    ("freq_capped", 1),
+    ("throttled", 2),
+    ("soft_temp_limit", 3),
+    ("under_voltage_occurred", 16),
+    ("freq_capped_occurred", 17),
+    ("throttled_occurred", 18),
+    ("soft_temp_limit_occurred", 19),
+)
+
+
+def sensor_key(*parts):
+    """
+    :param parts: thermal zone type, or hwmon name and label
+    :return: key-safe metric name prefixed with "temp_"
+    """
+    name = "_".join(re.sub(r"[^0-9a-z]+", "_", part.lower()).strip("_") for part in parts if part)
+    return f"temp_{name}"
+
+
+def _read_text(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class ThermalCollector(Collector):
+    """
+    Reports every temperature sensor in degrees Celsius under a key derived from
+    its thermal zone type, e.g. `temp_cpu_thermal`, or its hwmon name and label,
+    e.g. `temp_nvme_composite`. hwmon devices that mirror a thermal zone are
+    reported once. With a throttle source, also reports each flag in
+    THROTTLE_FLAGS as a boolean and `throttled_flags` as the raw value. A sensor
+    or throttle source that cannot be read reports None without affecting the rest.
+
+    Options:
+        sys_root (str): Root of the sysfs tree to search for sensors.
+        throttled_path (str): Firmware get_throttled file, or None to skip the throttle
+            flags. Defaults to the Raspberry Pi firmware file under `sys_root`.
+        exclude (list): Glob patterns of sensor keys not to report.
+    """
+
+    cost = COST_CHEAP
+
+    def __init__(self, name, logger, sys_root="/sys", throttled_path="", exclude=(), **options):
+        super().__init__(name, logger, **options)
+        self.sys_root = sys_root
+        self.exclude = list(exclude)
+        if throttled_path == "":
+            throttled_path = os.path.join(sys_root, "devices", "platform", "soc", "soc:firmware", "get_throttled")
+        self.sensors = {}
+        self._fds = []
+        self._throttled_fd = None
+        self._buffer = bytearray(32)
+
+        for key, path in self._discover().items():
+            try:
+                self._fds.append((key, os.open(path, os.O_RDONLY)))
+                self.sensors[key] = path
+            except OSError as e:
+                self.logger.warning("Cannot open temperature sensor %s: %s", path, e)
+        if not self.sensors:
+            self.logger.warning("No temperature sensors found in %s", sys_root)
+        if throttled_path and os.path.exists(throttled_path):
+            try:
+                self._throttled_fd = os.open(throttled_path, os.O_RDONLY)
+            except OSError as e:
+                self.logger.warning("Cannot open throttle flags %s: %s", throttled_path, e)
+
+        keys = list(self.sensors)
+        if self._throttled_fd is not None:
+            keys += [flag for flag, _ in THROTTLE_FLAGS] + ["throttled_flags"]
+        self.keys = tuple(keys)
+
+    def _discover(self):
+        sensors = {}
+        for zone in sorted(glob.glob(os.path.join(self.sys_root, "class", "thermal", "thermal_zone*")),
+                           key=lambda path: int(re.sub(r"\D", "", os.path.basename(path)) or 0)):
+            key = sensor_key(_read_text(os.path.join(zone, "type")) or os.path.basename(zone))
+            if key in sensors:
+                # Several zones of the same type, e.g. acpitz, are told apart by zone number
+                key = f"{key}_{os.path.basename(zone)[len('thermal_zone'):]}"
+            sensors[key] = os.path.join(zone, "temp")
+
+        for hwmon in sorted(glob.glob(os.path.join(self.sys_root, "class", "hwmon", "hwmon*"))):
+            device_name = _read_text(os.path.join(hwmon, "name")) or os.path.basename(hwmon)
+            inputs = sorted(glob.glob(os.path.join(hwmon, "temp*_input")),
+                            key=lambda path: int(re.sub(r"\D", "", os.path.basename(path)) or 0))
+            for path in inputs:
+                label = _read_text(path[:-len("_input")] + "_label")
+                if label is None and len(inputs) > 1:
+                    label = os.path.basename(path)[:-len("_input")]
+                key = sensor_key(device_name, label)
+                # A hwmon device registered by a thermal zone has the same name; keep the zone
+                sensors.setdefault(key, path)
+
+        return {key: path for key, path in sensors.items()
+                if not any(fnmatch.fnmatchcase(key, pattern) for pattern in self.exclude)}
+
+    def _read(self, fd):
+        length = os.preadv(fd, [self._buffer], 0)
+        return int(self._buffer[:length])
+
+    def collect(self):
+        values = {}
+        for key, fd in self._fds:
+            try:
+                values[key] = self._read(fd) / 1000.0
+            except (OSError, ValueError):
+                # Sensors of sleeping or removed devices fail with EIO/ENODATA
+                values[key] = None
+
+        if self._throttled_fd is not None:
+            try:
+                length = os.preadv(self._throttled_fd, [self._buffer], 0)
+                flags = int(self._buffer[:length], 16)
+            except (OSError, ValueError) as e:
+                # A failed firmware query must not cost the temperatures read above
+                self.logger.warning("Cannot read throttle flags: %s", e)
+                flags = None
+            for flag, bit in THROTTLE_FLAGS:
+                values[flag] = None if flags is None else bool(flags >> bit & 1)
+            values["throttled_flags"] = flags
+        return values
+
+    def close(self):
+        for _, fd in self._fds:
+            os.close(fd)
+        self._fds = []
+        if self._throttled_fd is not None:
+            os.close(self._throttled_fd)
+            self._throttled_fd = None
@@ -52,6 +52,23 @@ class ConfigLoader:
         self.device_name = self._get_device_name()
         self.mount_path = self._get_mount_path()
         self.log_level = self._get_log_level()
+        self.outbox = self._get_outbox()
+        self.sampling = self._get_sampling()
+        self.attributes = self._get_attributes()
+        self.intervals = self._get_intervals()
+        self.async_mode = self._get_async_mode()
+        self.collectors = self._get_collectors()
+        self.aggregation = self._get_aggregation()
+        self.deadband = self._get_deadband()
+        self.encoding = self._get_encoding()
+        self.logging = self._get_logging()
+        self.instrumentation = self._get_instrumentation()
+        self.connection = self._get_connection()
+        self.publish = self._get_publish()
+        self.history = self._get_history()
+        self.adaptive = self._get_adaptive()
+        self.sinks = self._get_sinks()
+        self.remote = self._get_remote()
 
     def as_dict(self):
         """
@@ -65,6 +82,23 @@ class ConfigLoader:
             "device_name": self.device_name,
             "mount_path": self.mount_path,
             "log_level": self.log_level,
+            "outbox": self.outbox,
+            "sampling": self.sampling,
+            "attributes": self.attributes,
+            "intervals": self.intervals,
+            "async": self.async_mode,
+            "collectors": self.collectors,
+            "aggregation": self.aggregation,
+            "deadband": self.deadband,
+            "encoding": self.encoding,
+            "logging": self.logging,
+            "instrumentation": self.instrumentation,
+            "connection": self.connection,
+            "publish": self.publish,
+            "history": self.history,
+            "adaptive": self.adaptive,
+            "sinks": self.sinks,
+            "remote": self.remote,
         }
 
     def _validate_or_raise(self):
@@ -115,3 +149,454 @@ class ConfigLoader:
         except (ValueError, TypeError) as e:
             self.logger.error(f"Invalid log_level value: {self.config.get('log_level')} ({e})")
             raise
+
+    def _get_outbox(self):
+        defaults = {
+            "enabled": True,
+            "path": "data/outbox.db",
+            "max_bytes": 10 * 1024 * 1024,
+            "replay_batch_size": 500,
+            "replay_interval": 1.0,
+        }
+        raw_value = self.config.get("outbox", {})
+        try:
+            outbox = {**defaults, **raw_value}
+            outbox["enabled"] = bool(outbox["enabled"])
+            outbox["path"] = str(outbox["path"])
+            outbox["max_bytes"] = int(outbox["max_bytes"])
+            outbox["replay_batch_size"] = int(outbox["replay_batch_size"])
+            outbox["replay_interval"] = float(outbox["replay_interval"])
+            if outbox["max_bytes"] < 1 or outbox["replay_batch_size"] < 1 or outbox["replay_interval"] < 0:
+                raise ValueError("Outbox sizes must be >= 1 and replay_interval >= 0")
+            return outbox
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid outbox value: {raw_value} ({e})")
+            raise
+
+    def _get_sampling(self):
+        defaults = {
+            "sample_period": self.poll_period,
+            "buffer_capacity": 3600,
+            "max_batch_samples": 100,
+            "max_batch_bytes": 8192,
+        }
+        raw_value = self.config.get("sampling", {})
+        try:
+            sampling = {**defaults, **raw_value}
+            sampling["sample_period"] = float(sampling["sample_period"])
+            sampling["buffer_capacity"] = int(sampling["buffer_capacity"])
+            sampling["max_batch_samples"] = int(sampling["max_batch_samples"])
+            sampling["max_batch_bytes"] = int(sampling["max_batch_bytes"])
+            if sampling["sample_period"] <= 0:
+                raise ValueError("sample_period must be > 0")
+            if sampling["sample_period"] > self.poll_period:
+                raise ValueError("sample_period must not exceed poll_period")
+            if min(sampling["buffer_capacity"], sampling["max_batch_samples"], sampling["max_batch_bytes"]) < 1:
+                raise ValueError("Buffer and batch sizes must be >= 1")
+            return sampling
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid sampling value: {raw_value} ({e})")
+            raise
+
+    def _get_attributes(self):
+        defaults = {
+            "ttls": {"ip_address": 300, "mac_address": 86400},
+            "full_resend_interval": 3600,
+        }
+        raw_value = self.config.get("attributes", {})
+        try:
+            attributes = {**defaults, **raw_value}
+            attributes["ttls"] = {
+                str(field): None if ttl is None else float(ttl)
+                for field, ttl in {**defaults["ttls"], **attributes["ttls"]}.items()
+            }
+            attributes["full_resend_interval"] = float(attributes["full_resend_interval"])
+            if attributes["full_resend_interval"] < 0:
+                raise ValueError("full_resend_interval must be >= 0")
+            return attributes
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.error(f"Invalid attributes value: {raw_value} ({e})")
+            raise
+
+    def _get_intervals(self):
+        raw_value = self.config.get("intervals", {})
+        try:
+            intervals = {str(name): float(interval) for name, interval in raw_value.items()}
+            for name, interval in intervals.items():
+                if interval <= 0:
+                    raise ValueError(f"Interval for {name} must be > 0")
+            return intervals
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.error(f"Invalid intervals value: {raw_value} ({e})")
+            raise
+
+    def _get_async_mode(self):
+        defaults = {
+            "enabled": False,
+            "max_workers": 4,
+            "collector_timeout": 5.0,
+            "collector_timeouts": {},
+        }
+        raw_value = self.config.get("async", {})
+        try:
+            async_mode = {**defaults, **raw_value}
+            async_mode["enabled"] = bool(async_mode["enabled"])
+            async_mode["max_workers"] = int(async_mode["max_workers"])
+            async_mode["collector_timeout"] = float(async_mode["collector_timeout"])
+            async_mode["collector_timeouts"] = {
+                str(name): float(timeout) for name, timeout in async_mode["collector_timeouts"].items()
+            }
+            if async_mode["max_workers"] < 1:
+                raise ValueError("max_workers must be >= 1")
+            timeouts = [async_mode["collector_timeout"], *async_mode["collector_timeouts"].values()]
+            if min(timeouts) <= 0:
+                raise ValueError("Collector timeouts must be > 0")
+            return async_mode
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.error(f"Invalid async value: {raw_value} ({e})")
+            raise
+
+    def _get_collectors(self):
+        raw_value = self.config.get("collectors")
+        if raw_value is None:
+            return None
+        try:
+            if isinstance(raw_value, list):
+                raw_value = {name: {} for name in raw_value}
+            collectors = {}
+            for name, options in raw_value.items():
+                if options is not None and not isinstance(options, dict):
+                    raise TypeError(f"Options for collector {name} must be an object")
+                collectors[str(name)] = dict(options or {})
+            return collectors
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.error(f"Invalid collectors value: {raw_value} ({e})")
+            raise
+
+    def _get_aggregation(self):
+        defaults = {
+            "enabled": False,
+            "window": self.poll_period,
+            "aggregates": ["min", "max", "mean", "last", "p95"],
+            "metrics": {},
+        }
+        raw_value = self.config.get("aggregation", {})
+        try:
+            aggregation = {**defaults, **raw_value}
+            aggregation["enabled"] = bool(aggregation["enabled"])
+            aggregation["window"] = float(aggregation["window"])
+            aggregation["aggregates"] = [str(name) for name in aggregation["aggregates"]]
+            aggregation["metrics"] = {
+                str(key): [str(name) for name in names] for key, names in aggregation["metrics"].items()
+            }
+            if aggregation["window"] < self.sampling["sample_period"]:
+                raise ValueError("window must be >= sample_period")
+            return aggregation
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.error(f"Invalid aggregation value: {raw_value} ({e})")
+            raise
+
+    def _get_deadband(self):
+        defaults = {
+            "enabled": False,
+            "heartbeat": 600,
+            "default": {"absolute": 0.0},
+            "metrics": {},
+        }
+        raw_value = self.config.get("deadband", {})
+
+        def settings(raw):
+            unknown = set(raw) - {"absolute", "relative", "heartbeat"}
+            if unknown:
+                raise ValueError(f"Unknown deadband settings: {', '.join(sorted(unknown))}")
+            parsed = {name: float(value) for name, value in raw.items()}
+            if any(value < 0 for value in parsed.values()):
+                raise ValueError("Deadband settings must be >= 0")
+            return parsed
+
+        try:
+            deadband = {**defaults, **raw_value}
+            deadband["enabled"] = bool(deadband["enabled"])
+            deadband["heartbeat"] = float(deadband["heartbeat"])
+            deadband["default"] = settings(deadband["default"])
+            deadband["metrics"] = {str(key): settings(raw) for key, raw in deadband["metrics"].items()}
+            if deadband["heartbeat"] <= 0:
+                raise ValueError("heartbeat must be > 0")
+            return deadband
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.error(f"Invalid deadband value: {raw_value} ({e})")
+            raise
+
+    def _get_encoding(self):
+        defaults = {
+            "aliases": {},
+            "precision": {},
+            "default_precision": None,
+            "backend": "auto",
+            "compress_threshold": None,
+        }
+        raw_value = self.config.get("encoding", {})
+        try:
+            encoding = {**defaults, **raw_value}
+            encoding["aliases"] = {str(key): str(alias) for key, alias in encoding["aliases"].items()}
+            encoding["precision"] = {str(key): int(digits) for key, digits in encoding["precision"].items()}
+            if encoding["default_precision"] is not None:
+                encoding["default_precision"] = int(encoding["default_precision"])
+            if encoding["compress_threshold"] is not None:
+                encoding["compress_threshold"] = int(encoding["compress_threshold"])
+                if encoding["compress_threshold"] < 1:
+                    raise ValueError("compress_threshold must be >= 1")
+            if encoding["backend"] not in ("auto", "orjson", "json"):
+                raise ValueError(f"Unknown backend {encoding['backend']}")
+            if len(set(encoding["aliases"].values())) != len(encoding["aliases"]):
+                raise ValueError("aliases must be unique")
+            return encoding
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.error(f"Invalid encoding value: {raw_value} ({e})")
+            raise
+
+    def _get_logging(self):
+        defaults = {
+            "queued": True,
+            "log_every": 1,
+        }
+        raw_value = self.config.get("logging", {})
+        try:
+            logging_config = {**defaults, **raw_value}
+            logging_config["queued"] = bool(logging_config["queued"])
+            logging_config["log_every"] = int(logging_config["log_every"])
+            if logging_config["log_every"] < 1:
+                raise ValueError("log_every must be >= 1")
+            return logging_config
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid logging value: {raw_value} ({e})")
+            raise
+
+    def _get_instrumentation(self):
+        defaults = {
+            "enabled": False,
+            "interval": 300,
+            "prometheus_port": None,
+            "prometheus_host": "127.0.0.1",
+        }
+        raw_value = self.config.get("instrumentation", {})
+        try:
+            instrumentation = {**defaults, **raw_value}
+            instrumentation["enabled"] = bool(instrumentation["enabled"])
+            instrumentation["interval"] = float(instrumentation["interval"])
+            if instrumentation["prometheus_port"] is not None:
+                instrumentation["prometheus_port"] = int(instrumentation["prometheus_port"])
+                if not 0 <= instrumentation["prometheus_port"] <= 65535:
+                    raise ValueError("prometheus_port must be between 0 and 65535")
+            instrumentation["prometheus_host"] = str(instrumentation["prometheus_host"])
+            if instrumentation["interval"] <= 0:
+                raise ValueError("interval must be > 0")
+            return instrumentation
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid instrumentation value: {raw_value} ({e})")
+            raise
+
+    def _get_connection(self):
+        defaults = {
+            "backoff_base": 1.0,
+            "backoff_max": 120.0,
+            "connect_timeout": 10.0,
+        }
+        raw_value = self.config.get("connection", {})
+        try:
+            connection = {**defaults, **raw_value}
+            for key in defaults:
+                connection[key] = float(connection[key])
+                if connection[key] <= 0:
+                    raise ValueError(f"{key} must be > 0")
+            if connection["backoff_max"] < connection["backoff_base"]:
+                raise ValueError("backoff_max must be >= backoff_base")
+            return connection
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid connection value: {raw_value} ({e})")
+            raise
+
+    def _get_publish(self):
+        defaults = {
+            "max_inflight": 20,
+            "ack_timeout": 30.0,
+        }
+        raw_value = self.config.get("publish", {})
+        try:
+            publish = {**defaults, **raw_value}
+            publish["max_inflight"] = int(publish["max_inflight"])
+            if publish["max_inflight"] < 0:
+                raise ValueError("max_inflight must be >= 0")
+            publish["ack_timeout"] = float(publish["ack_timeout"])
+            if publish["ack_timeout"] <= 0:
+                raise ValueError("ack_timeout must be > 0")
+            return publish
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid publish value: {raw_value} ({e})")
+            raise
+
+    def _get_history(self):
+        defaults = {
+            "enabled": False,
+            "path": "data/history.bin",
+            "capacity": 7 * 24 * 3600,
+            "rollup_period": 60,
+            "metrics": None,
+        }
+        raw_value = self.config.get("history", {})
+        try:
+            history = {**defaults, **raw_value}
+            history["enabled"] = bool(history["enabled"])
+            history["path"] = str(history["path"])
+            for key in ("capacity", "rollup_period"):
+                history[key] = int(history[key])
+                if history[key] < 1:
+                    raise ValueError(f"{key} must be >= 1")
+            if history["metrics"] is not None:
+                if not isinstance(history["metrics"], list):
+                    raise TypeError("metrics must be a list of metric names")
+                history["metrics"] = [str(metric) for metric in history["metrics"]]
+            return history
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid history value: {raw_value} ({e})")
+            raise
+
+    def _get_adaptive(self):
+        defaults = {
+            "enabled": False,
+            "min_interval": 5.0,
+            "max_interval": None,
+            "relax_after": 60.0,
+            "relax_factor": 2.0,
+            "jobs": None,
+            "rules": {},
+        }
+        raw_value = self.config.get("adaptive", {})
+
+        def rule(raw):
+            unknown = set(raw) - {"threshold", "hysteresis", "rate"}
+            if unknown:
+                raise ValueError(f"Unknown adaptive rule settings: {', '.join(sorted(unknown))}")
+            parsed = {name: float(value) for name, value in raw.items()}
+            if parsed.get("hysteresis", 0.0) < 0 or parsed.get("rate", 1.0) <= 0:
+                raise ValueError("hysteresis must be >= 0 and rate must be > 0")
+            return parsed
+
+        try:
+            adaptive = {**defaults, **raw_value}
+            adaptive["enabled"] = bool(adaptive["enabled"])
+            adaptive["min_interval"] = float(adaptive["min_interval"])
+            adaptive["max_interval"] = float(adaptive["max_interval"] or self.poll_period)
+            if not 0 < adaptive["min_interval"] <= adaptive["max_interval"]:
+                raise ValueError("intervals must satisfy 0 < min_interval <= max_interval")
+            adaptive["relax_after"] = float(adaptive["relax_after"])
+            if adaptive["relax_after"] <= 0:
+                raise ValueError("relax_after must be > 0")
+            adaptive["relax_factor"] = float(adaptive["relax_factor"])
+            if adaptive["relax_factor"] <= 1:
+                raise ValueError("relax_factor must be > 1")
+            if adaptive["jobs"] is not None:
+                adaptive["jobs"] = [str(job) for job in adaptive["jobs"]]
+            adaptive["rules"] = {str(key): rule(raw) for key, raw in adaptive["rules"].items()}
+            return adaptive
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.error(f"Invalid adaptive value: {raw_value} ({e})")
+            raise
+
+    def _get_sinks(self):
+        defaults = {
+            "enabled": False,
+            "queue_size": 100,
+            "drop_policy": "drop_oldest",
+            "retry_delay": 5.0,
+            "thingsboard": {"enabled": True},
+            "mqtt": {
+                "enabled": False,
+                "host": None,
+                "port": 1883,
+                "topic": f"monitoring/{self.device_name}/telemetry",
+                "qos": 0,
+                "username": None,
+                "password": None,
+            },
+            "file": {
+                "enabled": False,
+                "path": "data/telemetry.ndjson",
+                "format": "ndjson",
+                "max_bytes": None,
+            },
+        }
+        raw_value = self.config.get("sinks", {})
+        try:
+            unknown = set(raw_value) - set(defaults)
+            if unknown:
+                raise ValueError(f"Unknown sinks settings: {', '.join(sorted(unknown))}")
+            sinks = {**defaults, **raw_value}
+            sinks["enabled"] = bool(sinks["enabled"])
+            for name in ("thingsboard", "mqtt", "file"):
+                sink = {**defaults[name], **sinks[name]}
+                sink["enabled"] = bool(sink["enabled"])
+                # Queue settings default to the section-wide values
+                sink["queue_size"] = int(sink.get("queue_size", sinks["queue_size"]))
+                if sink["queue_size"] < 1:
+                    raise ValueError(f"{name} queue_size must be >= 1")
+                sink["drop_policy"] = str(sink.get("drop_policy", sinks["drop_policy"]))
+                if sink["drop_policy"] not in ("drop_oldest", "drop_newest"):
+                    raise ValueError(f"Unknown {name} drop_policy {sink['drop_policy']}")
+                sink["retry_delay"] = float(sink.get("retry_delay", sinks["retry_delay"]))
+                if sink["retry_delay"] <= 0:
+                    raise ValueError(f"{name} retry_delay must be > 0")
+                sinks[name] = sink
+
+            mqtt = sinks["mqtt"]
+            mqtt["port"] = int(mqtt["port"])
+            mqtt["qos"] = int(mqtt["qos"])
+            if mqtt["qos"] not in (0, 1, 2):
+                raise ValueError("mqtt qos must be 0, 1 or 2")
+            mqtt["topic"] = str(mqtt["topic"])
+            if mqtt["password"] is None:
+                mqtt["password"] = os.getenv("MQTT_SINK_PASSWORD")
+            if mqtt["enabled"] and not mqtt["host"]:
+                raise ValueError("mqtt host is required")
+
+            file_sink = sinks["file"]
+            file_sink["path"] = str(file_sink["path"])
+            if file_sink["format"] not in ("ndjson", "csv"):
+                raise ValueError(f"Unknown file format {file_sink['format']}")
+            if file_sink["max_bytes"] is not None:
+                file_sink["max_bytes"] = int(file_sink["max_bytes"])
+                if file_sink["max_bytes"] < 1:
+                    raise ValueError("file max_bytes must be >= 1")
+            return sinks
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid sinks value: {raw_value} ({e})")
+            raise
+
+    def _get_remote(self):
+        defaults = {
+            "enabled": True,
+            "command_interval": 1.0,
+            "min_poll_period": 1.0,
+            "max_poll_period": 86400.0,
+            "max_burst_rate": 20.0,
+            "max_burst_duration": 300.0,
+            "max_burst_samples": 10000,
+        }
+        raw_value = self.config.get("remote", {})
+        try:
+            remote = {**defaults, **raw_value}
+            remote["enabled"] = bool(remote["enabled"])
+            for key in ("command_interval", "min_poll_period", "max_poll_period", "max_burst_rate",
+                        "max_burst_duration"):
+                remote[key] = float(remote[key])
+                if remote[key] <= 0:
+                    raise ValueError(f"{key} must be > 0")
+            if remote["min_poll_period"] > remote["max_poll_period"]:
+                raise ValueError("min_poll_period must be <= max_poll_period")
+            remote["max_burst_samples"] = int(remote["max_burst_samples"])
+            if remote["max_burst_samples"] < 1:
+                raise ValueError("max_burst_samples must be >= 1")
+            return remote
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Invalid remote value: {raw_value} ({e})")
+            raise
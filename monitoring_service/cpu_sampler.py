@@ -0,0 +1,104 @@
+"""
+cpu_sampler.py
+
+Defines the CpuSampler class, which computes CPU utilisation from the difference
+between successive readings of the kernel's /proc/stat counters. Unlike
+`psutil.cpu_percent(interval=1)` it never sleeps: each call returns immediately
+with the utilisation since the previous call.
+
+Classes:
+    CpuSampler
+
+Usage:
+    sampler = CpuSampler()
+    stats = sampler.sample()
+"""
+
+# /proc/stat column order after the "cpuN" label
+_FIELDS = ("user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal")
+
+# Counters are unsigned 64-bit in the kernel
+_COUNTER_WRAP = 2 ** 64
+
+
+class CpuSampler:
+    """
+    Keeps the previous /proc/stat counters between calls and reports utilisation
+    from the delta since the last call.
+
+    The first call has no previous reading, so it reports the average since boot.
+    A counter that goes backwards is treated as a wrap if it was close to the top
+    of the counter range, otherwise as a reset to zero.
+
+    Args:
+        stat_path (str): Path to the kernel CPU statistics file.
+    """
+
+    def __init__(self, stat_path="/proc/stat"):
+        self.stat_path = stat_path
+        self._previous = {}
+        self._last = {}
+
+    def _read_counters(self):
+        counters = {}
+        with open(self.stat_path, "r") as f:
+            for line in f:
+                if not line.startswith("cpu"):
+                    break
+                parts = line.split()
+                values = [int(v) for v in parts[1:len(_FIELDS) + 1]]
+                values.extend([0] * (len(_FIELDS) - len(values)))
+                counters[parts[0]] = values
+        return counters
+
+    @staticmethod
+    def _delta(current, previous):
+        deltas = []
+        for cur, prev in zip(current, previous):
+            if cur >= prev:
+                deltas.append(cur - prev)
+            elif prev > _COUNTER_WRAP // 2:
+                deltas.append(cur + _COUNTER_WRAP - prev)
+            else:
+                deltas.append(cur)
+        return deltas
+
+    @staticmethod
+    def _percentages(deltas):
+        total = sum(deltas)
+        if total <= 0:
+            return None
+        fields = dict(zip(_FIELDS, deltas))
+        idle = fields["idle"] + fields["iowait"]
+        return {
+            "usage": round((total - idle) * 100.0 / total, 1),
+            "iowait": round(fields["iowait"] * 100.0 / total, 1),
+            "steal": round(fields["steal"] * 100.0 / total, 1),
+            "softirq": round(fields["softirq"] * 100.0 / total, 1),
+        }
+
+    def sample(self):
+        """
+        Reads /proc/stat and returns utilisation since the previous call.
+
+        :return: dictionary with overall `cpu_usage`, `cpu_iowait`, `cpu_steal` and
+            `cpu_softirq` percentages, plus `cpuN_usage` for each core.
+        """
+        current = self._read_counters()
+        stats = {}
+        for name, values in current.items():
+            previous = self._previous.get(name, [0] * len(_FIELDS))
+            percentages = self._percentages(self._delta(values, previous))
+            if percentages is None:
+                # No ticks elapsed since the last call, repeat the last reading
+                percentages = self._last.get(name, dict.fromkeys(("usage", "iowait", "steal", "softirq"), 0.0))
+            self._last[name] = percentages
+            if name == "cpu":
+                stats["cpu_usage"] = percentages["usage"]
+                stats["cpu_iowait"] = percentages["iowait"]
+                stats["cpu_steal"] = percentages["steal"]
+                stats["cpu_softirq"] = percentages["softirq"]
+            else:
+                stats[f"{name}_usage"] = percentages["usage"]
+        self._previous = current
+        return stats
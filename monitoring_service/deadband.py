@@ -0,0 +1,108 @@
+"""
+deadband.py
+
+Defines the DeadbandFilter class, which implements report-by-exception
+publishing: a metric is only passed on when it has moved far enough from the
+last value passed on, or when its heartbeat interval has elapsed so that
+dashboards never go stale.
+
+Classes:
+    DeadbandFilter
+
+Usage:
+    deadband = DeadbandFilter(metrics={"cpu_usage": {"absolute": 2.0}}, heartbeat=600)
+    changed = deadband.filter(telemetry)
+"""
+
+import time
+
+
+class DeadbandFilter:
+    """
+    Drops telemetry values that have not moved outside their deadband.
+
+    A numeric value passes when it differs from the last passed value by more
+    than `absolute`, or by more than `relative` times the magnitude of the last
+    passed value. Any other value passes when it is not equal to the last one.
+    Every key also passes once its heartbeat has elapsed since it last passed.
+
+    Settings per metric are `absolute`, `relative` and `heartbeat`; metrics
+    without their own entry use `default`.
+
+    A value becomes the reference as soon as it passes the filter, before it is
+    published. If it is then lost before publishing, e.g. overwritten in a full
+    sample buffer, call `forget()` with it so the key's next value passes instead
+    of being measured against a value that was never sent. Values lost after they
+    were handed to the client, such as samples discarded by a full outbox, still
+    count as sent until the heartbeat.
+
+    Args:
+        metrics (dict): Per-metric settings.
+        default (dict): Settings for metrics without an entry. By default only
+            unchanged values are dropped.
+        heartbeat (float): Seconds after which a key is passed regardless of change.
+        clock (callable): Monotonic clock returning seconds.
+    """
+
+    def __init__(self, metrics=None, default=None, heartbeat=600, clock=time.monotonic):
+        self.metrics = dict(metrics or {})
+        self.default = dict(default or {"absolute": 0.0})
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.suppressed = 0
+        self._last = {}
+
+    def _settings(self, key):
+        return self.metrics.get(key, self.default)
+
+    @staticmethod
+    def _moved(value, last, settings):
+        numeric = (isinstance(value, (int, float)) and isinstance(last, (int, float))
+                   and not isinstance(value, bool) and not isinstance(last, bool))
+        if not numeric:
+            return value != last
+        delta = abs(value - last)
+        absolute = settings.get("absolute")
+        relative = settings.get("relative")
+        if absolute is None and relative is None:
+            return delta > 0
+        if absolute is not None and delta > absolute:
+            return True
+        if relative is not None and delta > relative * abs(last):
+            return True
+        return False
+
+    def filter(self, values):
+        """
+        Returns the subset of `values` that should be published, and records
+        those values as the new reference points.
+
+        :param values: dictionary of telemetry data
+        :return: dictionary of telemetry data to publish, possibly empty
+        """
+        now = self.clock()
+        passed = {}
+        for key, value in values.items():
+            settings = self._settings(key)
+            previous = self._last.get(key)
+            if previous is not None:
+                last_value, last_time = previous
+                heartbeat = settings.get("heartbeat", self.heartbeat)
+                if now - last_time < heartbeat and not self._moved(value, last_value, settings):
+                    self.suppressed += 1
+                    continue
+            passed[key] = value
+            self._last[key] = (value, now)
+        return passed
+
+    def forget(self, values):
+        """
+        Drops the reference of every key whose reference is the given value, so
+        the key's next value passes regardless of its deadband.
+
+        :param values: dictionary of telemetry data that was never published
+        """
+        for key, value in values.items():
+            previous = self._last.get(key)
+            if previous is not None and previous[0] == value:
+                del self._last[key]
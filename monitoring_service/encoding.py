@@ -0,0 +1,154 @@
+"""
+encoding.py
+
+Defines the PayloadEncoder class, which shrinks telemetry payloads before they
+leave the device. Keys can be replaced with short aliases and floats rounded to
+a per-metric precision. Payloads the service stores or writes itself are
+serialised with orjson when it is installed and compressed with zlib once they
+pass a size threshold.
+
+ThingsBoard's MQTT API only accepts plain JSON, so payloads published to it
+are aliased and rounded but never compressed, and tb_device_mqtt serialises
+them with orjson whatever the backend.
+
+Classes:
+    PayloadEncoder
+
+Usage:
+    encoder = PayloadEncoder(aliases={"cpu_usage": "cpu"}, precision={"cpu_usage": 1})
+    values = encoder.transform(telemetry)
+    data = encoder.encode({"ts": ts, "values": values})
+"""
+
+import json
+import math
+import zlib
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with tb-mqtt-client
+    orjson = None
+
+BACKENDS = ("auto", "orjson", "json")
+
+# First byte of a zlib stream at any compression level; JSON objects start with "{"
+_ZLIB_HEADER = 0x78
+
+
+class PayloadEncoder:
+    """
+    Applies key aliases and rounding to telemetry values and serialises payloads.
+
+    Rounding only applies to floats; ints, strings, booleans and None pass
+    through unchanged, and so do NaN and infinities. A precision of None
+    leaves a value at full precision.
+
+    Args:
+        aliases (dict): Telemetry key to the shorter key published in its place.
+        precision (dict): Telemetry key to the number of decimal places kept.
+        default_precision (int): Decimal places for floats without their own
+            precision, None for full precision.
+        backend (str): "orjson", "json", or "auto" to use orjson when installed.
+            Only applies to what `encode()` and `encoded_size()` serialise, i.e.
+            batch sizing, the outbox and the sinks; tb_device_mqtt serialises
+            the telemetry it publishes with orjson regardless.
+        compress_threshold (int): Encoded size in bytes from which `encode()`
+            compresses, None to never compress.
+        compress_level (int): zlib compression level.
+
+    Raises:
+        ValueError: If the backend is unknown or orjson was requested but is not installed.
+    """
+
+    def __init__(self,
+                 aliases=None,
+                 precision=None,
+                 default_precision=None,
+                 backend="auto",
+                 compress_threshold=None,
+                 compress_level=6):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        if backend == "orjson" and orjson is None:
+            raise ValueError("JSON backend orjson requested but orjson is not installed")
+
+        self.aliases = dict(aliases or {})
+        self.precision = dict(precision or {})
+        self.default_precision = default_precision
+        if backend == "auto":
+            backend = "json" if orjson is None else "orjson"
+        self.backend = backend
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+
+    def transform(self, values):
+        """
+        Renames and rounds telemetry values.
+
+        :param values: dictionary of telemetry data
+        :return: new dictionary with aliased keys and rounded floats
+        """
+        aliases = self.aliases
+        precision = self.precision
+        default_precision = self.default_precision
+        result = {}
+        for key, value in values.items():
+            if type(value) is float:
+                digits = precision.get(key, default_precision)
+                if digits is not None:
+                    value = round(value, digits)
+                    # NaN and infinities have no int form and pass through unchanged
+                    if digits == 0 and math.isfinite(value):
+                        value = int(value)
+            result[aliases.get(key, key)] = value
+        return result
+
+    def transform_samples(self, samples):
+        """
+        :param samples: list of {"ts": ts, "values": values} dictionaries
+        :return: new list with each sample's values transformed
+        """
+        return [{"ts": sample["ts"], "values": self.transform(sample["values"])} for sample in samples]
+
+    def dumps(self, payload):
+        """
+        Serialises a payload to compact JSON.
+
+        :param payload: JSON-serialisable object
+        :return: UTF-8 encoded JSON bytes
+        """
+        if self.backend == "orjson":
+            return orjson.dumps(payload)
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    def encode(self, payload):
+        """
+        Serialises a payload, compressing it if it reaches `compress_threshold`.
+
+        :param payload: JSON-serialisable object
+        :return: JSON bytes, or zlib-compressed JSON bytes
+        """
+        data = self.dumps(payload)
+        if self.compress_threshold is not None and len(data) >= self.compress_threshold:
+            return zlib.compress(data, self.compress_level)
+        return data
+
+    def decode(self, data):
+        """
+        Reverses `encode()`, detecting compressed data by its zlib header.
+
+        :param data: bytes or str returned by `encode()` or `dumps()`
+        :return: the decoded payload
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)) and data and data[0] == _ZLIB_HEADER:
+            data = zlib.decompress(data)
+        if self.backend == "orjson":
+            return orjson.loads(data)
+        return json.loads(data)
+
+    def encoded_size(self, sample):
+        """
+        :param sample: {"ts": ts, "values": values} dictionary of untransformed values
+        :return: size in bytes of the sample once transformed and serialised
+        """
+        return len(self.dumps({"ts": sample["ts"], "values": self.transform(sample["values"])}))
@@ -0,0 +1,123 @@
+"""
+gpu_temp.py
+
+Defines the GpuTempReader class, which reads the GPU/SoC temperature without
+spawning a process on every poll. The sensor is located once at start-up and
+read through a file descriptor that stays open for the life of the reader.
+
+Classes:
+    GpuTempReader
+
+Usage:
+    reader = GpuTempReader(logger)
+    temp = reader.read()
+"""
+
+import glob
+import logging
+import os
+import subprocess
+
+# Sensor names that report the GPU/SoC die temperature, most specific first.
+# On Raspberry Pi boards the GPU shares the SoC sensor exposed as cpu-thermal,
+# which is the same value `vcgencmd measure_temp` reports.
+_SENSOR_NAMES = ("gpu", "soc", "cpu-thermal", "cpu_thermal")
+
+
+class GpuTempReader:
+    """
+    Reads the GPU/SoC temperature from sysfs, falling back to vcgencmd.
+
+    Thermal zones and hwmon devices under `sys_root` are searched once when the
+    reader is created. If a matching sensor is found its file is opened and kept
+    open; every read is a single `os.pread` on that descriptor. Only when no
+    sysfs sensor exists is `vcgencmd` used, and if the binary is missing as well
+    the reader logs that once and returns None from then on. A vcgencmd call that
+    does not finish within `vcgencmd_timeout` seconds is killed and reads as None.
+
+    Args:
+        logger (logging.Logger): Logger used to report a missing sensor.
+        sys_root (str): Root of the sysfs tree to search.
+        vcgencmd_path (str): Path to the vcgencmd binary used as a fallback.
+        vcgencmd_timeout (float): Seconds to wait for vcgencmd before giving up.
+    """
+
+    def __init__(self, logger=None, sys_root="/sys", vcgencmd_path="/usr/bin/vcgencmd", vcgencmd_timeout=2.0):
+        self.logger = logger or logging.getLogger(__name__)
+        self.sys_root = sys_root
+        self.vcgencmd_path = vcgencmd_path
+        self.vcgencmd_timeout = vcgencmd_timeout
+        self.source = None
+        self._fd = None
+
+        sensor_path = self._find_sensor()
+        if sensor_path is not None:
+            self._fd = os.open(sensor_path, os.O_RDONLY)
+            self.source = sensor_path
+        elif os.access(self.vcgencmd_path, os.X_OK):
+            self.source = self.vcgencmd_path
+        else:
+            self.logger.warning("No GPU temperature sensor in %s and %s is missing; gpu_temp will not be reported",
+                                self.sys_root, self.vcgencmd_path)
+
+    def _find_sensor(self):
+        candidates = {}
+        for zone in sorted(glob.glob(os.path.join(self.sys_root, "class", "thermal", "thermal_zone*"))):
+            name = self._read_name(os.path.join(zone, "type"))
+            candidates.setdefault(name, os.path.join(zone, "temp"))
+        for hwmon in sorted(glob.glob(os.path.join(self.sys_root, "class", "hwmon", "hwmon*"))):
+            name = self._read_name(os.path.join(hwmon, "name"))
+            candidates.setdefault(name, os.path.join(hwmon, "temp1_input"))
+
+        for name in _SENSOR_NAMES:
+            path = candidates.get(name)
+            if path is not None and os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def _read_name(path):
+        try:
+            with open(path, "r") as f:
+                return f.read().strip().lower()
+        except OSError:
+            return None
+
+    def _read_vcgencmd(self):
+        try:
+            result = subprocess.run([self.vcgencmd_path, "measure_temp"], capture_output=True, text=True,
+                                    timeout=self.vcgencmd_timeout)
+        except subprocess.TimeoutExpired:
+            self.logger.warning("%s did not answer within %ss", self.vcgencmd_path, self.vcgencmd_timeout)
+            return None
+        if result.returncode != 0:
+            return None
+        temp_str = result.stdout.strip()
+        return float(temp_str.split("=")[1].replace("'C", ""))
+
+    @property
+    def reads_sysfs(self):
+        """
+        :return: True if readings come from an open sysfs descriptor and never block.
+        """
+        return self._fd is not None
+
+    def read(self):
+        """
+        Reads the current GPU temperature.
+
+        :return: temperature in degrees Celsius, or None if no source is available.
+        """
+        if self._fd is not None:
+            return int(os.pread(self._fd, 16, 0)) / 1000.0
+        if self.source is None:
+            return None
+        return self._read_vcgencmd()
+
+    def close(self):
+        """
+        Closes the sensor file descriptor, if one is open.
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
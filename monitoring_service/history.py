@@ -0,0 +1,504 @@
+"""
+history.py
+
+Defines the TelemetryHistory class, a local, bounded record of every collected
+sample kept in a memory-mapped ring file, and the command line tool that
+queries it. It gives a record of recent telemetry on the device itself, for
+when the uplink is down or the device is being debugged on site.
+
+Each record has a fixed size: the timestamp in milliseconds followed by one
+float per metric, all stored as little-endian doubles, with NaN for a missing
+value. Appending packs the record straight into the mapped file, and the file
+never grows: once `capacity` records are stored the oldest is overwritten.
+
+Alongside the raw records the file keeps a second ring of rollups, the count,
+sum, minimum and maximum of every metric per `rollup_period`. A downsampled
+query whose step is a multiple of the rollup period reads the rollups and only
+touches raw records at the edges of its range, so a week of one-second samples
+is summarised from about ten thousand rollups rather than six hundred thousand
+records. Timestamps only increase, so ranges are found by binary search.
+
+Classes:
+    TelemetryHistory
+
+Usage:
+    history = TelemetryHistory("data/history.bin", ("cpu_usage", "cpu_temp"))
+    history.append(ts, {"cpu_usage": 12.5, "cpu_temp": 48.3})
+
+    python -m monitoring_service.history data/history.bin --last 24h --step 5m
+    python -m monitoring_service.history data/history.bin --start 2024-05-01T08:00 \\
+        --end 2024-05-01T09:00 --metrics cpu_temp --format csv --output cpu_temp.csv
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+# A week of samples at one per second
+DEFAULT_CAPACITY = 7 * 24 * 3600
+DEFAULT_ROLLUP_PERIOD = 60
+AGGREGATES = ("mean", "min", "max")
+
+_MAGIC = b"MPHIST01"
+_VERSION = 1
+# magic, version, metric count, capacity, rollup period (ms), rollup capacity
+_HEADER = struct.Struct("<8sIIQQQ")
+# raw head (next record written), raw count, rollup head, rollup count
+_POSITION = struct.Struct("<QQQQ")
+_POSITION_OFFSET = _HEADER.size
+_NAMES_OFFSET = _POSITION_OFFSET + _POSITION.size
+# The header and metric names are padded to one page so records stay aligned
+_HEADER_SIZE = 4096
+_NAN = float("nan")
+_INF = float("inf")
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+class _Ring:
+    # Fixed-size ring of records of `stride` doubles, indexed oldest first.
+    # Indexing returns a record's timestamp, so the ring can be bisected directly.
+    def __init__(self, values, stride, capacity):
+        self.values = values
+        self.stride = stride
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.values[((self.head - self.count + index) % self.capacity) * self.stride]
+
+    def advance(self):
+        slot = self.head
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return slot
+
+    def range(self, start, end):
+        low = 0 if start is None else bisect_left(self, start)
+        high = self.count if end is None else max(low, bisect_left(self, end, lo=low))
+        return low, high
+
+    def column(self, column, low, high):
+        # One strided slice per contiguous stretch of the ring
+        stride = self.stride
+        position = (self.head - self.count + low) % self.capacity
+        length = high - low
+        if position + length <= self.capacity:
+            return self.values[position * stride + column:(position + length) * stride:stride].tolist()
+        wrapped = position + length - self.capacity
+        return (self.values[position * stride + column:self.capacity * stride:stride].tolist()
+                + self.values[column:wrapped * stride:stride].tolist())
+
+
+def _buckets(ts, width):
+    # (bucket start, slice) for each run of timestamps in the same bucket of `width`
+    buckets = []
+    index = 0
+    while index < len(ts):
+        bucket = ts[index] - ts[index] % width
+        end = bisect_left(ts, bucket + width, index)
+        buckets.append((bucket, slice(index, end)))
+        index = end
+    return buckets
+
+
+class TelemetryHistory:
+    """
+    Fixed-size ring of timestamped samples, with per-period rollups, in a memory-mapped file.
+
+    The file records its metrics, capacity and rollup layout. Opening an existing
+    file with a different layout moves it aside to `<path>.old` and starts a new
+    history. Records are not flushed to disk one by one; the kernel writes the
+    mapped pages back, and `close()` flushes what is left. A sample older than the
+    newest one, e.g. after the clock was stepped back, is skipped and counted in
+    `skipped`, since queries rely on timestamps being in order.
+
+    Args:
+        path (str): Path of the history file. Parent directories are created.
+        metrics (tuple): Metric names stored in each record, in order. Other keys are ignored.
+        capacity (int): Number of raw records kept.
+        rollup_period (int): Seconds summarised by one rollup.
+        rollup_capacity (int): Number of rollups kept, defaults to enough to span
+            `capacity` records sampled once a second.
+        logger (logging.Logger): Logger used to report a replaced history file.
+        readonly (bool): Open an existing file for queries only. The layout is
+            then read from the file.
+
+    Raises:
+        ValueError: If the metric names do not fit the file header, or a
+            read-only file is not a history file.
+        OSError: If the file cannot be created or mapped.
+    """
+
+    def __init__(self, path, metrics=None, capacity=DEFAULT_CAPACITY, rollup_period=DEFAULT_ROLLUP_PERIOD,
+                 rollup_capacity=None, logger=None, readonly=False):
+        self.path = path
+        self.logger = logger
+        self.readonly = readonly
+        self.skipped = 0
+
+        if readonly:
+            with open(path, "rb") as f:
+                layout = self._read_layout(f.read(_HEADER_SIZE))
+            if layout is None:
+                raise ValueError(f"{path} is not a telemetry history file")
+            metrics, capacity, period_ms, rollup_capacity = layout
+        else:
+            metrics = tuple(metrics)
+            period_ms = int(rollup_period * 1000)
+            if rollup_capacity is None:
+                rollup_capacity = -(-capacity // rollup_period)
+            self._prepare(path, (metrics, capacity, period_ms, rollup_capacity))
+
+        self.metrics = metrics
+        self.capacity = capacity
+        self.rollup_period = period_ms
+        self.rollup_capacity = rollup_capacity
+        self._record = struct.Struct(f"<{1 + len(metrics)}d")
+        self._rollup_record = struct.Struct(f"<{1 + 4 * len(metrics)}d")
+        self._rollup_offset = _HEADER_SIZE + capacity * self._record.size
+
+        self._file = open(path, "rb" if readonly else "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+        view = memoryview(self._map)
+        self._views = (view[_HEADER_SIZE:self._rollup_offset].cast("d"), view[self._rollup_offset:].cast("d"))
+        view.release()
+        self._raw = _Ring(self._views[0], 1 + len(metrics), capacity)
+        self._rollups = _Ring(self._views[1], 1 + 4 * len(metrics), rollup_capacity)
+        self._load_positions()
+
+        self._bucket = None
+        self._totals = None
+        self._newest = self._raw[len(self._raw) - 1] if len(self._raw) else -_INF
+        if not readonly:
+            self._recover()
+
+    @staticmethod
+    def _read_layout(header):
+        if len(header) < _HEADER_SIZE:
+            return None
+        magic, version, metric_count, capacity, period_ms, rollup_capacity = _HEADER.unpack_from(header)
+        if magic != _MAGIC or version != _VERSION:
+            return None
+        names_end = header.index(b"\0", _NAMES_OFFSET)
+        metrics = tuple(json.loads(header[_NAMES_OFFSET:names_end]))
+        if len(metrics) != metric_count:
+            return None
+        return metrics, capacity, period_ms, rollup_capacity
+
+    def _prepare(self, path, layout):
+        metrics, capacity, period_ms, rollup_capacity = layout
+        names = json.dumps(metrics).encode("utf-8")
+        if _NAMES_OFFSET + len(names) >= _HEADER_SIZE:
+            raise ValueError(f"Too many history metrics to fit the file header: {len(metrics)}")
+
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                if self._read_layout(f.read(_HEADER_SIZE)) == layout:
+                    return
+            os.replace(path, path + ".old")
+            if self.logger is not None:
+                self.logger.warning("History layout changed, moved %s to %s.old and started a new one.", path, path)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(metrics), capacity, period_ms, rollup_capacity)
+                    + _POSITION.pack(0, 0, 0, 0) + names)
+            f.truncate(_HEADER_SIZE + 8 * (capacity * (1 + len(metrics)) + rollup_capacity * (1 + 4 * len(metrics))))
+
+    def _load_positions(self):
+        self._raw.head, self._raw.count, self._rollups.head, self._rollups.count = \
+            _POSITION.unpack_from(self._map, _POSITION_OFFSET)
+
+    def _save_positions(self):
+        _POSITION.pack_into(self._map, _POSITION_OFFSET,
+                            self._raw.head, self._raw.count, self._rollups.head, self._rollups.count)
+
+    def _recover(self):
+        # Rebuild the rollup of the current period, and any the last run did not finish, from raw records
+        start = None
+        if len(self._rollups):
+            start = self._rollups[len(self._rollups) - 1] + self.rollup_period
+        low, high = self._raw.range(start, None)
+        columns = [self._raw.column(column, low, high) for column in range(1 + len(self.metrics))]
+        for row in zip(*columns):
+            self._roll(row[0], row[1:])
+        self._save_positions()
+
+    def __len__(self):
+        if self.readonly:
+            self._load_positions()
+        return len(self._raw)
+
+    def append(self, ts, values):
+        """
+        Writes a sample over the oldest record once the history is full.
+
+        :param ts: collection timestamp in milliseconds since the epoch
+        :param values: dictionary of telemetry values; missing or non-numeric values are stored as NaN
+        """
+        if ts < self._newest:
+            self.skipped += 1
+            return
+        self._newest = ts
+        row = [_as_float(values.get(metric)) for metric in self.metrics]
+        self._record.pack_into(self._map, _HEADER_SIZE + self._raw.advance() * self._record.size, ts, *row)
+        self._roll(ts, row)
+        self._save_positions()
+
+    def _roll(self, ts, row):
+        bucket = ts - ts % self.rollup_period
+        if bucket != self._bucket:
+            if self._bucket is not None:
+                record = [self._bucket]
+                for totals in self._totals:
+                    record.extend(totals)
+                self._rollup_record.pack_into(self._map, self._rollup_offset
+                                              + self._rollups.advance() * self._rollup_record.size, *record)
+            self._bucket = bucket
+            self._totals = [[0, 0.0, _INF, -_INF] for _ in self.metrics]
+        for totals, value in zip(self._totals, row):
+            if value == value:
+                totals[0] += 1
+                totals[1] += value
+                if value < totals[2]:
+                    totals[2] = value
+                if value > totals[3]:
+                    totals[3] = value
+
+    def span(self):
+        """
+        :return: (oldest, newest) timestamp in milliseconds, or None if the history is empty
+        """
+        count = len(self)
+        if not count:
+            return None
+        return int(self._raw[0]), int(self._raw[count - 1])
+
+    def query(self, start=None, end=None, metrics=None, step=None, aggregate="mean"):
+        """
+        Reads the samples in a time range, optionally downsampled.
+
+        :param start: first timestamp in milliseconds to include, defaults to the oldest
+        :param end: timestamp in milliseconds to stop before, defaults to after the newest
+        :param metrics: metric names to read, defaults to all of them
+        :param step: if set, bucket width in milliseconds; each bucket with samples
+            becomes one row timestamped at its start, with NaN where a metric has
+            no value in it. Steps that are a multiple of the rollup period are
+            served from the rollups.
+        :param aggregate: how a bucket is reduced, one of AGGREGATES
+        :return: (list of timestamps, dictionary of metric name to list of values)
+        :raises KeyError: if a metric is not stored in the history
+        :raises ValueError: if the aggregate is unknown
+        """
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate {aggregate!r}, expected one of {', '.join(AGGREGATES)}")
+        metrics = self.metrics if metrics is None else tuple(metrics)
+        for metric in metrics:
+            if metric not in self.metrics:
+                raise KeyError(metric)
+        indexes = [self.metrics.index(metric) for metric in metrics]
+        if self.readonly:
+            self._load_positions()
+
+        if step is None:
+            low, high = self._raw.range(start, end)
+            return ([int(ts) for ts in self._raw.column(0, low, high)],
+                    {metric: self._raw.column(index + 1, low, high) for metric, index in zip(metrics, indexes)})
+
+        ts, totals = self._totals_between(start, end, indexes, step)
+        result = {}
+        for metric, (counts, sums, minimums, maximums) in zip(metrics, totals):
+            if aggregate == "mean":
+                values = [total / count if count else _NAN for count, total in zip(counts, sums)]
+            else:
+                values = [value if count else _NAN
+                          for count, value in zip(counts, minimums if aggregate == "min" else maximums)]
+            result[metric] = values
+        return [int(bucket) for bucket in ts], result
+
+    def _totals_between(self, start, end, indexes, step):
+        # Rollups cover whole periods in the middle of the range, raw records the rest
+        period = self.rollup_period
+        rollups = self._rollups
+        if step % period or not len(rollups):
+            return self._merge([self._raw_totals(start, end, indexes, step)], step)
+        first = rollups[0] if start is None else max(rollups[0], -(-start // period) * period)
+        last = rollups[len(rollups) - 1] + period
+        if end is not None:
+            last = min(last, end - end % period)
+        if first >= last:
+            return self._merge([self._raw_totals(start, end, indexes, step)], step)
+
+        low, high = rollups.range(first, last)
+        middle = (rollups.column(0, low, high),
+                  [[rollups.column(1 + 4 * index + field, low, high) for field in range(4)] for index in indexes])
+        return self._merge([self._raw_totals(start, first, indexes, period), middle,
+                            self._raw_totals(last, end, indexes, period)], step)
+
+    def _raw_totals(self, start, end, indexes, width):
+        low, high = self._raw.range(start, end)
+        ts = self._raw.column(0, low, high)
+        buckets = _buckets(ts, width)
+        totals = []
+        for index in indexes:
+            values = self._raw.column(index + 1, low, high)
+            chunks = [values[part] for _, part in buckets]
+            sums = list(map(sum, chunks))
+            counts = list(map(len, chunks))
+            minimums = list(map(min, chunks))
+            maximums = list(map(max, chunks))
+            for position, total in enumerate(sums):
+                if total != total:
+                    # Only drop NaNs from the rare bucket holding one
+                    present = [value for value in chunks[position] if value == value]
+                    counts[position] = len(present)
+                    sums[position] = sum(present)
+                    minimums[position] = min(present, default=_INF)
+                    maximums[position] = max(present, default=-_INF)
+            totals.append([counts, sums, minimums, maximums])
+        return [bucket for bucket, _ in buckets], totals
+
+    @staticmethod
+    def _merge(parts, step):
+        ts = []
+        totals = None
+        for part_ts, part_totals in parts:
+            ts.extend(part_ts)
+            if totals is None:
+                totals = [[list(field) for field in metric] for metric in part_totals]
+            else:
+                for metric, part_metric in zip(totals, part_totals):
+                    for field, part_field in zip(metric, part_metric):
+                        field.extend(part_field)
+        buckets = _buckets(ts, step)
+        if len(buckets) == len(ts):
+            return [bucket for bucket, _ in buckets], totals
+        merged = []
+        for counts, sums, minimums, maximums in totals:
+            merged.append([[sum(counts[part]) for _, part in buckets],
+                           [sum(sums[part]) for _, part in buckets],
+                           [min(minimums[part]) for _, part in buckets],
+                           [max(maximums[part]) for _, part in buckets]])
+        return [bucket for bucket, _ in buckets], merged
+
+    def close(self):
+        """
+        Flushes written records and unmaps the file.
+        """
+        for view in self._views:
+            view.release()
+        if not self.readonly:
+            self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+def _parse_time(value):
+    try:
+        return float(value) * 1000
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp() * 1000
+
+
+def _parse_duration(value):
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]] * 1000
+    return float(value) * 1000
+
+
+def _rows(ts, columns):
+    names = list(columns)
+    for index, timestamp in enumerate(ts):
+        values = [columns[name][index] for name in names]
+        yield timestamp, [None if value != value else value for value in values]
+
+
+def _write(out, output_format, ts, columns):
+    names = list(columns)
+    if output_format == "json":
+        json.dump([{"ts": timestamp, "values": dict(zip(names, values))} for timestamp, values in _rows(ts, columns)],
+                  out)
+        out.write("\n")
+    elif output_format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["ts", *names])
+        for timestamp, values in _rows(ts, columns):
+            writer.writerow([timestamp, *["" if value is None else value for value in values]])
+    else:
+        out.write("\t".join(["time".ljust(19), *names]) + "\n")
+        for timestamp, values in _rows(ts, columns):
+            moment = datetime.fromtimestamp(timestamp / 1000).isoformat(timespec="seconds")
+            out.write("\t".join([moment, *["-" if value is None else f"{value:.6g}" for value in values]]) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="history file")
+    parser.add_argument("--info", action="store_true", help="print the stored metrics, capacity and time span")
+    parser.add_argument("--start", help="ISO time or epoch seconds to start at")
+    parser.add_argument("--end", help="ISO time or epoch seconds to stop before")
+    parser.add_argument("--last", help="duration before now to query, e.g. 90s, 30m, 24h or 7d")
+    parser.add_argument("--metrics", help="comma separated metrics, defaults to all")
+    parser.add_argument("--step", help="downsample into buckets of this duration, e.g. 60s or 1h")
+    parser.add_argument("--aggregate", choices=AGGREGATES, default="mean", help="how each bucket is reduced")
+    parser.add_argument("--format", choices=("table", "csv", "json"), default="table")
+    parser.add_argument("--output", help="file to export to, defaults to stdout")
+    args = parser.parse_args(argv)
+
+    history = TelemetryHistory(args.path, readonly=True)
+    try:
+        if args.info:
+            span = history.span()
+            info = {"metrics": list(history.metrics), "capacity": history.capacity,
+                    "rollup_period_s": history.rollup_period / 1000, "records": len(history),
+                    "oldest": None, "newest": None}
+            if span is not None:
+                info["oldest"], info["newest"] = (datetime.fromtimestamp(ts / 1000).isoformat(timespec="seconds")
+                                                  for ts in span)
+            print(json.dumps(info, indent=2))
+            return info
+
+        start = _parse_time(args.start) if args.start else None
+        end = _parse_time(args.end) if args.end else None
+        if args.last:
+            start = time.time() * 1000 - _parse_duration(args.last)
+        metrics = args.metrics.split(",") if args.metrics else None
+        step = _parse_duration(args.step) if args.step else None
+        try:
+            ts, columns = history.query(start, end, metrics, step, args.aggregate)
+        except KeyError as e:
+            parser.error(f"unknown metric {e}, stored metrics are {', '.join(history.metrics)}")
+
+        if args.output:
+            with open(args.output, "w", newline="") as out:
+                _write(out, args.format, ts, columns)
+        else:
+            _write(sys.stdout, args.format, ts, columns)
+        return ts, columns
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+inflight.py
+
+Defines the InflightWindow class and the PublishWindowFull exception, which
+bound the number of QoS 1 telemetry messages handed to the MQTT client but not
+yet acknowledged by the broker.
+
+Without a bound, a slow broker lets messages pile up in the paho client's
+unbounded queue. With one, the publisher stops at the window size and the
+samples it could not send wait in the agent's bounded sample buffer, where
+they are coalesced into fewer, larger batches once acknowledgements resume.
+
+Classes:
+    InflightWindow
+    PublishWindowFull
+
+Usage:
+    window = InflightWindow(max_inflight=20)
+    if window.full:
+        raise PublishWindowFull()
+    window.track(mids, samples)
+    window.ack(mid)
+"""
+
+import threading
+import time
+
+from monitoring_service.instrumentation import LatencyHistogram
+
+
+class PublishWindowFull(Exception):
+    """
+    Raised when a batch cannot be published because the in-flight window is full.
+    """
+
+
+class InflightWindow:
+    """
+    Tracks published messages by MQTT message id until the broker acknowledges them.
+
+    One publish may be split into several messages; it counts as delivered once
+    every one of its message ids is acknowledged, and as failed if any of them
+    is rejected or the whole publish is not acknowledged within `ack_timeout`.
+    The samples of a failed publish are returned to the caller so they can be
+    stored and resent.
+
+    Args:
+        max_inflight (int): Publishes allowed in flight at once, 0 for no limit.
+        ack_timeout (float): Seconds after which an unacknowledged publish is failed.
+        clock (callable): Monotonic clock returning seconds.
+    """
+
+    # Acknowledgements can arrive before the publish is tracked; this many are remembered
+    _MAX_EARLY_ACKS = 256
+
+    def __init__(self, max_inflight=20, ack_timeout=30.0, clock=time.monotonic):
+        self.max_inflight = max_inflight
+        self.ack_timeout = ack_timeout
+        self.clock = clock
+        self.delivered = 0
+        self.failed = 0
+        self.latency = LatencyHistogram()
+        self._publishes = {}
+        self._by_mid = {}
+        self._early_acks = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._publishes)
+
+    @property
+    def full(self):
+        """
+        :return: True if no further publish should be handed to the client
+        """
+        return bool(self.max_inflight) and len(self._publishes) >= self.max_inflight
+
+    def track(self, mids, samples):
+        """
+        Starts tracking a publish.
+
+        :param mids: MQTT message ids the publish was split into
+        :param samples: samples carried by the publish, returned if it fails
+        :return: the samples if the broker already rejected the publish, otherwise an empty list
+        """
+        with self._lock:
+            now = self.clock()
+            publish_id = self._next_id
+            self._next_id += 1
+            pending = set()
+            for mid in mids:
+                early = self._early_acks.pop(mid, None)
+                if early is None:
+                    pending.add(mid)
+                elif not early:
+                    self.failed += 1
+                    return list(samples)
+            if not pending:
+                self.delivered += 1
+                self.latency.observe(0.0)
+                return []
+            self._publishes[publish_id] = [now, pending, samples]
+            for mid in pending:
+                self._by_mid[mid] = publish_id
+            return []
+
+    def ack(self, mid, success=True):
+        """
+        Records the broker's acknowledgement of one message.
+
+        :param mid: MQTT message id
+        :param success: False if the broker rejected the message
+        :return: samples of the publish if it failed, otherwise an empty list
+        """
+        with self._lock:
+            publish_id = self._by_mid.pop(mid, None)
+            if publish_id is None:
+                self._early_acks[mid] = success
+                if len(self._early_acks) > self._MAX_EARLY_ACKS:
+                    del self._early_acks[next(iter(self._early_acks))]
+                return []
+            sent_at, pending, samples = self._publishes[publish_id]
+            if not success:
+                return self._fail(publish_id)
+            pending.discard(mid)
+            if not pending:
+                del self._publishes[publish_id]
+                self.delivered += 1
+                self.latency.observe(self.clock() - sent_at)
+            return []
+
+    def expire(self):
+        """
+        Fails every publish not acknowledged within `ack_timeout`.
+
+        :return: samples of the expired publishes
+        """
+        with self._lock:
+            deadline = self.clock() - self.ack_timeout
+            expired = [publish_id for publish_id, (sent_at, _, _) in self._publishes.items() if sent_at <= deadline]
+            return [sample for publish_id in expired for sample in self._fail(publish_id)]
+
+    def fail_all(self):
+        """
+        Fails every publish in flight, e.g. because the connection was lost and
+        the client discarded its queue.
+
+        :return: samples of the failed publishes
+        """
+        with self._lock:
+            return [sample for publish_id in list(self._publishes) for sample in self._fail(publish_id)]
+
+    def _fail(self, publish_id):
+        _, pending, samples = self._publishes.pop(publish_id)
+        for mid in pending:
+            self._by_mid.pop(mid, None)
+        self.failed += 1
+        return list(samples)
+
+    def stats(self):
+        """
+        :return: dictionary of in-flight count, delivered and failed publishes, and
+            delivery latency percentiles in milliseconds
+        """
+        with self._lock:
+            stats = {
+                "inflight": len(self._publishes),
+                "delivered": self.delivered,
+                "delivery_failures": self.failed,
+            }
+            p50 = self.latency.quantile(0.5)
+            if p50 is not None:
+                stats["delivery_p50_ms"] = p50 * 1000
+                stats["delivery_p95_ms"] = self.latency.quantile(0.95) * 1000
+            return stats
@@ -0,0 +1,279 @@
+"""
+instrumentation.py
+
+Defines the LatencyHistogram, Instrumentation and MetricsServer classes, which
+let the agent measure itself: how long each collector, publish and cycle takes,
+how often publishing fails and how deep its queues are.
+
+Histograms use fixed buckets, so observing a latency is a binary search and an
+increment with no allocation. The measurements are published periodically as
+`agent_*` telemetry and can also be served in the Prometheus text format on a
+local port.
+
+Classes:
+    LatencyHistogram
+    Instrumentation
+    MetricsServer
+
+Usage:
+    instrumentation = Instrumentation()
+    with instrumentation.time("publish"):
+        client.send_telemetry_batch(batch)
+    client.send_telemetry(instrumentation.telemetry())
+
+    server = MetricsServer(instrumentation, port=9101)
+    server.start()
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, from a sysfs read to a hung network mount
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket histogram of latencies in seconds.
+
+    Keeps cumulative counts for Prometheus and a second set of counts for the
+    current reporting window, which `take_window()` returns and resets.
+
+    Args:
+        buckets (tuple): Sorted bucket upper bounds in seconds. Larger values
+            fall into an implicit +Inf bucket.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "total", "_window_counts", "_window_max")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._window_counts = [0] * (len(self.buckets) + 1)
+        self._window_max = 0.0
+
+    def observe(self, seconds):
+        """
+        :param seconds: latency to record
+        """
+        index = bisect_left(self.buckets, seconds)
+        self.counts[index] += 1
+        self._window_counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self._window_max:
+            self._window_max = seconds
+
+    def quantile(self, q, counts=None, maximum=None):
+        """
+        Estimates a quantile as the upper bound of the bucket holding it.
+
+        :param q: quantile between 0 and 1
+        :param counts: bucket counts to use, defaults to the cumulative counts
+        :param maximum: value reported for the +Inf bucket, defaults to the largest bound
+        :return: the estimate in seconds, or None if there are no observations
+        """
+        counts = self.counts if counts is None else counts
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(self.buckets):
+                    return self.buckets[index]
+                break
+        return self.buckets[-1] if maximum is None else maximum
+
+    def take_window(self):
+        """
+        Returns the counts observed since the last call and starts a new window.
+
+        :return: (bucket counts, largest latency) of the window
+        """
+        counts, maximum = self._window_counts, self._window_max
+        self._window_counts = [0] * len(counts)
+        self._window_max = 0.0
+        return counts, maximum
+
+
+class Instrumentation:
+    """
+    Thread-safe registry of the agent's latency histograms, counters and gauges.
+
+    Args:
+        buckets (tuple): Bucket upper bounds in seconds used for every histogram.
+        clock (callable): Monotonic clock returning seconds.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, clock=time.perf_counter):
+        self.buckets = tuple(buckets)
+        self.clock = clock
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        """
+        :param name: histogram name, e.g. "collector_cpu_usage"
+        :param seconds: latency to record
+        """
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name):
+        """
+        Records how long the enclosed block took, including when it raises.
+
+        :param name: histogram name
+        """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self.clock() - start)
+
+    def increment(self, name, amount=1):
+        """
+        :param name: counter name
+        :param amount: amount to add
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        """
+        :param name: gauge name
+        :param value: current value
+        """
+        with self._lock:
+            self.gauges[name] = value
+
+    def telemetry(self):
+        """
+        Summarises the measurements as `agent_*` telemetry and starts a new window.
+
+        Latencies are reported in milliseconds over the window since the last
+        call, as `agent_<name>_p50_ms`, `_p95_ms`, `_max_ms` and `_count`.
+        Counters are cumulative and gauges are their latest value.
+
+        :return: dictionary of telemetry data
+        """
+        data = {}
+        with self._lock:
+            for name, histogram in self.histograms.items():
+                counts, maximum = histogram.take_window()
+                data[f"agent_{name}_count"] = sum(counts)
+                if not data[f"agent_{name}_count"]:
+                    continue
+                data[f"agent_{name}_p50_ms"] = histogram.quantile(0.5, counts, maximum) * 1000
+                data[f"agent_{name}_p95_ms"] = histogram.quantile(0.95, counts, maximum) * 1000
+                data[f"agent_{name}_max_ms"] = round(maximum * 1000, 3)
+            for name, value in self.counters.items():
+                data[f"agent_{name}"] = value
+            for name, value in self.gauges.items():
+                data[f"agent_{name}"] = value
+        return data
+
+    def prometheus(self):
+        """
+        Renders the cumulative measurements in the Prometheus text exposition format.
+
+        :return: the exposition text
+        """
+        lines = []
+        with self._lock:
+            if self.histograms:
+                lines.append("# TYPE monitoring_agent_latency_seconds histogram")
+            for name, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'monitoring_agent_latency_seconds_bucket{{operation="{name}",le="{bound}"}} '
+                                 f'{cumulative}')
+                lines.append(f'monitoring_agent_latency_seconds_bucket{{operation="{name}",le="+Inf"}} '
+                             f'{histogram.count}')
+                lines.append(f'monitoring_agent_latency_seconds_sum{{operation="{name}"}} {histogram.total}')
+                lines.append(f'monitoring_agent_latency_seconds_count{{operation="{name}"}} {histogram.count}')
+            for name, value in self.counters.items():
+                lines.append(f"# TYPE monitoring_agent_{name}_total counter")
+                lines.append(f"monitoring_agent_{name}_total {value}")
+            for name, value in self.gauges.items():
+                lines.append(f"# TYPE monitoring_agent_{name} gauge")
+                lines.append(f"monitoring_agent_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Serves `Instrumentation.prometheus()` over HTTP from a daemon thread.
+
+    Binds to localhost by default so the endpoint is only reachable from the
+    device itself, e.g. by a local Prometheus agent or node exporter proxy.
+
+    Args:
+        instrumentation (Instrumentation): Measurements to serve.
+        port (int): TCP port to listen on, 0 for any free port.
+        host (str): Address to bind to.
+
+    Raises:
+        OSError: If the address cannot be bound.
+    """
+
+    def __init__(self, instrumentation, port, host="127.0.0.1"):
+        self.instrumentation = instrumentation
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path not in ("/", "/metrics"):
+                    handler.send_error(404)
+                    return
+                body = instrumentation.prometheus().encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        """
+        :return: the port the server is bound to
+        """
+        return self._server.server_address[1]
+
+    def start(self):
+        """
+        Starts serving in a daemon thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Stops serving and releases the port.
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
@@ -3,14 +3,20 @@ logging_setup.py
 
 Configures application logging with both console and file handlers.
 Log level is dynamically set based on the configuration.
+
+Records are handed to a QueueHandler and written by a QueueListener on a
+background thread, so a slow SD card never stalls the monitoring loop. The
+listener is stopped, flushing any queued records, when the process exits.
 """
 
+import atexit
 import os
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 
-def setup_logging(log_dir="log", log_file_name="monitoring_service.log", log_level="INFO"):
+def setup_logging(log_dir="log", log_file_name="monitoring_service.log", log_level="INFO", queued=True):
     """
     Sets up logging with both console and rotating file handlers.
 
@@ -18,6 +24,7 @@ def setup_logging(log_dir="log", log_file_name="monitoring_service.log", log_lev
         log_dir (str): Directory where log files are stored.
         log_file_name (str): Name of the log file.
         log_level (str): Logging level (e.g., 'DEBUG', 'INFO', 'WARNING', 'ERROR').
+        queued (bool): Write records from a background thread instead of the caller's.
 
     Returns:
         logging.Logger: Configured logger instance.
@@ -37,7 +44,14 @@ def setup_logging(log_dir="log", log_file_name="monitoring_service.log", log_lev
     logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
 
     if not logger.hasHandlers():
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        if queued:
+            log_queue = queue.SimpleQueue()
+            listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+            listener.start()
+            atexit.register(listener.stop)
+            logger.addHandler(QueueHandler(log_queue))
+        else:
+            logger.addHandler(file_handler)
+            logger.addHandler(console_handler)
 
     return logger
@@ -3,15 +3,28 @@ main.py
 
 Runs the monitoring service by setting up configuration, logging, telemetry collection,
 and ThingsBoard connectivity. Loads `.env` and `config.json`, establishes the MQTT connection,
-and starts the MonitoringAgent loop.
+and starts the MonitoringAgent loop. The connection is made in the background and
+retried with backoff, so an unreachable broker is never fatal.
 
 This script is the main entry point for the monitoring application.
 """
+import asyncio
 import logging
+import math
 from monitoring_service.config_loader import ConfigLoader
 from monitoring_service.telemetry import TelemetryCollector
 from monitoring_service.attributes import AttributesCollector
 from monitoring_service.TBClientWrapper import TBClientWrapper
+from monitoring_service.outbox import TelemetryOutbox
+from monitoring_service.sample_buffer import SampleBuffer
+from monitoring_service.aggregation import WindowAggregator
+from monitoring_service.deadband import DeadbandFilter
+from monitoring_service.encoding import PayloadEncoder
+from monitoring_service.instrumentation import Instrumentation, MetricsServer
+from monitoring_service.history import TelemetryHistory
+from monitoring_service.adaptive import AdaptiveInterval
+from monitoring_service.remote import RemoteControl
+from monitoring_service.sinks import FileSink, MqttSink, SinkFanout, SinkWorker, ThingsBoardSink
 from monitoring_service.agent import MonitoringAgent
 from monitoring_service.logging_setup import setup_logging
 
@@ -26,7 +39,8 @@ def main():
     logger = setup_logging(
         log_dir="log",
         log_file_name="monitoring_service.log",
-        log_level=config["log_level"]
+        log_level=config["log_level"],
+        queued=config["logging"]["queued"]
     )
 
     server = config["server"]
@@ -34,14 +48,138 @@ def main():
     poll_period = config["poll_period"]
     mount_path = config["mount_path"]
     device_name = config["device_name"]
+    outbox_config = config["outbox"]
+    sampling_config = config["sampling"]
+    attributes_config = config["attributes"]
+    async_config = config["async"]
+    aggregation_config = config["aggregation"]
+    deadband_config = config["deadband"]
+    encoder = PayloadEncoder(**config["encoding"])
+    instrumentation_config = config["instrumentation"]
+    history_config = config["history"]
+    adaptive_config = config["adaptive"]
+    sinks_config = config["sinks"]
+    remote_config = config["remote"]
 
-    telemetry_collector = TelemetryCollector(mount_path)
+    instrumentation = None
+    metrics_server = None
+    if instrumentation_config["enabled"]:
+        instrumentation = Instrumentation()
+        if instrumentation_config["prometheus_port"] is not None:
+            metrics_server = MetricsServer(instrumentation,
+                                           instrumentation_config["prometheus_port"],
+                                           host=instrumentation_config["prometheus_host"])
+            metrics_server.start()
+
+    telemetry_collector = TelemetryCollector(mount_path,
+                                             collectors=config["collectors"],
+                                             logger=logger,
+                                             instrumentation=instrumentation)
     attributes_collector = AttributesCollector(device_name,
-                                               logger)
+                                               logger,
+                                               ttls=attributes_config["ttls"])
+
+    outbox = None
+    if outbox_config["enabled"]:
+        outbox = TelemetryOutbox(outbox_config["path"],
+                                 logger,
+                                 max_bytes=outbox_config["max_bytes"],
+                                 encoder=encoder)
 
     client = TBClientWrapper(server,
                              token,
-                             logger)
+                             logger,
+                             outbox=outbox,
+                             replay_batch_size=outbox_config["replay_batch_size"],
+                             replay_interval=outbox_config["replay_interval"],
+                             encoder=encoder,
+                             backoff_base=config["connection"]["backoff_base"],
+                             backoff_max=config["connection"]["backoff_max"],
+                             connect_timeout=config["connection"]["connect_timeout"],
+                             max_inflight=config["publish"]["max_inflight"],
+                             ack_timeout=config["publish"]["ack_timeout"])
+
+    sample_buffer = SampleBuffer(capacity=sampling_config["buffer_capacity"],
+                                 max_batch_samples=sampling_config["max_batch_samples"],
+                                 max_batch_bytes=sampling_config["max_batch_bytes"],
+                                 encoder=encoder)
+
+    aggregator = None
+    if aggregation_config["enabled"]:
+        aggregator = WindowAggregator(
+            capacity=math.ceil(aggregation_config["window"] / sampling_config["sample_period"]),
+            aggregates=aggregation_config["aggregates"],
+            metrics=aggregation_config["metrics"])
+
+    deadband = None
+    if deadband_config["enabled"]:
+        deadband = DeadbandFilter(metrics=deadband_config["metrics"],
+                                  default=deadband_config["default"],
+                                  heartbeat=deadband_config["heartbeat"])
+
+    history = None
+    if history_config["enabled"]:
+        # Enough rollups to span the raw records at the configured sample period
+        history = TelemetryHistory(history_config["path"],
+                                   history_config["metrics"] or telemetry_collector.keys(),
+                                   capacity=history_config["capacity"],
+                                   rollup_period=history_config["rollup_period"],
+                                   rollup_capacity=math.ceil(history_config["capacity"]
+                                                             * sampling_config["sample_period"]
+                                                             / history_config["rollup_period"]),
+                                   logger=logger)
+
+    adaptive = None
+    if adaptive_config["enabled"]:
+        adaptive = AdaptiveInterval(adaptive_config["min_interval"],
+                                    adaptive_config["max_interval"],
+                                    rules=adaptive_config["rules"],
+                                    relax_after=adaptive_config["relax_after"],
+                                    relax_factor=adaptive_config["relax_factor"])
+
+    sinks = None
+    if sinks_config["enabled"]:
+        workers = []
+        for name, sink_config in sinks_config.items():
+            if not isinstance(sink_config, dict) or not sink_config["enabled"]:
+                continue
+            if name == "thingsboard":
+                sink = ThingsBoardSink(client)
+            elif name == "mqtt":
+                sink = MqttSink(sink_config["host"],
+                                sink_config["topic"],
+                                port=sink_config["port"],
+                                qos=sink_config["qos"],
+                                username=sink_config["username"],
+                                password=sink_config["password"],
+                                encoder=encoder)
+            elif name == "file":
+                sink = FileSink(sink_config["path"],
+                                file_format=sink_config["format"],
+                                max_bytes=sink_config["max_bytes"],
+                                encoder=encoder)
+            else:
+                raise ValueError(f"Unknown sink {name}")
+            workers.append(SinkWorker(sink,
+                                      logger,
+                                      queue_size=sink_config["queue_size"],
+                                      drop_policy=sink_config["drop_policy"],
+                                      retry_delay=sink_config["retry_delay"],
+                                      instrumentation=instrumentation))
+        sinks = SinkFanout(workers, logger)
+        sinks.start()
+
+    remote = None
+    if remote_config["enabled"]:
+        remote = RemoteControl(client,
+                               logger,
+                               min_poll_period=remote_config["min_poll_period"],
+                               max_poll_period=remote_config["max_poll_period"],
+                               max_burst_rate=remote_config["max_burst_rate"],
+                               max_burst_duration=remote_config["max_burst_duration"],
+                               max_burst_samples=remote_config["max_burst_samples"])
+        # Registered before connecting so the pollPeriod attribute is requested on the first connect
+        remote.register()
 
     agent = MonitoringAgent(server,
                             token,
@@ -49,11 +187,47 @@ def main():
                             telemetry_collector,
                             attributes_collector,
                             client,
-                            poll_period)
+                            poll_period,
+                            sample_period=sampling_config["sample_period"],
+                            sample_buffer=sample_buffer,
+                            attributes_full_resend=attributes_config["full_resend_interval"],
+                            intervals=config["intervals"],
+                            max_workers=async_config["max_workers"],
+                            collector_timeout=async_config["collector_timeout"],
+                            collector_timeouts=async_config["collector_timeouts"],
+                            aggregator=aggregator,
+                            aggregation_window=aggregation_config["window"],
+                            deadband=deadband,
+                            log_every=config["logging"]["log_every"],
+                            instrumentation=instrumentation,
+                            instrumentation_interval=instrumentation_config["interval"],
+                            history=history,
+                            adaptive=adaptive,
+                            adaptive_jobs=adaptive_config["jobs"],
+                            sinks=sinks,
+                            remote=remote,
+                            command_interval=remote_config["command_interval"],
+                            # A replay_interval of 0 (no spacing) still needs a job interval; replay every second
+                            replay_interval=(outbox_config["replay_interval"] or 1.0) if outbox is not None else None)
 
+    # Connects in the background; samples go to the outbox until the broker is reachable
     client.connect()
-    agent.start()
-    client.disconnect()
+    try:
+        if async_config["enabled"]:
+            asyncio.run(agent.start_async())
+        else:
+            agent.start()
+    finally:
+        if sinks is not None:
+            sinks.close()
+        if metrics_server is not None:
+            metrics_server.close()
+        if history is not None:
+            history.close()
+        telemetry_collector.close()
+        attributes_collector.close()
+        # Last, since it re-raises when the disconnect fails
+        client.disconnect()
 
 
 if __name__ == "__main__":
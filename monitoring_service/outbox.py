@@ -0,0 +1,146 @@
+"""
+outbox.py
+
+Defines the TelemetryOutbox class, a persistent store-and-forward queue for
+telemetry samples that could not be delivered to ThingsBoard. Samples are kept
+in an SQLite database in WAL mode together with their collection timestamp, so
+a backlog survives both broker outages and restarts of the service.
+
+Classes:
+    TelemetryOutbox
+
+Usage:
+    outbox = TelemetryOutbox("data/outbox.db", logger)
+    outbox.put(ts, telemetry)
+    batch = outbox.peek(100)
+    outbox.ack(batch[-1][0])
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+
+class TelemetryOutbox:
+    """
+    Disk-backed FIFO of timestamped telemetry samples.
+
+    Samples are appended with `put()` and read back oldest first with `peek()`.
+    They are only removed once `ack()` confirms they were handed to the broker,
+    so a crash between reading and sending replays them rather than losing them.
+    When the stored payload exceeds `max_bytes` the oldest samples are evicted.
+
+    Args:
+        path (str): Path of the SQLite database file. Parent directories are created.
+        logger (logging.Logger): Logger used to report evictions.
+        max_bytes (int): Maximum total size of the stored payloads.
+        encoder (PayloadEncoder): If set, payloads are stored in the encoder's
+            format, compressed once they pass its threshold.
+
+    Raises:
+        sqlite3.Error: If the database cannot be opened or created.
+    """
+
+    def __init__(self, path, logger, max_bytes=10 * 1024 * 1024, encoder=None):
+        self.path = path
+        self.logger = logger
+        self.max_bytes = max_bytes
+        self.encoder = encoder
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "ts INTEGER NOT NULL, "
+            "payload TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+        count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM samples").fetchone()
+        self._count = count
+        self._bytes = size
+        if count:
+            self.logger.info("Recovered %d undelivered telemetry samples from %s", count, path)
+
+    def __len__(self):
+        return self._count
+
+    def put(self, ts, values):
+        """
+        Appends a sample to the outbox, evicting the oldest samples if the size cap is exceeded.
+
+        :param ts: collection timestamp in milliseconds since the epoch
+        :param values: dictionary of telemetry values
+        """
+        if self.encoder is not None:
+            payload = self.encoder.encode(values)
+        else:
+            payload = json.dumps(values, separators=(",", ":"))
+        with self._lock:
+            with self._db:
+                self._db.execute("INSERT INTO samples (ts, payload) VALUES (?, ?)", (ts, payload))
+            self._count += 1
+            self._bytes += len(payload)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Evict down to 90% of the cap so a full outbox does not evict on every put
+        target = self.max_bytes * 9 // 10
+        evicted = 0
+        last_id = None
+        cursor = self._db.execute("SELECT id, LENGTH(payload) FROM samples ORDER BY id")
+        for row_id, size in cursor:
+            if self._bytes <= target:
+                break
+            self._bytes -= size
+            last_id = row_id
+            evicted += 1
+        cursor.close()
+        if last_id is not None:
+            with self._db:
+                self._db.execute("DELETE FROM samples WHERE id <= ?", (last_id,))
+        self._count -= evicted
+        self.logger.warning("Telemetry outbox full, evicted %d oldest samples", evicted)
+
+    def peek(self, limit):
+        """
+        Returns up to `limit` of the oldest samples without removing them.
+
+        :param limit: maximum number of samples to return
+        :return: list of (id, {"ts": ts, "values": values}) tuples, oldest first
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT id, ts, payload FROM samples ORDER BY id LIMIT ?", (limit,)).fetchall()
+        decode = json.loads if self.encoder is None else self.encoder.decode
+        return [(row_id, {"ts": ts, "values": decode(payload)}) for row_id, ts, payload in rows]
+
+    def ack(self, last_id):
+        """
+        Removes every sample up to and including `last_id`.
+
+        :param last_id: id of the newest delivered sample, as returned by `peek()`
+        """
+        with self._lock:
+            with self._db:
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM samples WHERE id <= ?", (last_id,)
+                ).fetchone()
+                self._db.execute("DELETE FROM samples WHERE id <= ?", (last_id,))
+            self._count -= count
+            self._bytes -= size
+
+    def close(self):
+        """
+        Closes the underlying database.
+        """
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,205 @@
+"""
+remote.py
+
+Defines the RemoteControl class, which receives commands from ThingsBoard as
+server-side RPC requests and shared attribute updates, validates them, and
+queues them for MonitoringAgent to apply on its own thread.
+
+Supported RPC methods:
+    setPollPeriod   {"poll_period": 30}             change how often telemetry is published
+    snapshot        {}                              collect every metric now and publish it
+    startBurst      {"rate_hz": 10, "duration": 60} sample at a high rate for a limited time,
+                                                    then upload the samples as one batch
+    stopBurst       {}                              end a running burst early and upload it
+
+The `pollPeriod` shared attribute sets the poll period too, and is requested
+again on every connect so a value set on the server survives restarts. A poll
+period set by RPC takes precedence over the requested attribute until the
+service restarts or the attribute itself is changed.
+
+Classes:
+    RemoteControl
+    Command
+
+Usage:
+    remote = RemoteControl(tb_client, logger)
+    remote.register()
+    for command in remote.pending():
+        ...
+        remote.reply(command.request_id, result)
+"""
+
+import threading
+from collections import deque, namedtuple
+
+from monitoring_service.TBClientWrapper import STATE_CONNECTED
+
+SET_POLL_PERIOD = "set_poll_period"
+SNAPSHOT = "snapshot"
+START_BURST = "start_burst"
+STOP_BURST = "stop_burst"
+
+RPC_METHODS = {
+    "setPollPeriod": SET_POLL_PERIOD,
+    "snapshot": SNAPSHOT,
+    # The method the original prototype answered
+    "getTelemetry": SNAPSHOT,
+    "startBurst": START_BURST,
+    "stopBurst": STOP_BURST,
+}
+
+POLL_PERIOD_ATTRIBUTE = "pollPeriod"
+
+
+class Command(namedtuple("Command", ["action", "params", "request_id"])):
+    """
+    A validated command waiting to be applied.
+
+    Attributes:
+        action (str): SET_POLL_PERIOD, SNAPSHOT, START_BURST or STOP_BURST.
+        params (dict): Validated parameters of the action.
+        request_id (str): RPC request id to reply to, None for attribute updates.
+    """
+    __slots__ = ()
+
+
+class RemoteControl:
+    """
+    Turns RPC requests and shared attribute updates into queued Commands.
+
+    Handlers run on the MQTT network thread, so they only validate and queue;
+    the agent drains the queue with `pending()` on its own schedule and replies
+    with `reply()`. Invalid requests are answered with an error straight away.
+
+    Args:
+        tb_client (TBClientWrapper): Client the handlers are registered with.
+        logger (logging.Logger): Logger used to report received commands.
+        min_poll_period (float): Smallest poll period accepted, in seconds.
+        max_poll_period (float): Largest poll period accepted, in seconds.
+        max_burst_rate (float): Highest burst sampling rate accepted, in Hz.
+        max_burst_duration (float): Longest burst accepted, in seconds.
+        max_burst_samples (int): Most samples a burst may hold before it is uploaded.
+    """
+
+    def __init__(self, tb_client, logger, min_poll_period=1.0, max_poll_period=86400.0, max_burst_rate=20.0,
+                 max_burst_duration=300.0, max_burst_samples=10000):
+        self.tb_client = tb_client
+        self.logger = logger
+        self.min_poll_period = min_poll_period
+        self.max_poll_period = max_poll_period
+        self.max_burst_rate = max_burst_rate
+        self.max_burst_duration = max_burst_duration
+        self.max_burst_samples = max_burst_samples
+        self._commands = deque()
+        self._lock = threading.Lock()
+        self._rpc_poll_period = False
+
+    def register(self):
+        """
+        Registers the RPC and attribute handlers with the client.
+        """
+        self.tb_client.set_rpc_handler(self._on_rpc)
+        self.tb_client.subscribe_to_shared_attributes(self._on_attributes)
+        self.tb_client.state_callbacks.append(self._on_state)
+
+    def _on_state(self, old, new):
+        if new == STATE_CONNECTED:
+            self.tb_client.request_shared_attributes([POLL_PERIOD_ATTRIBUTE], self._on_requested)
+
+    def _on_requested(self, attributes, exception=None, *args):
+        if self._rpc_poll_period:
+            # Re-applying the stored attribute after a reconnect would undo the RPC change
+            self.logger.info("Keeping the poll period set by RPC over the %s attribute", POLL_PERIOD_ATTRIBUTE)
+            return
+        self._on_attributes(attributes, exception, *args)
+
+    def _on_rpc(self, request_id, body):
+        method = body.get("method") if isinstance(body, dict) else None
+        action = RPC_METHODS.get(method)
+        if action is None:
+            self.logger.warning("Unknown RPC method: %s", method)
+            self.reply(request_id, {"error": f"Unknown method {method}"})
+            return
+        try:
+            params = self._parse(action, body.get("params"))
+        except (ValueError, TypeError) as e:
+            self.logger.warning("Invalid RPC %s params: %s (%s)", method, body.get("params"), e)
+            self.reply(request_id, {"error": str(e)})
+            return
+        self.logger.info("RPC %s received: %s", method, params)
+        if action == SET_POLL_PERIOD:
+            self._rpc_poll_period = True
+        self._queue(Command(action, params, request_id))
+
+    def _on_attributes(self, attributes, exception=None, *args):
+        if exception is not None:
+            self.logger.error("Shared attributes request failed %s", exception)
+            return
+        # Updates carry the changed attributes; a response to a request nests them under "shared"
+        attributes = attributes.get("shared", attributes) if isinstance(attributes, dict) else {}
+        if attributes.get(POLL_PERIOD_ATTRIBUTE) is None:
+            return
+        try:
+            params = self._parse(SET_POLL_PERIOD, attributes[POLL_PERIOD_ATTRIBUTE])
+        except (ValueError, TypeError) as e:
+            self.logger.warning("Invalid %s attribute: %s (%s)", POLL_PERIOD_ATTRIBUTE,
+                                attributes[POLL_PERIOD_ATTRIBUTE], e)
+            return
+        # Whichever of the RPC and an attribute change came last wins
+        self._rpc_poll_period = False
+        self._queue(Command(SET_POLL_PERIOD, params, None))
+
+    def _queue(self, command):
+        with self._lock:
+            self._commands.append(command)
+
+    def _parse(self, action, params):
+        if action == SET_POLL_PERIOD:
+            if isinstance(params, dict):
+                params = params.get("poll_period", params.get(POLL_PERIOD_ATTRIBUTE))
+            if isinstance(params, bool):
+                raise TypeError("poll_period must be a number")
+            poll_period = float(params)
+            if not self.min_poll_period <= poll_period <= self.max_poll_period:
+                raise ValueError(f"poll_period must be between {self.min_poll_period:g} "
+                                 f"and {self.max_poll_period:g}")
+            return {"poll_period": poll_period}
+
+        if action == START_BURST:
+            params = dict(params or {})
+            rate_hz = float(params.get("rate_hz", 10))
+            duration = float(params.get("duration", 60))
+            if not 0 < rate_hz <= self.max_burst_rate:
+                raise ValueError(f"rate_hz must be > 0 and <= {self.max_burst_rate:g}")
+            if not 0 < duration <= self.max_burst_duration:
+                raise ValueError(f"duration must be > 0 and <= {self.max_burst_duration:g}")
+            metrics = params.get("metrics")
+            if metrics is not None:
+                if not isinstance(metrics, list) or not metrics:
+                    raise TypeError("metrics must be a non-empty list of metric names")
+                metrics = [str(metric) for metric in metrics]
+            return {"rate_hz": rate_hz, "duration": duration, "metrics": metrics,
+                    "max_samples": min(self.max_burst_samples, int(rate_hz * duration) + 1)}
+
+        return {}
+
+    def pending(self):
+        """
+        Removes and returns the queued commands, oldest first.
+
+        :return: list of Commands
+        """
+        with self._lock:
+            commands = list(self._commands)
+            self._commands.clear()
+        return commands
+
+    def reply(self, request_id, response):
+        """
+        Replies to the RPC request a command came from; does nothing for attribute updates.
+
+        :param request_id: RPC request id, or None
+        :param response: JSON-serialisable reply
+        """
+        if request_id is not None:
+            self.tb_client.send_rpc_reply(request_id, response)
@@ -0,0 +1,118 @@
+"""
+sample_buffer.py
+
+Defines the SampleBuffer class, a bounded ring buffer of timestamped telemetry
+samples. It lets the agent sample at a fast interval and publish the
+accumulated samples as a few batched ThingsBoard payloads of the form
+`[{"ts": ..., "values": {...}}, ...]`.
+
+Classes:
+    SampleBuffer
+
+Usage:
+    buffer = SampleBuffer(capacity=3600)
+    buffer.append(ts, telemetry)
+    for batch in buffer.drain_batches():
+        client.send_telemetry_batch(batch)
+"""
+
+import json
+from collections import deque
+
+
+class SampleBuffer:
+    """
+    Ring buffer of (timestamp, values) samples with size-bounded batch draining.
+
+    Samples are stored as a timestamp, a tuple of keys and a tuple of values. The
+    key tuple is shared between consecutive samples with the same keys, so a
+    sample costs one small tuple rather than a dict. When the buffer is full the
+    oldest sample is overwritten and counted in `dropped`.
+
+    Args:
+        capacity (int): Maximum number of samples held.
+        max_batch_samples (int): Maximum number of samples in one drained batch.
+        max_batch_bytes (int): Maximum encoded JSON size of one drained batch.
+        encoder (PayloadEncoder): If set, batch sizes are measured on the payload
+            as the encoder will publish it, after aliasing and rounding.
+    """
+
+    def __init__(self, capacity=3600, max_batch_samples=100, max_batch_bytes=8192, encoder=None):
+        self.capacity = capacity
+        self.max_batch_samples = max_batch_samples
+        self.max_batch_bytes = max_batch_bytes
+        self.encoder = encoder
+        self.dropped = 0
+        self._samples = deque(maxlen=capacity)
+        self._keys = ()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def append(self, ts, values):
+        """
+        Adds a sample to the buffer, overwriting the oldest sample if it is full.
+
+        :param ts: collection timestamp in milliseconds since the epoch
+        :param values: dictionary of telemetry values
+        :return: the {"ts": ts, "values": values} sample overwritten, or None
+        """
+        keys = tuple(values)
+        if keys != self._keys:
+            self._keys = keys
+        overwritten = None
+        if len(self._samples) == self.capacity:
+            self.dropped += 1
+            old_ts, old_keys, old_values = self._samples[0]
+            overwritten = {"ts": old_ts, "values": dict(zip(old_keys, old_values))}
+        self._samples.append((ts, self._keys, tuple(values.values())))
+        return overwritten
+
+    def requeue(self, samples):
+        """
+        Puts drained samples back at the front of the buffer, e.g. because they
+        could not be published yet. If they do not all fit, the oldest of them are
+        dropped and counted in `dropped`.
+
+        :param samples: list of {"ts": ts, "values": values} dicts, oldest first
+        :return: list of the samples that did not fit and were dropped
+        """
+        room = max(0, self.capacity - len(self._samples))
+        dropped = samples[:len(samples) - room] if len(samples) > room else []
+        self.dropped += len(dropped)
+        for sample in reversed(samples[len(dropped):]):
+            values = sample["values"]
+            self._samples.appendleft((sample["ts"], tuple(values), tuple(values.values())))
+        return dropped
+
+    def _encoded_size(self, sample):
+        if self.encoder is not None:
+            return self.encoder.encoded_size(sample)
+        return len(json.dumps(sample, separators=(",", ":")))
+
+    def drain_batches(self):
+        """
+        Removes every buffered sample and groups them into batches, oldest first.
+
+        A batch is closed when adding the next sample would exceed either
+        `max_batch_samples` or `max_batch_bytes`. A single sample larger than
+        `max_batch_bytes` is still emitted, on its own.
+
+        :return: list of batches, each a list of {"ts": ts, "values": values} dicts
+        """
+        batches = []
+        batch = []
+        batch_bytes = 2  # enclosing brackets
+        while self._samples:
+            ts, keys, values = self._samples.popleft()
+            sample = {"ts": ts, "values": dict(zip(keys, values))}
+            size = self._encoded_size(sample) + 1
+            if batch and (len(batch) >= self.max_batch_samples or batch_bytes + size > self.max_batch_bytes):
+                batches.append(batch)
+                batch = []
+                batch_bytes = 2
+            batch.append(sample)
+            batch_bytes += size
+        if batch:
+            batches.append(batch)
+        return batches
@@ -0,0 +1,138 @@
+"""
+scheduler.py
+
+Defines the Scheduler class, a drift-free periodic scheduler built on
+`time.monotonic()`. Each named job has its own interval and runs on absolute
+deadlines (start + n * interval), so the time spent doing the work never shifts
+the schedule and wall-clock steps from NTP have no effect.
+
+Classes:
+    Scheduler
+
+Usage:
+    scheduler = Scheduler()
+    scheduler.add("cpu_temp", 5)
+    scheduler.add("disk_usage", 600)
+    while True:
+        due = scheduler.wait()
+
+    # or, from a coroutine
+    await asyncio.sleep(scheduler.next_delay())
+    due = scheduler.due()
+"""
+
+import time
+
+
+class Scheduler:
+    """
+    Schedules named jobs on independent intervals aligned to absolute deadlines.
+
+    `wait()` sleeps until the earliest deadline and returns every job due at that
+    tick, including jobs due within `coalesce_window` seconds, so jobs that fall
+    due together are handled in a single pass. When work overruns and whole ticks
+    of a job are missed, the missed ticks are skipped rather than run late in a
+    burst, and counted in `overruns`.
+
+    Args:
+        clock (callable): Monotonic clock returning seconds.
+        sleep (callable): Function used to sleep for a number of seconds.
+        coalesce_window (float): Jobs due within this many seconds of a tick run on that tick.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, coalesce_window=0.05):
+        self.clock = clock
+        self.sleep = sleep
+        self.coalesce_window = coalesce_window
+        self.overruns = 0
+        self._start = None
+        self._jobs = {}
+
+    def add(self, name, interval, delay=None):
+        """
+        Adds a job that is first due on the next tick and then every `interval` seconds.
+
+        Jobs added together share the same start time, so jobs whose intervals are
+        multiples of each other always fall due on the same tick.
+
+        :param name: job name returned by `wait()`
+        :param interval: seconds between runs
+        :param delay: if set, the job is first due this many seconds from now instead,
+            for jobs added while the schedule is already running
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval for {name} must be > 0")
+        if self._start is None:
+            self._start = self.clock()
+        self._jobs[name] = [interval, self._start if delay is None else self.clock() + delay]
+
+    def remove(self, name):
+        """
+        Removes a job. Removing a job that is not scheduled does nothing.
+
+        :param name: job name
+        """
+        self._jobs.pop(name, None)
+
+    def set_interval(self, name, interval):
+        """
+        Changes the interval of an existing job. The job's next run is brought
+        forward if the new interval makes it due sooner.
+
+        :param name: job name
+        :param interval: new seconds between runs
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval for {name} must be > 0")
+        job = self._jobs[name]
+        last_run = job[1] - job[0]
+        job[0] = interval
+        job[1] = min(job[1], last_run + interval)
+
+    def interval(self, name):
+        """
+        :param name: job name
+        :return: the job's current interval in seconds
+        """
+        return self._jobs[name][0]
+
+    def next_delay(self):
+        """
+        :return: seconds until the earliest deadline, zero if one has already passed
+        """
+        if not self._jobs:
+            raise RuntimeError("No jobs scheduled")
+        next_deadline = min(deadline for _, deadline in self._jobs.values())
+        return max(0.0, next_deadline - self.clock())
+
+    def due(self):
+        """
+        Returns the jobs due now and advances their deadlines.
+
+        :return: list of due job names, in the order they were added
+        """
+        now = self.clock()
+        due = []
+        for name, job in self._jobs.items():
+            interval, deadline = job
+            if deadline > now + self.coalesce_window:
+                continue
+            due.append(name)
+            deadline += interval
+            if deadline <= now:
+                missed = int((now - deadline) // interval) + 1
+                self.overruns += missed
+                deadline += missed * interval
+            job[1] = deadline
+        return due
+
+    def wait(self):
+        """
+        Sleeps until the next deadline and returns the jobs due on that tick.
+
+        :return: list of due job names, in the order they were added
+        """
+        delay = self.next_delay()
+        if delay > 0:
+            self.sleep(delay)
+        return self.due()
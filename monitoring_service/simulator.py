@@ -0,0 +1,351 @@
+"""
+simulator.py
+
+Fleet load simulator. Runs N virtual MonitoringAgents in one process, all
+multiplexed onto a single asyncio event loop, each with a synthetic
+TelemetryCollector, its own access token and its own jittered start. They
+publish through the normal TBClientWrapper to an in-process broker stand-in,
+which measures achieved throughput and publish latency, and can be restarted
+mid-run to observe how the fleet's reconnection storm behaves.
+
+Lost connections are re-established by TBClientWrapper's reconnect engine,
+with exponential backoff and full jitter. With `--reconnect paho` the stand-in
+client reconnects by itself the way paho does by default instead, retrying
+after a delay that starts at `min_delay` and doubles up to `max_delay`, which
+shows the lockstep storm the engine avoids.
+
+Classes:
+    SyntheticCollector
+    FakeBroker
+    FakeBrokerClient
+
+Usage:
+    python -m monitoring_service.simulator --agents 1000 --duration 60 \\
+        --poll-period 5 --jitter 5 --restart-at 20 --downtime 5
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import random
+from collections import Counter
+
+import orjson
+
+from monitoring_service.TBClientWrapper import TBClientWrapper
+from monitoring_service.agent import MonitoringAgent
+from monitoring_service.collectors.base import COST_CHEAP, Collector
+from monitoring_service.collectors.registry import CollectorRegistry
+from monitoring_service.scheduler import Scheduler
+from monitoring_service.telemetry import TelemetryCollector
+
+
+class SyntheticCollector(Collector):
+    """
+    Reports random-walk values shaped like the built-in collectors' metrics.
+
+    Options:
+        seed (int): Seed for this collector's random generator.
+    """
+
+    keys = ("cpu_usage", "cpu_temp", "ram_usage", "disk_usage")
+    cost = COST_CHEAP
+
+    def __init__(self, name, logger, seed=None, **options):
+        super().__init__(name, logger, **options)
+        self._random = random.Random(seed)
+        self._values = {"cpu_usage": 20.0, "cpu_temp": 50.0, "ram_usage": 35.0, "disk_usage": 40.0}
+
+    def collect(self):
+        for key, value in self._values.items():
+            self._values[key] = min(100.0, max(0.0, value + self._random.uniform(-2.0, 2.0)))
+        return dict(self._values)
+
+
+class _StaticAttributes:
+    def __init__(self, device_name):
+        self.device_name = device_name
+
+    def as_dict(self):
+        return {"device_name": self.device_name}
+
+
+class FakeBroker:
+    """
+    In-process MQTT broker stand-in.
+
+    Published messages are queued and ingested by `run()`, optionally at a
+    limited rate, so publish latency reflects both event loop load and broker
+    backlog. Every connection attempt is recorded for the reconnect storm report.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): Loop whose clock timestamps events.
+        ingest_rate (float): Messages per second the broker can ingest, None for unlimited.
+    """
+
+    def __init__(self, loop, ingest_rate=None):
+        self.loop = loop
+        self.ingest_rate = ingest_rate
+        self.up = True
+        self.clients = set()
+        self.messages = 0
+        self.bytes = 0
+        self.latencies = []
+        self.max_queue_depth = 0
+        self.connect_attempts = []
+        self.refused = 0
+        self.restarted_at = None
+        self.restored_at = None
+        self.recovered_at = None
+        self.expected_clients = 0
+        self._queue = asyncio.Queue()
+
+    def connect(self, client):
+        """
+        :param client: connecting client
+        :raises ConnectionRefusedError: if the broker is down
+        """
+        now = self.loop.time()
+        self.connect_attempts.append(now)
+        if not self.up:
+            self.refused += 1
+            raise ConnectionRefusedError("broker unavailable")
+        self.clients.add(client)
+        if (self.restored_at is not None and self.recovered_at is None
+                and len(self.clients) >= self.expected_clients):
+            self.recovered_at = now
+
+    def disconnect(self, client):
+        """
+        :param client: disconnecting client
+        """
+        self.clients.discard(client)
+
+    def publish(self, client, payload):
+        """
+        :param client: publishing client
+        :param payload: JSON-serialisable payload
+        :raises ConnectionError: if the client is not connected
+        """
+        if client not in self.clients:
+            raise ConnectionError("not connected")
+        self._queue.put_nowait((self.loop.time(), len(orjson.dumps(payload))))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    async def run(self):
+        """
+        Ingests published messages until cancelled.
+        """
+        while True:
+            sent_at, size = await self._queue.get()
+            self.messages += 1
+            self.bytes += size
+            self.latencies.append(self.loop.time() - sent_at)
+            if self.ingest_rate:
+                await asyncio.sleep(1.0 / self.ingest_rate)
+
+    async def restart(self, downtime):
+        """
+        Drops every connection and refuses new ones for `downtime` seconds.
+
+        :param downtime: seconds the broker stays down
+        """
+        self.up = False
+        self.restarted_at = self.loop.time()
+        self.expected_clients = len(self.clients)
+        dropped = list(self.clients)
+        self.clients.clear()
+        for client in dropped:
+            client.connection_lost()
+        await asyncio.sleep(downtime)
+        self.up = True
+        self.restored_at = self.loop.time()
+
+
+class FakeBrokerClient:
+    """
+    Stand-in for TBDeviceMqttClient that talks to a FakeBroker.
+
+    Args:
+        host (str): Ignored, the broker is in-process.
+        username (str): Access token of the virtual device.
+        broker (FakeBroker): Broker to connect to.
+        min_delay (float): First reconnect delay after a lost connection.
+        max_delay (float): Largest reconnect delay.
+        auto_reconnect (bool): Reconnect by itself after a lost connection, as paho does.
+    """
+
+    def __init__(self, host=None, username=None, broker=None, min_delay=1.0, max_delay=120.0,
+                 auto_reconnect=False):
+        self.username = username
+        self.broker = broker
+        self.auto_reconnect = auto_reconnect
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.connected = False
+        self._delay = min_delay
+        self._retry = None
+
+    def connect(self):
+        self.broker.connect(self)
+        self.connected = True
+        self._delay = self.min_delay
+
+    def is_connected(self):
+        return self.connected
+
+    def connection_lost(self):
+        """
+        Called by the broker when it drops the connection. Schedules a reconnect
+        if `auto_reconnect` is set.
+        """
+        self.connected = False
+        if self.auto_reconnect:
+            self._retry = self.broker.loop.call_later(self._delay, self._reconnect)
+
+    def _reconnect(self):
+        try:
+            self.connect()
+        except ConnectionRefusedError:
+            self._delay = min(self._delay * 2, self.max_delay)
+            self._retry = self.broker.loop.call_later(self._delay, self._reconnect)
+
+    def send_telemetry(self, telemetry):
+        self.broker.publish(self, telemetry)
+
+    def send_attributes(self, attributes):
+        self.broker.publish(self, attributes)
+
+    def disconnect(self):
+        if self._retry is not None:
+            self._retry.cancel()
+        self.connected = False
+        self.broker.disconnect(self)
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _run_agent(index, args, broker, registry, logger, stop_at):
+    loop = broker.loop
+    await asyncio.sleep(random.uniform(0, args.jitter))
+
+    token = f"sim-token-{index:05d}"
+    paho_reconnect = args.reconnect == "paho"
+    client = TBClientWrapper("localhost", token, logger,
+                             client_class=functools.partial(FakeBrokerClient, broker=broker,
+                                                            min_delay=args.min_delay, max_delay=args.max_delay,
+                                                            auto_reconnect=paho_reconnect),
+                             backoff_base=args.min_delay, backoff_max=args.max_delay,
+                             check_interval=min(1.0, args.poll_period), clock=loop.time)
+    telemetry_collector = TelemetryCollector(collectors={"synthetic": {"seed": index}}, logger=logger,
+                                             registry=registry)
+    agent = MonitoringAgent("localhost", token, logger, telemetry_collector,
+                            _StaticAttributes(f"sim-{index:05d}"), client, poll_period=args.poll_period,
+                            scheduler=Scheduler(clock=loop.time))
+    client.connect(background=False)
+
+    async def drive_connection():
+        while loop.time() < stop_at:
+            await asyncio.sleep(min(client.poll_connection(), stop_at - loop.time()))
+
+    async def drive_agent():
+        scheduler = agent.scheduler
+        while loop.time() < stop_at:
+            await asyncio.sleep(scheduler.next_delay())
+            agent._run_tick(scheduler.due())
+
+    if paho_reconnect:
+        await drive_agent()
+    else:
+        await asyncio.gather(drive_connection(), drive_agent())
+    client.disconnect()
+
+
+async def simulate(args):
+    """
+    Runs the simulation described by the parsed command line arguments.
+
+    :param args: argparse namespace from `main()`
+    :return: dictionary report of the run
+    """
+    loop = asyncio.get_running_loop()
+    logger = logging.getLogger("simulator")
+    logger.setLevel(logging.CRITICAL)
+    registry = CollectorRegistry(logger, builtins={"synthetic": f"{__name__}:SyntheticCollector"})
+
+    broker = FakeBroker(loop, ingest_rate=args.ingest_rate)
+    broker_task = asyncio.create_task(broker.run())
+    start = loop.time()
+    stop_at = start + args.duration
+
+    tasks = [asyncio.create_task(_run_agent(index, args, broker, registry, logger, stop_at))
+             for index in range(args.agents)]
+    if args.restart_at is not None:
+        await asyncio.sleep(args.restart_at)
+        tasks.append(asyncio.create_task(broker.restart(args.downtime)))
+    await asyncio.gather(*tasks)
+    await asyncio.sleep(0)
+    broker_task.cancel()
+
+    elapsed = loop.time() - start
+    latencies = sorted(broker.latencies)
+    report = {
+        "agents": args.agents,
+        "duration_s": round(elapsed, 3),
+        "messages": broker.messages,
+        "messages_per_s": round(broker.messages / elapsed, 1),
+        "bytes_per_s": round(broker.bytes / elapsed, 1),
+        "latency_ms": {
+            name: None if value is None else round(value * 1000, 3)
+            for name, value in (("p50", _percentile(latencies, 0.5)),
+                                ("p95", _percentile(latencies, 0.95)),
+                                ("p99", _percentile(latencies, 0.99)),
+                                ("max", latencies[-1] if latencies else None))
+        },
+        "max_queue_depth": broker.max_queue_depth,
+    }
+    if broker.restarted_at is not None:
+        attempts = Counter(int(t - broker.restarted_at) for t in broker.connect_attempts if t >= broker.restarted_at)
+        report["restart"] = {
+            "downtime_s": args.downtime,
+            "clients_dropped": broker.expected_clients,
+            "connect_attempts": sum(attempts.values()),
+            "refused": broker.refused,
+            "peak_attempts_per_s": max(attempts.values(), default=0),
+            "attempts_per_s": [attempts.get(second, 0) for second in range(max(attempts, default=-1) + 1)],
+            "recovered_after_s": None if broker.recovered_at is None
+            else round(broker.recovered_at - broker.restored_at, 3),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run for")
+    parser.add_argument("--poll-period", type=float, default=5.0)
+    parser.add_argument("--jitter", type=float, default=5.0, help="largest random start offset in seconds")
+    parser.add_argument("--ingest-rate", type=float, help="broker ingest capacity in messages per second")
+    parser.add_argument("--restart-at", type=float, help="seconds into the run to restart the broker")
+    parser.add_argument("--downtime", type=float, default=5.0, help="seconds the restarted broker stays down")
+    parser.add_argument("--min-delay", type=float, default=1.0, help="first reconnect delay in seconds")
+    parser.add_argument("--max-delay", type=float, default=120.0, help="largest reconnect delay in seconds")
+    parser.add_argument("--reconnect", choices=("backoff", "paho"), default="backoff",
+                        help="reconnect with the wrapper's jittered backoff, or paho's fixed doubling delay")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(simulate(args))
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""
+sinks.py
+
+Defines the publishing sinks and the SinkFanout class, which hands every
+telemetry batch to several destinations at once: ThingsBoard, a plain MQTT
+topic and a local NDJSON or CSV file.
+
+Each sink gets its own bounded queue and worker thread. Handing a batch to the
+fan-out only enqueues it, so a slow or unreachable sink never delays collection
+or the other sinks; once its queue is full, its drop policy decides whether the
+oldest or the newest batches are discarded.
+
+Classes:
+    Sink
+    SinkBusy
+    ThingsBoardSink
+    MqttSink
+    FileSink
+    SinkWorker
+    SinkFanout
+
+Usage:
+    fanout = SinkFanout([SinkWorker(ThingsBoardSink(tb_client), logger),
+                         SinkWorker(FileSink("data/telemetry.ndjson"), logger)], logger)
+    fanout.start()
+    fanout.publish(batches)
+    fanout.close()
+"""
+
+import csv
+import io
+import os
+import threading
+import time
+from collections import deque
+
+from monitoring_service.encoding import PayloadEncoder
+from monitoring_service.inflight import PublishWindowFull
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+
+class SinkBusy(Exception):
+    """
+    Raised by a sink that cannot take a batch yet, e.g. while disconnected.
+    The worker keeps the batch and retries it after its retry delay.
+    """
+
+
+class Sink:
+    """
+    Base class for publishing destinations.
+
+    Subclasses implement `write()`, which is only ever called from the sink's
+    own worker thread, and may override `close()`.
+
+    Args:
+        name (str): Name the sink's counters are reported under.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def write(self, batch):
+        """
+        Delivers one batch.
+
+        :param batch: list of {"ts": ts, "values": values} dictionaries
+        :return: True if the batch was delivered or durably stored
+        :raises SinkBusy: if the batch should be retried later
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Releases any resources held by the sink.
+        """
+
+
+class ThingsBoardSink(Sink):
+    """
+    Publishes batches through TBClientWrapper, which keeps its own outbox and
+    in-flight window. A full window makes the worker hold the batch and retry.
+    While disconnected, batches go to the client's outbox and count as
+    delivered; without an outbox the sink raises SinkBusy so they wait in the
+    sink's queue instead of being dropped by the client.
+
+    Args:
+        tb_client (TBClientWrapper): Connected ThingsBoard client wrapper.
+        name (str): Name the sink's counters are reported under.
+    """
+
+    def __init__(self, tb_client, name="thingsboard"):
+        super().__init__(name)
+        self.tb_client = tb_client
+
+    def write(self, batch):
+        stored = self.tb_client.outbox is not None
+        if not stored and not self.tb_client.is_connected():
+            raise SinkBusy("not connected")
+        try:
+            sent = self.tb_client.send_telemetry_batch(batch)
+        except PublishWindowFull as e:
+            raise SinkBusy(str(e))
+        # A batch the client could not send is in its outbox
+        return sent or stored
+
+
+class MqttSink(Sink):
+    """
+    Publishes each batch as one JSON array of {"ts", "values"} samples to an
+    MQTT topic on any broker. The paho client reconnects by itself; while it
+    is disconnected, batches wait in the sink's queue.
+
+    Args:
+        host (str): Broker host.
+        topic (str): Topic to publish to.
+        port (int): Broker port.
+        qos (int): MQTT QoS of the published messages.
+        username (str): Username, or None for anonymous access.
+        password (str): Password for `username`.
+        client_id (str): MQTT client id, empty for a broker-assigned one.
+        keepalive (int): Keepalive interval in seconds.
+        encoder (PayloadEncoder): Encoder applying aliases and rounding and serialising the payload.
+        name (str): Name the sink's counters are reported under.
+        client_factory (callable): Creates the paho client, replaceable for testing.
+    """
+
+    def __init__(self, host, topic, port=1883, qos=0, username=None, password=None, client_id="", keepalive=60,
+                 encoder=None, name="mqtt", client_factory=None):
+        super().__init__(name)
+        self.topic = topic
+        self.qos = qos
+        self.encoder = encoder or PayloadEncoder()
+        if client_factory is None:
+            import paho.mqtt.client as mqtt
+
+            def client_factory():
+                return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+        self.client = client_factory()
+        if username is not None:
+            self.client.username_pw_set(username, password)
+        self.client.connect_async(host, port, keepalive)
+        self.client.loop_start()
+
+    def write(self, batch):
+        if not self.client.is_connected():
+            raise SinkBusy("not connected")
+        payload = self.encoder.dumps(self.encoder.transform_samples(batch))
+        info = self.client.publish(self.topic, payload, qos=self.qos)
+        if info.rc != 0:
+            raise SinkBusy(f"publish not queued, rc={info.rc}")
+        return True
+
+    def close(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+class FileSink(Sink):
+    """
+    Appends samples to a local file, either as NDJSON with one
+    {"ts", "values"} object per line, or as CSV with one ts,key,value row per
+    value so the columns stay the same whatever metrics are enabled. The file is
+    flushed after every batch and, with `max_bytes`, rotated to `<path>.1`.
+
+    Args:
+        path (str): Path of the file. Parent directories are created.
+        file_format (str): "ndjson" or "csv".
+        max_bytes (int): Size after which the file is rotated, None to never rotate.
+        encoder (PayloadEncoder): Encoder applying aliases and rounding and serialising NDJSON lines.
+        name (str): Name the sink's counters are reported under.
+    """
+
+    FORMATS = ("ndjson", "csv")
+
+    def __init__(self, path, file_format="ndjson", max_bytes=None, encoder=None, name="file"):
+        super().__init__(name)
+        if file_format not in self.FORMATS:
+            raise ValueError(f"Unknown file format {file_format}")
+        self.path = path
+        self.file_format = file_format
+        self.max_bytes = max_bytes
+        self.encoder = encoder or PayloadEncoder()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = None
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "ab")
+        if self.file_format == "csv" and self._file.tell() == 0:
+            self._file.write(b"ts,key,value\r\n")
+
+    def _format(self, batch):
+        samples = self.encoder.transform_samples(batch)
+        if self.file_format == "ndjson":
+            return b"".join(self.encoder.dumps(sample) + b"\n" for sample in samples)
+        out = io.StringIO()
+        writer = csv.writer(out)
+        for sample in samples:
+            writer.writerows((sample["ts"], key, "" if value is None else value)
+                             for key, value in sample["values"].items())
+        return out.getvalue().encode("utf-8")
+
+    def write(self, batch):
+        self._file.write(self._format(batch))
+        self._file.flush()
+        if self.max_bytes is not None and self._file.tell() >= self.max_bytes:
+            self._file.close()
+            os.replace(self.path, self.path + ".1")
+            self._open()
+        return True
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SinkWorker:
+    """
+    Bounded queue and worker thread in front of one sink.
+
+    Batches are written in order. A batch that raises SinkBusy stays at the
+    front and is retried every `retry_delay` seconds while newer batches queue
+    up behind it; a batch that fails any other way is counted and discarded.
+
+    Args:
+        sink (Sink): Sink the batches are written to.
+        logger (logging.Logger): Logger used to report failures and drops.
+        queue_size (int): Batches held before the drop policy applies.
+        drop_policy (str): DROP_OLDEST to discard the oldest queued batch for a new
+            one, DROP_NEWEST to discard the new batch.
+        retry_delay (float): Seconds between attempts while the sink is busy.
+        instrumentation (Instrumentation): If set, each write is recorded into it as
+            the agent records a direct publish: `publish` latency, `publish_failures`
+            for batches not delivered and `publish_deferred` when the sink is busy.
+    """
+
+    def __init__(self, sink, logger, queue_size=100, drop_policy=DROP_OLDEST, retry_delay=5.0,
+                 instrumentation=None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy}")
+        if queue_size < 1:
+            raise ValueError("queue_size must be >= 1")
+        self.sink = sink
+        self.logger = logger
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.retry_delay = retry_delay
+        self.instrumentation = instrumentation
+        self.batches = 0
+        self.samples = 0
+        self.failures = 0
+        self.dropped = 0
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._last_stats = (time.monotonic(), 0)
+
+    @property
+    def name(self):
+        return self.sink.name
+
+    def __len__(self):
+        return len(self._queue)
+
+    def start(self):
+        """
+        Starts the worker thread.
+        """
+        self._thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+        self._thread.start()
+
+    def put(self, batch):
+        """
+        Queues a batch without blocking.
+
+        :param batch: list of {"ts": ts, "values": values} dictionaries
+        :return: False if a batch, this one or the oldest queued, was dropped
+        """
+        with self._condition:
+            accepted = True
+            if len(self._queue) >= self.queue_size:
+                if self.drop_policy == DROP_NEWEST:
+                    self.dropped += len(batch)
+                    return False
+                self.dropped += len(self._queue.popleft())
+                accepted = False
+            self._queue.append(batch)
+            self._condition.notify()
+            return accepted
+
+    def _next(self):
+        with self._condition:
+            while not self._queue and not self._stopping:
+                self._condition.wait()
+            return self._queue.popleft() if self._queue else None
+
+    def _hold(self, batch):
+        # Put the batch back at the front; if the queue filled up meanwhile, the policy picks the loser
+        with self._condition:
+            self._queue.appendleft(batch)
+            while len(self._queue) > self.queue_size:
+                self.dropped += len(self._queue.popleft() if self.drop_policy == DROP_OLDEST else self._queue.pop())
+            # put() notifies the same condition, so wait out the full delay rather than the first wakeup
+            deadline = time.monotonic() + self.retry_delay
+            while not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return not self._stopping
+
+    def _run(self):
+        while True:
+            batch = self._next()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            try:
+                delivered = self.sink.write(batch)
+            except SinkBusy as e:
+                self.logger.debug("Sink %s busy (%s), retrying in %gs.", self.name, e, self.retry_delay)
+                if self.instrumentation is not None:
+                    self.instrumentation.increment("publish_deferred")
+                if not self._hold(batch):
+                    return
+                continue
+            except Exception as e:
+                self.logger.error("Sink %s failed to write %d samples: %s", self.name, len(batch), e)
+                delivered = False
+            if self.instrumentation is not None:
+                self.instrumentation.observe("publish", time.perf_counter() - start)
+                if not delivered:
+                    self.instrumentation.increment("publish_failures")
+            if delivered:
+                self.batches += 1
+                self.samples += len(batch)
+            else:
+                self.failures += 1
+
+    def stats(self):
+        """
+        :return: dictionary of queue depth, delivered batches and samples, failed
+            batches, dropped samples, and samples delivered per second since the
+            previous call
+        """
+        now = time.monotonic()
+        since, samples = self._last_stats
+        self._last_stats = (now, self.samples)
+        return {
+            "queue_depth": len(self._queue),
+            "batches": self.batches,
+            "samples": self.samples,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "samples_per_s": (self.samples - samples) / (now - since) if now > since else 0.0,
+        }
+
+    def close(self, timeout=5.0):
+        """
+        Stops the worker after it has written what is queued, or after `timeout`
+        seconds, and closes the sink.
+
+        :param timeout: seconds to wait for the queue to drain
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue and self._thread is not None and self._thread.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._queue:
+            self.logger.warning("Sink %s closed with %d batches unsent.", self.name, len(self._queue))
+        self.sink.close()
+
+
+class SinkFanout:
+    """
+    Hands every batch to each of several sink workers.
+
+    Args:
+        workers (list): SinkWorker instances, one per sink.
+        logger (logging.Logger): Logger used to report drops.
+    """
+
+    def __init__(self, workers, logger):
+        self.workers = list(workers)
+        self.logger = logger
+        names = [worker.name for worker in self.workers]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Sink names must be unique: {', '.join(names)}")
+
+    def start(self):
+        """
+        Starts every sink's worker thread.
+        """
+        for worker in self.workers:
+            worker.start()
+
+    def publish(self, batches):
+        """
+        Queues batches on every sink without blocking.
+
+        :param batches: list of batches, each a list of {"ts": ts, "values": values} dictionaries
+        """
+        for worker in self.workers:
+            dropped = sum(not worker.put(batch) for batch in batches)
+            if dropped:
+                self.logger.warning("Sink %s queue full, %d batches dropped (%s).",
+                                    worker.name, dropped, worker.drop_policy)
+
+    def stats(self):
+        """
+        :return: flat dictionary of each sink's counters as `sink_<name>_<counter>`
+        """
+        return {f"sink_{worker.name}_{key}": value
+                for worker in self.workers for key, value in worker.stats().items()}
+
+    def close(self, timeout=5.0):
+        """
+        Stops every worker, giving each up to `timeout` seconds to drain its queue.
+
+        :param timeout: seconds each sink may take to drain
+        """
+        for worker in self.workers:
+            worker.close(timeout)
@@ -2,103 +2,131 @@
 telemetry.py
 
 Provides the TelemetryCollector class, which gathers system metrics from a
-Raspberry Pi or other Linux-based device. These metrics include CPU usage,
-CPU temperature, GPU temperature, RAM usage, and disk usage.
+Raspberry Pi or other Linux-based device through a set of collector plugins.
+By default these are CPU usage, CPU temperature, GPU temperature, RAM usage,
+and disk usage. CPU usage is computed from /proc/stat deltas between cycles,
+so collection never sleeps.
 
 All metrics are returned as a dictionary of telemetry data, along with a list
-of any errors encountered during collection. This data is intended for use
-with IoT platforms such as ThingsBoard.
+of CollectorError records for any collector that failed. This data is intended
+for use with IoT platforms such as ThingsBoard.
 
 Classes:
     TelemetryCollector
 
 Usage:
-    collector = TelemetryCollector()
+    collector = TelemetryCollector(logger=logger)
     telemetry, errors = collector.get_telemetry()
 """
 
-import psutil
-import subprocess
+import logging
+
+from monitoring_service.collectors.base import COST_CHEAP, CollectorError
+from monitoring_service.collectors.registry import CollectorRegistry, DEFAULT_COLLECTORS
 
 
 class TelemetryCollector:
     """
     Manages the collection of telemetry from the Raspberry Pi.
     Uses get_telemetry to collect telemetry from the Raspberry Pi in the form of a
-    dictionary of telemetry data.
+    dictionary of telemetry data. Metrics are collected by named collector plugins,
+    which can be collected selectively so each one can be polled on its own interval.
+
+    Args:
+        mount_path (str): Mount point reported by the disk_usage collector unless
+            its own options set one.
+        collectors (dict): Collector name to options dict. A list of names is also
+            accepted. Defaults to the five built-in collectors.
+        logger (logging.Logger): Logger passed to the collectors.
+        registry (CollectorRegistry): Registry used to resolve collector names.
+        instrumentation (Instrumentation): If set, every collector call is timed
+            into a `collector_<name>` latency histogram.
+
+    Raises:
+        KeyError: If a configured collector cannot be found.
     """
-    def __init__(self, mount_path="/"):
+
+    def __init__(self, mount_path="/", collectors=None, logger=None, registry=None, instrumentation=None):
         self.mount_path = mount_path
+        self.instrumentation = instrumentation
+        self.logger = logger or logging.getLogger(__name__)
+        self.registry = registry or CollectorRegistry(self.logger)
+
+        if collectors is None:
+            collectors = DEFAULT_COLLECTORS
+        if not isinstance(collectors, dict):
+            collectors = {name: {} for name in collectors}
+
+        self.collectors = {}
+        for name, options in collectors.items():
+            options = dict(options or {})
+            if name == "disk_usage":
+                options.setdefault("mount_path", self.mount_path)
+            self.collectors[name] = self.registry.create(name, options)
+        self.metrics = tuple(self.collectors)
+
+    def keys(self):
+        """
+        :return: tuple of the metric keys the collectors declare, in collector order
+        """
+        return tuple(key for name, collector in self.collectors.items() for key in (collector.keys or (name,)))
 
-    @staticmethod
-    def _get_cpu_usage():
-        cpu_usage = psutil.cpu_percent(interval=1)
-        return cpu_usage
+    def default_intervals(self):
+        """
+        :return: dictionary of collector name to its declared default interval,
+            for collectors that declare one
+        """
+        return {name: collector.default_interval for name, collector in self.collectors.items()
+                if collector.default_interval is not None}
 
-    @staticmethod
-    def _get_cpu_temp():
-        with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
-            temp_str = f.readline()
-            return float(temp_str) / 1000.0
+    def is_cheap(self, metric):
+        """
+        :param metric: collector name
+        :return: True if the collector only does non-blocking reads and can run inline
+        """
+        return self.collectors[metric].cost == COST_CHEAP
 
-    @staticmethod
-    def _get_gpu_temp():
-        vcgencmd_path = "/usr/bin/vcgencmd"
-        result = subprocess.run([vcgencmd_path, 'measure_temp'], capture_output=True, text=True)
-        if result.returncode == 0:
-            temp_str = result.stdout.strip()
-            temp_value = temp_str.split('=')[1].replace("'C", "")
-            return float(temp_value)
-        else:
-            return None
+    def collect_metric(self, metric):
+        """
+        Collects a single collector's metrics, catching any error raised while reading them.
 
-    @staticmethod
-    def _get_mem_usage():
-        mem_usage = psutil.virtual_memory().percent
-        return mem_usage
+        :param metric: collector name
+        :return: dictionary of telemetry data, CollectorError or None
+        """
+        collector = self.collectors[metric]
+        if self.instrumentation is None:
+            return self._collect(metric, collector)
+        with self.instrumentation.time(f"collector_{metric}"):
+            return self._collect(metric, collector)
 
-    def _get_disk_usage(self):
-        # TODO: support configurable mount point
-        disk_usage = psutil.disk_usage(self.mount_path).percent
-        return disk_usage
+    @staticmethod
+    def _collect(metric, collector):
+        try:
+            return collector.collect(), None
+        except Exception as e:
+            return dict.fromkeys(collector.keys or (metric,)), CollectorError.now(metric, f"{type(e).__name__}: {e}")
 
-    def get_telemetry(self):
-        # TODO: move error logging into this function, remove from agent.py
+    def get_telemetry(self, metrics=None):
         """
         Collects system metrics from a Raspberry Pi.
-        :return: dictionary of telemetry data, list of errors encountered
+        :param metrics: collector names to collect, defaults to all of them
+        :return: dictionary of telemetry data, list of CollectorError
         """
+        metrics = self.metrics if metrics is None else metrics
         data = {}
         errors = []
 
-        try:
-            data['cpu_usage'] = self._get_cpu_usage()
-        except Exception as e:
-            errors.append(f"Error getting cpu usage: {e}")
-            data['cpu_usage'] = None
-
-        try:
-            data['cpu_temp'] = self._get_cpu_temp()
-        except Exception as e:
-            errors.append(f"Error getting cpu temp: {e}")
-            data['cpu_temp'] = None
-
-        try:
-            data['gpu_temp'] = self._get_gpu_temp()
-        except Exception as e:
-            errors.append(f"Error getting gpu temp: {e}")
-            data['gpu_temp'] = None
-
-        try:
-            data['ram_usage'] = self._get_mem_usage()
-        except Exception as e:
-            errors.append(f"Error getting memory usage: {e}")
-            data['ram_usage'] = None
-
-        try:
-            data['disk_usage'] = self._get_disk_usage()
-        except Exception as e:
-            errors.append(f"Error getting disk usage: {e}")
-            data['disk_usage'] = None
+        for metric in metrics:
+            values, error = self.collect_metric(metric)
+            data.update(values)
+            if error:
+                errors.append(error)
 
         return data, errors
+
+    def close(self):
+        """
+        Releases resources held by the collectors.
+        """
+        for collector in self.collectors.values():
+            collector.close()
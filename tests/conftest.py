@@ -0,0 +1,20 @@
+import pytest
+
+
+class FakeClock:
+    """Monotonic clock that only advances when a test moves it or something sleeps on it."""
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,63 @@
+import pytest
+
+from monitoring_service.adaptive import AdaptiveInterval
+
+
+def make_adaptive(**kwargs):
+    return AdaptiveInterval(min_interval=5, max_interval=60, relax_after=30, relax_factor=2,
+                            rules={"cpu_temp": {"threshold": 70, "hysteresis": 3}}, **kwargs)
+
+
+def test_threshold_drops_to_min_interval_immediately():
+    adaptive = make_adaptive()
+    assert adaptive.observe(0, {"cpu_temp": 60.0}) == 60
+    assert adaptive.observe(5, {"cpu_temp": 71.0}) == 5
+    assert adaptive.active == {"cpu_temp>=70"}
+
+
+def test_hysteresis_keeps_rule_triggered_just_below_threshold():
+    adaptive = make_adaptive()
+    adaptive.observe(0, {"cpu_temp": 71.0})
+    assert adaptive.observe(5, {"cpu_temp": 68.0}) == 5
+    adaptive.observe(10, {"cpu_temp": 66.9})
+    assert not adaptive.active
+
+
+def test_interval_relaxes_stepwise_to_max_after_calm_periods():
+    adaptive = make_adaptive()
+    adaptive.observe(0, {"cpu_temp": 75.0})
+    intervals = [adaptive.observe(now, {"cpu_temp": 50.0}) for now in range(5, 200, 5)]
+
+    assert intervals[0] == 5
+    assert sorted(set(intervals)) == [5, 10, 20, 40, 60]
+    assert intervals[-1] == 60
+
+
+def test_fast_change_triggers_rate_rule():
+    adaptive = AdaptiveInterval(min_interval=1, max_interval=30, rules={"cpu_temp": {"rate": 0.5}}, smoothing=1.0)
+    adaptive.observe(0, {"cpu_temp": 50.0})
+    assert adaptive.observe(2, {"cpu_temp": 50.5}) == 30
+    assert adaptive.observe(4, {"cpu_temp": 53.0}) == 1
+    adaptive.observe(6, {"cpu_temp": 53.2})
+    assert not adaptive.active
+
+
+def test_missing_and_non_numeric_values_are_ignored():
+    adaptive = make_adaptive()
+    assert adaptive.observe(0, {"cpu_temp": None}) == 60
+    assert adaptive.observe(5, {"cpu_temp": "hot"}) == 60
+
+
+def test_invalid_bounds_raise():
+    with pytest.raises(ValueError):
+        AdaptiveInterval(min_interval=10, max_interval=5)
+
+
+def test_max_interval_change_moves_a_stable_interval_and_clamps_a_fast_one():
+    adaptive = AdaptiveInterval(min_interval=5, max_interval=60, rules={"cpu_temp": {"threshold": 70}})
+    adaptive.set_max_interval(300)
+    assert adaptive.interval == 300
+
+    adaptive.observe(0.0, {"cpu_temp": 75.0})
+    adaptive.set_max_interval(2)
+    assert adaptive.max_interval == 5 and adaptive.interval == 5
@@ -0,0 +1,459 @@
+import asyncio
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from monitoring_service.agent import MonitoringAgent
+from monitoring_service.scheduler import Scheduler
+from tests.conftest import FakeClock
+
+
+class DummyLogger:
+    def debug(self, msg, *args):
+        pass
+
+    def info(self, msg, *args):
+        pass
+
+    def warning(self, msg, *args):
+        print(f"LOG WARNING: {msg % args}")
+
+    def error(self, msg, *args):
+        print(f"LOG ERROR: {msg % args}")
+
+
+class RecordingLogger(DummyLogger):
+    def __init__(self):
+        self.infos = []
+
+    def info(self, msg, *args):
+        self.infos.append(msg % args)
+
+
+class StopLoop(Exception):
+    pass
+
+
+def make_scheduler(cycles):
+    """Scheduler on a fake clock that stops the agent loop after `cycles` ticks."""
+    clock = FakeClock()
+
+    def sleep(delay):
+        if len(clock.sleeps) == cycles - 1:
+            raise StopLoop()
+        clock.sleep(delay)
+
+    return Scheduler(clock=clock, sleep=sleep)
+
+
+def run_cycles(agent):
+    with pytest.raises(StopLoop):
+        agent.start()
+
+
+@pytest.fixture
+def telemetry_collector():
+    collector = MagicMock()
+    collector.metrics = ("cpu_usage", "disk_usage")
+    collector.default_intervals.return_value = {}
+    collector.is_cheap.return_value = False
+    collector.get_telemetry.return_value = ({"cpu_usage": 10.0}, [])
+    return collector
+
+
+@pytest.fixture
+def attributes_collector():
+    collector = MagicMock()
+    collector.as_dict.return_value = {"device_name": "test"}
+    return collector
+
+
+def test_samples_are_published_as_one_batch_per_poll_period(telemetry_collector, attributes_collector):
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=3, sample_period=1, scheduler=make_scheduler(6))
+    run_cycles(agent)
+
+    assert telemetry_collector.get_telemetry.call_count == 6
+    assert tb_client.send_telemetry_batch.call_count == 2
+    first_batch = tb_client.send_telemetry_batch.call_args_list[0][0][0]
+    batch = tb_client.send_telemetry_batch.call_args_list[1][0][0]
+    assert len(first_batch) == 1
+    assert len(batch) == 3
+    assert batch[0]["values"] == {"cpu_usage": 10.0}
+
+
+def test_default_sample_period_publishes_every_cycle(telemetry_collector, attributes_collector):
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=60, scheduler=make_scheduler(2))
+    run_cycles(agent)
+
+    assert tb_client.send_telemetry_batch.call_count == 2
+    # Without a replay interval nothing replays the outbox
+    tb_client.drain_outbox.assert_not_called()
+
+
+def test_only_changed_attributes_are_sent(telemetry_collector, attributes_collector):
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client)
+    attributes_collector.as_dict.side_effect = [
+        {"device_name": "test", "ip_address": "10.0.0.1"},
+        {"device_name": "test", "ip_address": "10.0.0.1"},
+        {"device_name": "test", "ip_address": "10.0.0.2"},
+    ]
+    for _ in range(3):
+        agent._read_and_send_attributes()
+
+    sent = [call[0][0] for call in tb_client.send_attributes.call_args_list]
+    assert sent == [{"device_name": "test", "ip_address": "10.0.0.1"}, {"ip_address": "10.0.0.2"}]
+
+
+def test_attributes_are_fully_resent_after_interval(telemetry_collector, attributes_collector):
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            attributes_full_resend=100)
+    with patch("monitoring_service.agent.time.monotonic", side_effect=[1000.0, 1050.0, 1101.0]):
+        for _ in range(3):
+            agent._read_and_send_attributes()
+
+    sent = [call[0][0] for call in tb_client.send_attributes.call_args_list]
+    assert sent == [{"device_name": "test"}, {"device_name": "test"}]
+
+
+def test_unsent_attributes_are_retried(telemetry_collector, attributes_collector):
+    tb_client = MagicMock()
+    tb_client.send_attributes.side_effect = [False, True]
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client)
+    agent._read_and_send_attributes()
+    agent._read_and_send_attributes()
+
+    assert tb_client.send_attributes.call_count == 2
+
+
+def test_metrics_are_collected_on_their_own_intervals(telemetry_collector, attributes_collector):
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=10, intervals={"disk_usage": 20, "attributes": 30},
+                            scheduler=make_scheduler(4))
+    run_cycles(agent)
+
+    collected = [call[0][0] for call in telemetry_collector.get_telemetry.call_args_list]
+    assert collected == [["cpu_usage", "disk_usage"], ["cpu_usage"], ["cpu_usage", "disk_usage"], ["cpu_usage"]]
+    assert tb_client.send_telemetry_batch.call_count == 4
+    assert attributes_collector.as_dict.call_count == 2
+
+
+class SlowCollector:
+    """Collector whose metrics each block for a fixed time."""
+    def __init__(self, delays):
+        self.delays = delays
+        self.metrics = tuple(delays)
+
+    def default_intervals(self):
+        return {}
+
+    def is_cheap(self, metric):
+        return False
+
+    def collect_metric(self, metric):
+        time.sleep(self.delays[metric])
+        return {metric: 1.0}, None
+
+
+def run_async_ticks(agent, ticks):
+    async def run():
+        loop = asyncio.get_running_loop()
+        collectors = ThreadPoolExecutor(max_workers=agent.max_workers)
+        publisher = ThreadPoolExecutor(max_workers=1)
+        durations = []
+        for _ in range(ticks):
+            start = time.monotonic()
+            await agent._run_tick_async(agent.scheduler.due(), loop, collectors, publisher)
+            durations.append(time.monotonic() - start)
+        publisher.shutdown(wait=True)
+        collectors.shutdown(wait=True)
+        return durations
+
+    return asyncio.run(run())
+
+
+def test_async_cycle_is_bounded_by_slowest_collector(attributes_collector):
+    collector = SlowCollector({"a": 0.2, "b": 0.2, "c": 0.2, "d": 0.25})
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), collector, attributes_collector, tb_client,
+                            poll_period=60)
+    durations = run_async_ticks(agent, 1)
+
+    assert durations[0] < 0.5  # sequential collection would take 0.85 s
+    batch = tb_client.send_telemetry_batch.call_args[0][0]
+    assert batch[0]["values"] == {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0}
+
+
+def test_async_collector_timeout_reports_none(attributes_collector):
+    collector = SlowCollector({"fast": 0.0, "hung": 1.0})
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), collector, attributes_collector, tb_client,
+                            poll_period=60, collector_timeouts={"hung": 0.1})
+    durations = run_async_ticks(agent, 1)
+
+    assert durations[0] < 0.5
+    batch = tb_client.send_telemetry_batch.call_args[0][0]
+    assert batch[0]["values"] == {"fast": 1.0, "hung": None}
+
+
+def test_aggregator_publishes_window_summaries(telemetry_collector, attributes_collector):
+    from monitoring_service.aggregation import WindowAggregator
+    telemetry_collector.get_telemetry.side_effect = [({"cpu_usage": float(v)}, []) for v in range(1, 7)]
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=3, sample_period=1, scheduler=make_scheduler(6),
+                            aggregator=WindowAggregator(capacity=3, aggregates=["max", "mean"]),
+                            aggregation_window=3)
+    run_cycles(agent)
+
+    published = [sample["values"] for call in tb_client.send_telemetry_batch.call_args_list
+                 for sample in call[0][0]]
+    assert published == [{"cpu_usage_max": 1.0, "cpu_usage_mean": 1.0},
+                         {"cpu_usage_max": 4.0, "cpu_usage_mean": 3.0}]
+
+
+def test_deadband_skips_unchanged_samples(telemetry_collector, attributes_collector):
+    from monitoring_service.deadband import DeadbandFilter
+    telemetry_collector.get_telemetry.side_effect = [({"cpu_usage": v}, []) for v in (10.0, 10.0, 15.0)]
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=3, sample_period=1, scheduler=make_scheduler(3),
+                            deadband=DeadbandFilter())
+    run_cycles(agent)
+    agent._publish(agent._drain_batches())
+
+    published = [sample["values"] for call in tb_client.send_telemetry_batch.call_args_list
+                 for sample in call[0][0]]
+    assert published == [{"cpu_usage": 10.0}, {"cpu_usage": 15.0}]
+
+
+def test_one_summary_line_per_cycle_and_sampled_details(telemetry_collector, attributes_collector):
+    telemetry_collector.get_telemetry.side_effect = [
+        ({"cpu_usage": 10.0}, []),
+        ({"cpu_usage": 10.0}, []),
+        ({"cpu_usage": None}, ["cpu_usage: failed"]),
+        ({"cpu_usage": 10.0}, []),
+    ]
+    logger = RecordingLogger()
+    agent = MonitoringAgent("host", "token", logger, telemetry_collector, attributes_collector, MagicMock(),
+                            poll_period=1, scheduler=make_scheduler(4), log_every=3)
+    run_cycles(agent)
+
+    summaries = [line for line in logger.infos if line.startswith("cycle=")]
+    details = [line for line in logger.infos if line.startswith("Collected telemetry")]
+    assert [line.split()[0] for line in summaries] == ["cycle=0", "cycle=1", "cycle=2", "cycle=3"]
+    assert "errors=1" in summaries[2]
+    # cycle 0 and 3 are sampled, cycle 2 is logged because of its error
+    assert len(details) == 3
+
+
+def test_instrumentation_is_published_as_agent_telemetry(telemetry_collector, attributes_collector):
+    from monitoring_service.instrumentation import Instrumentation
+    instrumentation = Instrumentation()
+    tb_client = MagicMock()
+    tb_client.send_telemetry_batch.side_effect = [True, True, False]
+    tb_client.pending.return_value = 7
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=1, scheduler=make_scheduler(3), instrumentation=instrumentation,
+                            instrumentation_interval=2)
+    run_cycles(agent)
+
+    assert instrumentation.histograms["cycle"].count == 3
+    sent = tb_client.send_telemetry.call_args_list[-1][0][0]
+    assert sent["agent_publish_count"] == 2
+    assert sent["agent_publish_failures"] == 1
+    assert sent["agent_outbox_depth"] == 7
+
+
+def test_full_publish_window_holds_samples_for_the_next_cycle(telemetry_collector, attributes_collector):
+    from monitoring_service.inflight import PublishWindowFull
+    tb_client = MagicMock()
+    tb_client.send_telemetry_batch.side_effect = [PublishWindowFull("2 publishes awaiting acknowledgement"), True]
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=1, scheduler=make_scheduler(2))
+    run_cycles(agent)
+
+    batch = tb_client.send_telemetry_batch.call_args_list[1][0][0]
+    assert len(batch) == 2
+    assert len(agent.sample_buffer) == 0
+
+
+def test_history_records_every_collected_sample(telemetry_collector, attributes_collector):
+    history = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, MagicMock(),
+                            poll_period=3, sample_period=1, scheduler=make_scheduler(3), history=history)
+    run_cycles(agent)
+
+    assert history.append.call_count == 3
+    assert history.append.call_args[0][1] == {"cpu_usage": 10.0}
+
+
+def test_adaptive_interval_speeds_up_publishing_and_triggering_collector(telemetry_collector, attributes_collector):
+    from monitoring_service.adaptive import AdaptiveInterval
+    telemetry_collector.metrics = ("cpu_usage", "cpu_temp")
+    telemetry_collector.get_telemetry.return_value = ({"cpu_usage": 10.0, "cpu_temp": 75.0}, [])
+    adaptive = AdaptiveInterval(min_interval=5, max_interval=60, rules={"cpu_temp": {"threshold": 70}})
+    scheduler = make_scheduler(2)
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, MagicMock(),
+                            poll_period=60, intervals={"cpu_temp": 30}, scheduler=scheduler, adaptive=adaptive)
+    assert scheduler.interval("cpu_temp") == 30
+    run_cycles(agent)
+
+    assert scheduler.interval("publish") == 5
+    assert scheduler.interval("cpu_temp") == 5
+    assert scheduler.interval("cpu_usage") == 60
+
+
+def test_unknown_adaptive_job_is_ignored(telemetry_collector, attributes_collector):
+    from monitoring_service.adaptive import AdaptiveInterval
+    adaptive = AdaptiveInterval(min_interval=5, max_interval=60)
+    scheduler = make_scheduler(1)
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, MagicMock(),
+                            poll_period=60, scheduler=scheduler, adaptive=adaptive,
+                            adaptive_jobs=["publish", "cpu_usgae"])
+
+    assert agent._adaptive_jobs == {"publish": 60}
+
+
+def test_sinks_receive_batches_instead_of_tb_client(telemetry_collector, attributes_collector):
+    tb_client = MagicMock()
+    sinks = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=1, scheduler=make_scheduler(2), sinks=sinks)
+    run_cycles(agent)
+
+    assert sinks.publish.call_count == 2
+    assert sinks.publish.call_args[0][0][0][0]["values"] == {"cpu_usage": 10.0}
+    tb_client.send_telemetry_batch.assert_not_called()
+    tb_client.send_attributes.assert_called()
+
+
+def make_remote(*commands):
+    from monitoring_service.remote import Command
+    remote = MagicMock()
+    remote.pending.side_effect = [[Command(*command) for command in commands]] + [[]] * 1000
+    return remote
+
+
+def test_remote_poll_period_change_reschedules_publishing_and_sampling(telemetry_collector, attributes_collector):
+    from monitoring_service.remote import SET_POLL_PERIOD
+    remote = make_remote((SET_POLL_PERIOD, {"poll_period": 10.0}, "7"))
+    scheduler = make_scheduler(1)
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, MagicMock(),
+                            poll_period=60, scheduler=scheduler, remote=remote)
+    run_cycles(agent)
+
+    assert scheduler.interval("publish") == 10.0
+    assert scheduler.interval("cpu_usage") == 10.0
+    assert scheduler.interval("attributes") == 60
+    remote.reply.assert_called_once_with("7", {"poll_period": 10.0})
+
+
+def test_remote_snapshot_publishes_every_metric_at_once(telemetry_collector, attributes_collector):
+    from monitoring_service.remote import SNAPSHOT
+    remote = make_remote((SNAPSHOT, {}, "8"))
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=60, scheduler=make_scheduler(1), remote=remote)
+    run_cycles(agent)
+
+    telemetry_collector.get_telemetry.assert_called_with(["cpu_usage", "disk_usage"])
+    reply = remote.reply.call_args[0]
+    assert reply[0] == "8" and reply[1]["values"] == {"cpu_usage": 10.0}
+    # The regular sample and the snapshot go out in separate batches
+    assert [len(call[0][0]) for call in tb_client.send_telemetry_batch.call_args_list] == [1, 1]
+
+
+def test_remote_burst_uploads_samples_as_one_batch(telemetry_collector, attributes_collector):
+    from monitoring_service.remote import START_BURST
+    remote = make_remote((START_BURST, {"rate_hz": 10.0, "duration": 1.0, "metrics": ["cpu_usage"],
+                                        "max_samples": 11}, "9"))
+    tb_client = MagicMock()
+    scheduler = make_scheduler(15)
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=60, scheduler=scheduler, remote=remote)
+    run_cycles(agent)
+
+    assert remote.reply.call_args_list[0][0] == ("9", {"burst": "started", "rate_hz": 10.0, "duration": 1.0,
+                                                       "metrics": ["cpu_usage"]})
+    bursts = [call[0][0] for call in tb_client.send_telemetry_batch.call_args_list if len(call[0][0]) > 1]
+    assert len(bursts) == 1
+    assert len(bursts[0]) == 11
+    assert agent._burst is None
+    assert scheduler.overruns == 0
+
+
+def test_outbox_is_replayed_on_its_own_interval(telemetry_collector, attributes_collector):
+    tb_client = MagicMock()
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=60, scheduler=make_scheduler(10), replay_interval=1.0)
+    run_cycles(agent)
+
+    # One replay per second, none tied to the publish
+    assert tb_client.drain_outbox.call_count == 10
+
+
+def test_async_blocked_publisher_does_not_queue_publishes(telemetry_collector, attributes_collector):
+    import threading
+    release = threading.Event()
+    tb_client = MagicMock()
+    tb_client.send_telemetry_batch.side_effect = lambda batch: release.wait(5)
+    telemetry_collector.collect_metric.return_value = ({"cpu_usage": 10.0}, None)
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, tb_client,
+                            poll_period=60)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        collectors = ThreadPoolExecutor(max_workers=1)
+        publisher = ThreadPoolExecutor(max_workers=1)
+        for _ in range(3):
+            await agent._run_tick_async(["cpu_usage", "publish", "attributes"], loop, collectors, publisher)
+        queued = publisher._work_queue.qsize()
+        release.set()
+        publisher.shutdown(wait=True)
+        collectors.shutdown(wait=True)
+        return queued
+
+    # The first publish blocks; the attributes job waits behind it and nothing else is queued
+    assert asyncio.run(run()) == 1
+    assert tb_client.send_telemetry_batch.call_count == 1
+    # The samples of the skipped publishes are still buffered
+    assert len(agent.sample_buffer) == 2
+
+
+def test_deadband_reference_is_dropped_with_an_overwritten_sample(telemetry_collector, attributes_collector):
+    from monitoring_service.deadband import DeadbandFilter
+    from monitoring_service.sample_buffer import SampleBuffer
+    telemetry_collector.get_telemetry.side_effect = [
+        ({"cpu_usage": 10.0, "ram_usage": 40.0}, []),
+        ({"cpu_usage": 10.5, "ram_usage": 50.0}, []),
+        ({"cpu_usage": 11.0, "ram_usage": 50.0}, []),
+    ]
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, MagicMock(),
+                            sample_buffer=SampleBuffer(capacity=1), deadband=DeadbandFilter(default={"absolute": 2.0}))
+    for _ in range(3):
+        agent._read_telemetry()
+
+    # cpu_usage 10.0 was overwritten before it was published, so 11.0 is not measured against it
+    assert [sample["values"] for sample in agent.sample_buffer.drain_batches()[0]] == [{"cpu_usage": 11.0}]
+
+
+def test_remote_poll_period_change_moves_the_adaptive_ceiling(telemetry_collector, attributes_collector):
+    from monitoring_service.adaptive import AdaptiveInterval
+    from monitoring_service.remote import SET_POLL_PERIOD
+    remote = make_remote((SET_POLL_PERIOD, {"poll_period": 300.0}, "7"))
+    adaptive = AdaptiveInterval(min_interval=5, max_interval=60, rules={"cpu_usage": {"threshold": 90}})
+    scheduler = make_scheduler(1)
+    agent = MonitoringAgent("host", "token", DummyLogger(), telemetry_collector, attributes_collector, MagicMock(),
+                            poll_period=60, scheduler=scheduler, remote=remote, adaptive=adaptive)
+    run_cycles(agent)
+
+    assert adaptive.max_interval == 300
+    assert scheduler.interval("publish") == 300
+    assert scheduler.interval("cpu_usage") == 300
@@ -0,0 +1,40 @@
+import pytest
+from monitoring_service.aggregation import MetricWindow, WindowAggregator
+
+
+def test_window_summary_computes_aggregates():
+    window = MetricWindow(capacity=10)
+    for value in [4.0, 1.0, 3.0, 2.0]:
+        window.add(value)
+
+    assert window.summary(["min", "max", "mean", "last"]) == {"min": 1.0, "max": 4.0, "mean": 2.5, "last": 2.0}
+
+
+def test_p95_uses_nearest_rank():
+    window = MetricWindow(capacity=100)
+    for value in range(1, 101):
+        window.add(float(value))
+
+    assert window.p95() == 95.0
+
+
+def test_full_window_overwrites_oldest_samples():
+    window = MetricWindow(capacity=3)
+    for value in [100.0, 1.0, 2.0, 3.0]:
+        window.add(value)
+
+    assert window.summary(["max", "mean"]) == {"max": 3.0, "mean": 2.0}
+
+
+def test_aggregator_names_keys_and_resets_window():
+    aggregator = WindowAggregator(capacity=10, aggregates=["max", "last"], metrics={"disk_usage": ["last"]})
+    aggregator.add({"cpu_usage": 10.0, "disk_usage": 50.0, "gpu_temp": None})
+    aggregator.add({"cpu_usage": 30.0, "disk_usage": 51.0})
+
+    assert aggregator.summarise() == {"cpu_usage_max": 30.0, "cpu_usage": 30.0, "disk_usage": 51.0}
+    assert aggregator.summarise() == {}
+
+
+def test_unknown_aggregate_is_rejected():
+    with pytest.raises(ValueError):
+        WindowAggregator(capacity=10, aggregates=["median"])
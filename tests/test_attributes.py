@@ -9,8 +9,8 @@ def collector():
 
 
 class DummyLogger:
-    def error(self, msg):
-        print(f"LOG: {msg}")
+    def error(self, msg, *args):
+        print(f"LOG: {msg % args}")
 
 
 def test_as_dict_returns_expected_keys(collector):
@@ -34,3 +34,49 @@ def test_get_mac_address_returns_mac_string(collector):
     with patch("monitoring_service.attributes.uuid.getnode", return_value=0x001122334455):
         mac = collector._get_mac_address()
         assert mac == "00:11:22:33:44:55"
+
+
+def test_as_dict_serves_cached_values_within_ttl(collector):
+    with patch.object(collector, "_network_changed", return_value=False), \
+         patch.object(collector, "_get_ip_address", return_value="192.168.0.100") as mock_ip, \
+         patch.object(collector, "_get_mac_address", return_value="00:11:22:33:44:55") as mock_mac:
+        collector.as_dict()
+        collector.as_dict()
+
+    assert mock_ip.call_count == 1
+    assert mock_mac.call_count == 1
+
+
+def test_as_dict_refreshes_ip_after_network_change(collector):
+    with patch.object(collector, "_network_changed", side_effect=[False, True]), \
+         patch.object(collector, "_get_ip_address", side_effect=["192.168.0.100", "10.0.0.5"]), \
+         patch.object(collector, "_get_mac_address", return_value="00:11:22:33:44:55"):
+        first = collector.as_dict()
+        second = collector.as_dict()
+
+    assert first["ip_address"] == "192.168.0.100"
+    assert second["ip_address"] == "10.0.0.5"
+
+
+def test_as_dict_refreshes_expired_fields():
+    collector = AttributesCollector(device_name="TestDevice", logger=DummyLogger(), ttls={"ip_address": 10})
+    with patch.object(collector, "_network_changed", return_value=False), \
+         patch.object(collector, "_get_ip_address", return_value="192.168.0.100") as mock_ip, \
+         patch.object(collector, "_get_mac_address", return_value="00:11:22:33:44:55"), \
+         patch("monitoring_service.attributes.time.monotonic", side_effect=[0.0, 5.0, 11.0]):
+        for _ in range(3):
+            collector.as_dict()
+
+    assert mock_ip.call_count == 2
+
+
+def test_route_table_change_is_detected_without_netlink(tmp_path):
+    route_path = tmp_path / "route"
+    route_path.write_text("Iface\tDestination\neth0\t00000000\n")
+    collector = AttributesCollector(device_name="TestDevice", logger=DummyLogger(), route_path=str(route_path))
+    collector.close()
+
+    assert collector._network_changed() is False
+    assert collector._network_changed() is False
+    route_path.write_text("Iface\tDestination\nwlan0\t00000000\n")
+    assert collector._network_changed() is True
@@ -0,0 +1,352 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from unittest.mock import patch
+from monitoring_service.collectors import Collector, CollectorRegistry
+from monitoring_service.collectors.base import COST_CHEAP, COST_MODERATE
+from monitoring_service.collectors.cgroups import CgroupCollector
+from monitoring_service.collectors.cpu import CpuUsageCollector
+from monitoring_service.collectors.cpu_temp import CpuTempCollector
+from monitoring_service.collectors.disk import DiskUsageCollector
+from monitoring_service.collectors.disks import DisksCollector, parse_mountinfo
+from monitoring_service.collectors.gpu_temp import GpuTempCollector
+from monitoring_service.collectors.memory import MemoryCollector
+from monitoring_service.collectors.processes import ProcessesCollector
+from monitoring_service.collectors.thermal import ThermalCollector
+
+
+class DummyLogger:
+    def warning(self, msg, *args):
+        print(f"LOG WARNING: {msg % args}")
+
+
+class PluginCollector(Collector):
+    keys = ("plugin_value",)
+
+    def collect(self):
+        return {"plugin_value": 7}
+
+
+def test_cpu_usage_collector_reads_stat_file(tmp_path):
+    stat = tmp_path / "stat"
+    stat.write_text("cpu  25 0 0 75 0 0 0 0\ncpu0 25 0 0 75 0 0 0 0\nintr 1 2 3\n")
+    collector = CpuUsageCollector("cpu_usage", DummyLogger(), stat_path=str(stat))
+    result = collector.collect()
+    assert result["cpu_usage"] == 25.0
+    assert result["cpu0_usage"] == 25.0
+    assert set(collector.keys) == set(result)
+
+
+def test_cpu_temp_collector_returns_celsius(tmp_path):
+    temp = tmp_path / "temp"
+    temp.write_text("50000\n")
+    assert CpuTempCollector("cpu_temp", DummyLogger(), path=str(temp)).collect() == {"cpu_temp": 50.0}
+
+
+def test_gpu_temp_collector_is_cheap_only_with_a_sysfs_sensor(tmp_path):
+    zone = tmp_path / "class" / "thermal" / "thermal_zone0"
+    zone.mkdir(parents=True)
+    (zone / "type").write_text("cpu-thermal\n")
+    (zone / "temp").write_text("48300\n")
+    vcgencmd = tmp_path / "vcgencmd"
+    vcgencmd.write_text("#!/bin/sh\n")
+    os.chmod(vcgencmd, 0o755)
+
+    collector = GpuTempCollector("gpu_temp", DummyLogger(), sys_root=str(tmp_path), vcgencmd_path=str(vcgencmd))
+    assert collector.cost == COST_CHEAP
+    assert collector.collect() == {"gpu_temp": 48.3}
+    collector.close()
+
+    fallback = GpuTempCollector("gpu_temp", DummyLogger(), sys_root=str(tmp_path / "empty"),
+                                vcgencmd_path=str(vcgencmd))
+    assert fallback.cost == COST_MODERATE
+
+
+def test_memory_collector_returns_percent():
+    with patch("monitoring_service.collectors.memory.psutil.virtual_memory") as mock_vm:
+        mock_vm.return_value.percent = 60.0
+        assert MemoryCollector("ram_usage", DummyLogger()).collect() == {"ram_usage": 60.0}
+
+
+def test_disk_collector_uses_mount_path():
+    with patch("monitoring_service.collectors.disk.psutil.disk_usage") as mock_du:
+        mock_du.return_value.percent = 75.0
+        result = DiskUsageCollector("disk_usage", DummyLogger(), mount_path="/data").collect()
+    mock_du.assert_called_once_with("/data")
+    assert result == {"disk_usage": 75.0}
+
+
+MOUNTINFO = (
+    "22 1 179:2 / / rw,relatime shared:1 - ext4 /dev/mmcblk0p2 rw\n"
+    "23 22 0:5 / /dev rw shared:2 - devtmpfs udev rw\n"
+    "24 22 179:1 / /boot/firmware rw - vfat /dev/mmcblk0p1 rw\n"
+    "25 22 8:1 / /mnt/usb\\040disk rw - ext4 /dev/sda1 rw\n"
+)
+
+DISKSTATS = (
+    " 179       0 mmcblk0 {r} 0 {rs} 0 {w} 0 {ws} 0 0 0 0\n"
+    " 179       2 mmcblk0p2 {r} 0 {rs} 0 {w} 0 {ws} 0 0 0 0\n"
+    "   8       1 sda1 0 0 0 0 0 0 0 0 0 0 0\n"
+)
+
+
+def make_disks(tmp_path, counters=(0, 0, 0, 0), **options):
+    (tmp_path / "mountinfo").write_text(MOUNTINFO)
+    write_diskstats(tmp_path, counters)
+    return DisksCollector("disks", DummyLogger(), mountinfo_path=str(tmp_path / "mountinfo"),
+                          diskstats_path=str(tmp_path / "diskstats"), **options)
+
+
+def write_diskstats(tmp_path, counters):
+    r, rs, w, ws = counters
+    (tmp_path / "diskstats").write_text(DISKSTATS.format(r=r, rs=rs, w=w, ws=ws))
+
+
+def fake_statvfs(blocks=100, bfree=40, bavail=30):
+    return os.statvfs_result((4096, 4096, blocks, bfree, bavail, 0, 0, 0, 0, 255))
+
+
+def test_parse_mountinfo_unescapes_mount_points():
+    mounts = parse_mountinfo(MOUNTINFO)
+    assert mounts["/"] == ("179:2", "ext4")
+    assert mounts["/mnt/usb disk"] == ("8:1", "ext4")
+
+
+def test_disks_collector_matches_globs_and_skips_pseudo_filesystems(tmp_path):
+    collector = make_disks(tmp_path, mounts=["/", "/*", "/mnt/*"])
+    assert list(collector.mounts) == ["/", "/boot/firmware", "/mnt/usb disk"]
+    assert "/dev" not in collector.mounts
+    assert collector.devices == {"mmcblk0p2", "sda1"}
+    assert "disk_usage_mnt_usb_disk" in collector.keys
+    assert "disk_mmcblk0p2_write_iops" in collector.keys
+    collector.close()
+
+
+def test_disks_collector_reports_usage_and_throughput(tmp_path):
+    collector = make_disks(tmp_path, counters=(10, 100, 20, 200), devices=["mmcblk0"])
+    with patch("monitoring_service.collectors.disks.os.statvfs", return_value=fake_statvfs()), \
+            patch("monitoring_service.collectors.disks.time.monotonic", side_effect=[100.0, 102.0]):
+        first = collector.collect()
+        write_diskstats(tmp_path, (14, 140, 30, 300))
+        second = collector.collect()
+    collector.close()
+
+    assert first == {"disk_usage_root": 66.7}
+    assert second["disk_mmcblk0_read_bps"] == 40 * 512 / 2
+    assert second["disk_mmcblk0_write_bps"] == 100 * 512 / 2
+    assert second["disk_mmcblk0_read_iops"] == 2.0
+    assert second["disk_mmcblk0_write_iops"] == 5.0
+
+
+def test_disks_collector_times_out_hung_mounts(tmp_path):
+    release = threading.Event()
+
+    def hung_statvfs(path):
+        release.wait(5)
+        return fake_statvfs()
+
+    collector = make_disks(tmp_path, statvfs_timeout=0.05)
+    with patch("monitoring_service.collectors.disks.os.statvfs", side_effect=hung_statvfs):
+        assert collector.collect()["disk_usage_root"] is None
+        # The hung call is not submitted again while it is still pending
+        assert collector.collect()["disk_usage_root"] is None
+        release.set()
+    collector.close()
+
+
+def test_disks_collector_refreshes_changed_mount_table(tmp_path):
+    collector = make_disks(tmp_path, mounts=["/", "/srv"])
+    assert list(collector.mounts) == ["/"]
+    (tmp_path / "mountinfo").write_text(MOUNTINFO.replace(" / / ", " / /srv "))
+    with patch.object(collector, "_mounts_changed", return_value=True), \
+            patch("monitoring_service.collectors.disks.os.statvfs", return_value=fake_statvfs()):
+        result = collector.collect()
+    collector.close()
+    assert "disk_usage_srv" in result and "disk_usage_root" not in result
+
+
+def make_sysfs(tmp_path, throttled=None):
+    def write(path, text):
+        target = tmp_path / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(text)
+
+    write("class/thermal/thermal_zone0/type", "cpu-thermal\n")
+    write("class/thermal/thermal_zone0/temp", "52100\n")
+    write("class/hwmon/hwmon0/name", "cpu_thermal\n")
+    write("class/hwmon/hwmon0/temp1_input", "52100\n")
+    write("class/hwmon/hwmon1/name", "nvme\n")
+    write("class/hwmon/hwmon1/temp1_input", "38850\n")
+    write("class/hwmon/hwmon1/temp1_label", "Composite\n")
+    write("class/hwmon/hwmon1/temp2_input", "41850\n")
+    write("class/hwmon/hwmon1/temp2_label", "Sensor 1\n")
+    if throttled is not None:
+        write("devices/platform/soc/soc:firmware/get_throttled", throttled)
+    return tmp_path
+
+
+def test_thermal_collector_discovers_zones_and_hwmon(tmp_path):
+    collector = ThermalCollector("thermal", DummyLogger(), sys_root=str(make_sysfs(tmp_path)))
+    assert collector.keys == ("temp_cpu_thermal", "temp_nvme_composite", "temp_nvme_sensor_1")
+    assert collector.collect() == {"temp_cpu_thermal": 52.1, "temp_nvme_composite": 38.85,
+                                   "temp_nvme_sensor_1": 41.85}
+
+    # The descriptors stay open and are re-read from the start on every collection
+    (tmp_path / "class/thermal/thermal_zone0/temp").write_text("61000\n")
+    assert collector.collect()["temp_cpu_thermal"] == 61.0
+    collector.close()
+
+
+def test_thermal_collector_reports_throttle_flags(tmp_path):
+    collector = ThermalCollector("thermal", DummyLogger(), sys_root=str(make_sysfs(tmp_path, "50005\n")),
+                                 exclude=["temp_nvme_*"])
+    result = collector.collect()
+    collector.close()
+    assert "temp_nvme_composite" not in result
+    assert result["under_voltage"] is True and result["throttled"] is True
+    assert result["freq_capped"] is False
+    assert result["under_voltage_occurred"] is True and result["throttled_occurred"] is True
+    assert result["throttled_flags"] == 0x50005
+
+
+def test_thermal_collector_keeps_temperatures_when_throttle_flags_fail(tmp_path):
+    collector = ThermalCollector("thermal", DummyLogger(), sys_root=str(make_sysfs(tmp_path, "garbage\n")))
+    result = collector.collect()
+    collector.close()
+    assert result["temp_cpu_thermal"] == 52.1
+    assert result["throttled_flags"] is None and result["under_voltage"] is None
+
+
+def test_thermal_collector_reports_failing_sensor_as_none(tmp_path):
+    collector = ThermalCollector("thermal", DummyLogger(), sys_root=str(make_sysfs(tmp_path)))
+    with patch("monitoring_service.collectors.thermal.os.preadv", side_effect=OSError(5, "EIO")):
+        assert collector.collect() == dict.fromkeys(collector.keys)
+    collector.close()
+
+
+def write_process(proc, pid, name, ticks, rss_pages, start=100, cmdline=""):
+    fields = ["S"] + ["0"] * 10 + [str(ticks), "0"] + ["0"] * 6 + [str(start), "0", str(rss_pages)] + ["0"] * 10
+    (proc / str(pid)).mkdir(exist_ok=True)
+    (proc / str(pid) / "stat").write_text(f"{pid} ({name}) {' '.join(fields)}\n")
+    (proc / str(pid) / "cmdline").write_text(cmdline.replace(" ", "\0"))
+
+
+def test_processes_collector_ranks_by_cpu_and_rss(tmp_path):
+    write_process(tmp_path, 1, "init", 100, 1000, cmdline="/sbin/init splash")
+    write_process(tmp_path, 42, "my (worker)", 100, 5000)
+    write_process(tmp_path, 7, "idle", 100, 10)
+    collector = ProcessesCollector("processes", DummyLogger(), top_n=2, proc_path=str(tmp_path))
+    clock_ticks = collector.clock_ticks
+
+    with patch("monitoring_service.collectors.processes.time.monotonic", side_effect=lambda: clock[0]):
+        clock = [100.0]
+        first = collector.collect()
+        write_process(tmp_path, 1, "init", 100 + clock_ticks // 10, 1000, cmdline="/sbin/init splash")
+        write_process(tmp_path, 42, "my (worker)", 100 + clock_ticks // 2, 5000)
+        clock = [101.0]
+        second = collector.collect()
+
+    assert first["top_cpu_1_pid"] is None
+    assert (second["top_cpu_1_name"], second["top_cpu_1_pid"], second["top_cpu_1_cpu"]) == ("my (worker)", 42, 50.0)
+    assert second["top_cpu_1_cmd"] == "[my (worker)]"
+    assert (second["top_cpu_2_pid"], second["top_cpu_2_cpu"], second["top_cpu_2_cmd"]) == (1, 10.0, "/sbin/init splash")
+    assert second["top_rss_1_pid"] == 42
+    assert second["top_rss_1_rss_mb"] == round(5000 * collector.page_size / 1048576, 1)
+    assert second["top_rss_2_pid"] == 1
+    assert second["processes_total"] == 3
+    assert set(second) == set(collector.keys)
+
+
+def test_processes_collector_evicts_exited_and_reused_pids(tmp_path):
+    write_process(tmp_path, 10, "old", 500, 100)
+    collector = ProcessesCollector("processes", DummyLogger(), top_n=1, proc_path=str(tmp_path))
+    collector.collect()
+    write_process(tmp_path, 10, "new", 10, 100, start=900)
+    collector.collect()
+    assert collector._processes[10].name == "new"
+    assert collector._processes[10].cpu is None
+
+    for entry in (tmp_path / "10").iterdir():
+        entry.unlink()
+    (tmp_path / "10").rmdir()
+    assert collector.collect()["top_rss_1_pid"] is None
+    assert collector._processes == {}
+
+
+def test_processes_collector_resumes_scan_after_budget(tmp_path):
+    for pid in range(1, 6):
+        write_process(tmp_path, pid, f"p{pid}", 0, pid)
+    collector = ProcessesCollector("processes", DummyLogger(), top_n=1, budget=0, proc_path=str(tmp_path))
+    scanned = [collector.collect()["processes_scanned"] for _ in range(5)]
+    assert scanned == [1] * 5
+    assert sorted(collector._processes) == [1, 2, 3, 4, 5]
+
+
+def write_cgroup(path, usage_usec, current, rbytes, wbytes, peak=None):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "cpu.stat").write_text(f"usage_usec {usage_usec}\nuser_usec {usage_usec}\nsystem_usec 0\n")
+    (path / "memory.current").write_text(f"{current}\n")
+    if peak is not None:
+        (path / "memory.peak").write_text(f"{peak}\n")
+    (path / "io.stat").write_text(f"8:0 rbytes={rbytes} wbytes={wbytes} rios=1 wios=1 dbytes=0 dios=0\n"
+                                  f"179:0 rbytes={rbytes} wbytes=0 rios=1 wios=0 dbytes=0 dios=0\n")
+
+
+def test_cgroup_collector_reports_unit_rates(tmp_path):
+    service = tmp_path / "system.slice" / "nginx.service"
+    write_cgroup(service, 1_000_000, 64 * 1048576, 1000, 2000, peak=80 * 1048576)
+    write_cgroup(tmp_path / "user.slice" / "user-1000.slice", 0, 1048576, 0, 0)
+    collector = CgroupCollector("cgroups", DummyLogger(), units=["nginx.service", "user-1000.slice"],
+                                cgroup_root=str(tmp_path))
+
+    with patch("monitoring_service.collectors.cgroups.time.monotonic", side_effect=[100.0, 102.0]):
+        first = collector.collect()
+        write_cgroup(service, 2_000_000, 64 * 1048576, 5000, 4000, peak=80 * 1048576)
+        second = collector.collect()
+    collector.close()
+
+    assert first["cgroup_nginx_mem_mb"] == 64.0 and first["cgroup_nginx_cpu"] is None
+    assert second["cgroup_nginx_cpu"] == 50.0
+    assert second["cgroup_nginx_mem_peak_mb"] == 80.0
+    assert second["cgroup_nginx_io_read_bps"] == 4000.0
+    assert second["cgroup_nginx_io_write_bps"] == 1000.0
+    assert second["cgroup_user_1000_slice_mem_mb"] == 1.0
+    assert second["cgroup_user_1000_slice_mem_peak_mb"] is None
+    assert set(second) == set(collector.keys)
+
+
+def test_cgroup_collector_finds_unit_started_later(tmp_path):
+    collector = CgroupCollector("cgroups", DummyLogger(), units=["backup.service"], cgroup_root=str(tmp_path),
+                                resolve_interval=0)
+    assert collector.collect()["cgroup_backup_mem_mb"] is None
+    write_cgroup(tmp_path / "system.slice" / "backup.service", 0, 2 * 1048576, 0, 0)
+    assert collector.collect()["cgroup_backup_mem_mb"] == 2.0
+    collector.close()
+
+
+def test_unknown_option_is_rejected():
+    with pytest.raises(TypeError):
+        MemoryCollector("ram_usage", DummyLogger(), colour="blue")
+
+
+def test_registry_creates_module_class_reference():
+    registry = CollectorRegistry(DummyLogger())
+    collector = registry.create(f"{__name__}:PluginCollector")
+    assert collector.collect() == {"plugin_value": 7}
+
+
+def test_registry_lists_builtins_without_importing_them():
+    code = (
+        "import sys\n"
+        "from monitoring_service.telemetry import TelemetryCollector\n"
+        "from monitoring_service.collectors.registry import CollectorRegistry\n"
+        "import logging\n"
+        "assert 'ram_usage' in CollectorRegistry(logging.getLogger()).available()\n"
+        "TelemetryCollector(collectors=['cpu_usage'])\n"
+        "assert 'psutil' not in sys.modules, 'psutil imported'\n"
+        "assert 'monitoring_service.collectors.disk' not in sys.modules\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -55,3 +55,59 @@ def test_missing_required_json_key_raises_error(mock_file):
     logger = DummyLogger()
     with pytest.raises(KeyError):
         ConfigLoader(logger)
+
+
+# ✅ Test: Outbox section is optional and falls back to defaults
+@patch.dict(os.environ, {"ACCESS_TOKEN": "test_token", "THINGSBOARD_SERVER": "test_server"})
+@patch("builtins.open", new_callable=mock_open, read_data='{"poll_period": 10, "device_name": "Test", "mount_path": "/", "outbox": {"max_bytes": 2048}}')
+def test_outbox_defaults_are_merged(mock_file):
+    config = ConfigLoader(DummyLogger()).as_dict()
+
+    assert config["outbox"]["enabled"] is True
+    assert config["outbox"]["max_bytes"] == 2048
+    assert config["outbox"]["replay_batch_size"] == 500
+
+
+# ✅ Test: A list of collector names is normalised to a name -> options mapping
+@patch.dict(os.environ, {"ACCESS_TOKEN": "test_token", "THINGSBOARD_SERVER": "test_server"})
+@patch("builtins.open", new_callable=mock_open, read_data='{"poll_period": 10, "device_name": "Test", "mount_path": "/", "collectors": ["cpu_usage", "ram_usage"]}')
+def test_collector_list_is_normalised(mock_file):
+    config = ConfigLoader(DummyLogger()).as_dict()
+
+    assert config["collectors"] == {"cpu_usage": {}, "ram_usage": {}}
+
+
+# ❌ Test: Two keys sharing an alias would overwrite each other, so they are rejected
+@patch.dict(os.environ, {"ACCESS_TOKEN": "test_token", "THINGSBOARD_SERVER": "test_server"})
+@patch("builtins.open", new_callable=mock_open, read_data='{"poll_period": 10, "device_name": "Test", "mount_path": "/", "encoding": {"aliases": {"cpu_usage": "c", "cpu_temp": "c"}}}')
+def test_duplicate_encoding_aliases_raise_error(mock_file):
+    with pytest.raises(ValueError):
+        ConfigLoader(DummyLogger())
+
+
+# ✅ Test: Sink queue settings fall back to the section-wide values
+@patch.dict(os.environ, {"ACCESS_TOKEN": "test_token", "THINGSBOARD_SERVER": "test_server"})
+@patch("builtins.open", new_callable=mock_open, read_data='{"poll_period": 10, "device_name": "Test", "mount_path": "/", "sinks": {"enabled": true, "queue_size": 20, "mqtt": {"enabled": true, "host": "broker", "drop_policy": "drop_newest"}}}')
+def test_sink_settings_are_merged(mock_file):
+    sinks = ConfigLoader(DummyLogger()).as_dict()["sinks"]
+
+    assert sinks["thingsboard"]["queue_size"] == 20
+    assert sinks["mqtt"]["drop_policy"] == "drop_newest"
+    assert sinks["mqtt"]["topic"] == "monitoring/Test/telemetry"
+    assert sinks["file"]["enabled"] is False
+
+
+# ✅ Test: Unknown sink names are rejected
+@patch.dict(os.environ, {"ACCESS_TOKEN": "test_token", "THINGSBOARD_SERVER": "test_server"})
+@patch("builtins.open", new_callable=mock_open, read_data='{"poll_period": 10, "device_name": "Test", "mount_path": "/", "sinks": {"enabled": true, "influx": {"enabled": true}}}')
+def test_unknown_sink_is_rejected(mock_file):
+    with pytest.raises(ValueError):
+        ConfigLoader(DummyLogger())
+
+
+# ✅ Test: Remote control limits must be consistent
+@patch.dict(os.environ, {"ACCESS_TOKEN": "test_token", "THINGSBOARD_SERVER": "test_server"})
+@patch("builtins.open", new_callable=mock_open, read_data='{"poll_period": 10, "device_name": "Test", "mount_path": "/", "remote": {"min_poll_period": 60, "max_poll_period": 30}}')
+def test_invalid_remote_poll_period_limits(mock_file):
+    with pytest.raises(ValueError):
+        ConfigLoader(DummyLogger())
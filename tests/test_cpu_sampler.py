@@ -0,0 +1,64 @@
+import pytest
+from monitoring_service.cpu_sampler import CpuSampler
+
+
+def write_stat(path, lines):
+    path.write_text("\n".join(lines) + "\nintr 12345\n")
+
+
+@pytest.fixture
+def stat_file(tmp_path):
+    return tmp_path / "stat"
+
+
+def test_first_sample_reports_average_since_boot(stat_file):
+    # user nice system idle iowait irq softirq steal
+    write_stat(stat_file, ["cpu  10 0 10 70 10 0 0 0",
+                           "cpu0 10 0 10 70 10 0 0 0"])
+    stats = CpuSampler(str(stat_file)).sample()
+    assert stats["cpu_usage"] == 20.0
+    assert stats["cpu_iowait"] == 10.0
+    assert stats["cpu0_usage"] == 20.0
+
+
+def test_sample_uses_delta_since_previous_call(stat_file):
+    sampler = CpuSampler(str(stat_file))
+    write_stat(stat_file, ["cpu  100 0 0 100 0 0 0 0",
+                           "cpu0 50 0 0 50 0 0 0 0",
+                           "cpu1 50 0 0 50 0 0 0 0"])
+    sampler.sample()
+    write_stat(stat_file, ["cpu  150 0 0 140 0 0 5 5",
+                           "cpu0 100 0 0 50 0 0 0 0",
+                           "cpu1 50 0 0 90 0 0 5 5"])
+    stats = sampler.sample()
+    assert stats["cpu_usage"] == 60.0
+    assert stats["cpu_softirq"] == 5.0
+    assert stats["cpu_steal"] == 5.0
+    assert stats["cpu0_usage"] == 100.0
+    assert stats["cpu1_usage"] == 20.0
+
+
+def test_sample_repeats_last_reading_when_no_ticks_elapsed(stat_file):
+    sampler = CpuSampler(str(stat_file))
+    write_stat(stat_file, ["cpu  30 0 0 70 0 0 0 0"])
+    first = sampler.sample()
+    assert sampler.sample() == first
+
+
+def test_sample_handles_counter_wraparound(stat_file):
+    sampler = CpuSampler(str(stat_file))
+    near_top = 2 ** 64 - 10
+    write_stat(stat_file, [f"cpu  {near_top} 0 0 100 0 0 0 0"])
+    sampler.sample()
+    write_stat(stat_file, ["cpu  10 0 0 120 0 0 0 0"])
+    stats = sampler.sample()
+    assert stats["cpu_usage"] == 50.0
+
+
+def test_sample_handles_counter_reset(stat_file):
+    sampler = CpuSampler(str(stat_file))
+    write_stat(stat_file, ["cpu  500 0 0 500 0 0 0 0"])
+    sampler.sample()
+    write_stat(stat_file, ["cpu  25 0 0 75 0 0 0 0"])
+    stats = sampler.sample()
+    assert stats["cpu_usage"] == 25.0
@@ -0,0 +1,53 @@
+from monitoring_service.deadband import DeadbandFilter
+
+
+def test_first_values_always_pass(clock):
+    deadband = DeadbandFilter(clock=clock)
+    assert deadband.filter({"cpu_usage": 10.0, "ip": "10.0.0.1"}) == {"cpu_usage": 10.0, "ip": "10.0.0.1"}
+
+
+def test_absolute_threshold_is_measured_from_last_published_value(clock):
+    deadband = DeadbandFilter(metrics={"cpu_usage": {"absolute": 2.0}}, clock=clock)
+    deadband.filter({"cpu_usage": 10.0})
+
+    assert deadband.filter({"cpu_usage": 11.5}) == {}
+    assert deadband.filter({"cpu_usage": 12.5}) == {"cpu_usage": 12.5}
+    assert deadband.filter({"cpu_usage": 11.0}) == {}
+    assert deadband.suppressed == 2
+
+
+def test_relative_threshold(clock):
+    deadband = DeadbandFilter(metrics={"disk_usage": {"relative": 0.1}}, clock=clock)
+    deadband.filter({"disk_usage": 50.0})
+
+    assert deadband.filter({"disk_usage": 54.0}) == {}
+    assert deadband.filter({"disk_usage": 56.0}) == {"disk_usage": 56.0}
+
+
+def test_default_drops_only_unchanged_values(clock):
+    deadband = DeadbandFilter(clock=clock)
+    deadband.filter({"ram_usage": 40.0, "gpu_temp": None})
+
+    assert deadband.filter({"ram_usage": 40.0, "gpu_temp": None}) == {}
+    assert deadband.filter({"ram_usage": 40.1, "gpu_temp": 45.0}) == {"ram_usage": 40.1, "gpu_temp": 45.0}
+
+
+def test_heartbeat_forces_resend_per_key(clock):
+    deadband = DeadbandFilter(metrics={"disk_usage": {"absolute": 5, "heartbeat": 50}},
+                              default={"absolute": 5}, heartbeat=30, clock=clock)
+    deadband.filter({"cpu_usage": 10.0, "disk_usage": 50.0})
+
+    clock.now = 31
+    assert deadband.filter({"cpu_usage": 10.0, "disk_usage": 50.0}) == {"cpu_usage": 10.0}
+    clock.now = 55
+    assert deadband.filter({"cpu_usage": 10.0, "disk_usage": 50.0}) == {"disk_usage": 50.0}
+
+
+def test_forgotten_reference_lets_next_value_pass(clock):
+    deadband = DeadbandFilter(metrics={"cpu_usage": {"absolute": 2.0}}, clock=clock)
+    deadband.filter({"cpu_usage": 10.0, "ram_usage": 40.0})
+    deadband.filter({"ram_usage": 41.0})
+
+    # The sample carrying cpu_usage 10.0 was dropped before it was published
+    deadband.forget({"cpu_usage": 10.0, "ram_usage": 40.0})
+    assert deadband.filter({"cpu_usage": 11.0, "ram_usage": 41.0}) == {"cpu_usage": 11.0}
@@ -0,0 +1,62 @@
+import json
+import math
+import zlib
+
+import pytest
+from monitoring_service.encoding import PayloadEncoder
+
+
+def test_transform_aliases_keys_and_rounds_floats():
+    encoder = PayloadEncoder(aliases={"cpu_usage": "cpu"}, precision={"cpu_usage": 1, "ram_usage": 0})
+    values = encoder.transform({"cpu_usage": 12.3456, "ram_usage": 40.6, "gpu_temp": 48.123, "state": "ok"})
+
+    assert values == {"cpu": 12.3, "ram_usage": 41, "gpu_temp": 48.123, "state": "ok"}
+    assert isinstance(values["ram_usage"], int)
+
+
+def test_default_precision_leaves_non_floats_alone():
+    encoder = PayloadEncoder(default_precision=2)
+    assert encoder.transform({"a": 1.23456, "b": 7, "c": None, "d": True}) == {"a": 1.23, "b": 7, "c": None, "d": True}
+
+
+def test_non_finite_floats_pass_through_whole_number_rounding():
+    encoder = PayloadEncoder(default_precision=0)
+    values = encoder.transform({"a": float("nan"), "b": float("inf"), "c": float("-inf"), "d": 2.6})
+
+    assert math.isnan(values["a"])
+    assert values["b"] == float("inf")
+    assert values["c"] == float("-inf")
+    assert values["d"] == 3
+
+
+@pytest.mark.parametrize("backend", ["json", "auto"])
+def test_dumps_is_compact_json(backend):
+    encoder = PayloadEncoder(backend=backend)
+    data = encoder.dumps({"ts": 1, "values": {"cpu": 1.5}})
+    assert data == b'{"ts":1,"values":{"cpu":1.5}}'
+
+
+def test_encode_compresses_only_above_threshold():
+    encoder = PayloadEncoder(backend="json", compress_threshold=100)
+    small = {"cpu": 1.5}
+    large = {f"key{i}": i for i in range(50)}
+
+    assert encoder.encode(small) == encoder.dumps(small)
+    assert zlib.decompress(encoder.encode(large)) == encoder.dumps(large)
+    assert encoder.decode(encoder.encode(small)) == small
+    assert encoder.decode(encoder.encode(large)) == large
+
+
+def test_decode_accepts_plain_text():
+    assert PayloadEncoder().decode(json.dumps({"cpu": 1})) == {"cpu": 1}
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError):
+        PayloadEncoder(backend="msgpack")
+
+
+def test_encoded_size_measures_transformed_sample():
+    encoder = PayloadEncoder(aliases={"cpu_usage": "c"}, precision={"cpu_usage": 0})
+    sample = {"ts": 1, "values": {"cpu_usage": 12.345}}
+    assert encoder.encoded_size(sample) == len(b'{"ts":1,"values":{"c":12}}')
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import pytest
+from unittest.mock import patch
+from monitoring_service.gpu_temp import GpuTempReader
+
+
+class DummyLogger:
+    def __init__(self):
+        self.messages = []
+
+    def warning(self, msg, *args):
+        self.messages.append(msg % args)
+        print(f"LOG WARNING: {msg % args}")
+
+
+def make_zone(sys_root, index, zone_type, millidegrees):
+    zone = sys_root / "class" / "thermal" / f"thermal_zone{index}"
+    zone.mkdir(parents=True)
+    (zone / "type").write_text(f"{zone_type}\n")
+    (zone / "temp").write_text(f"{millidegrees}\n")
+    return zone
+
+
+@pytest.fixture
+def logger():
+    return DummyLogger()
+
+
+def test_reads_sysfs_sensor_through_open_descriptor(tmp_path, logger):
+    make_zone(tmp_path, 0, "cpu-thermal", 48300)
+    reader = GpuTempReader(logger, sys_root=str(tmp_path), vcgencmd_path=str(tmp_path / "missing"))
+    assert reader.read() == 48.3
+    reader.close()
+
+
+def test_rereads_value_after_sensor_update(tmp_path, logger):
+    zone = make_zone(tmp_path, 0, "cpu-thermal", 48000)
+    reader = GpuTempReader(logger, sys_root=str(tmp_path), vcgencmd_path=str(tmp_path / "missing"))
+    (zone / "temp").write_text("51500\n")
+    assert reader.read() == 51.5
+    reader.close()
+
+
+def test_prefers_gpu_sensor_over_cpu_sensor(tmp_path, logger):
+    make_zone(tmp_path, 0, "cpu-thermal", 40000)
+    make_zone(tmp_path, 1, "gpu-thermal", 60000)
+    hwmon = tmp_path / "class" / "hwmon" / "hwmon0"
+    hwmon.mkdir(parents=True)
+    (hwmon / "name").write_text("gpu\n")
+    (hwmon / "temp1_input").write_text("62000\n")
+    reader = GpuTempReader(logger, sys_root=str(tmp_path), vcgencmd_path=str(tmp_path / "missing"))
+    assert reader.read() == 62.0
+    reader.close()
+
+
+def test_falls_back_to_vcgencmd_without_sysfs_sensor(tmp_path, logger):
+    vcgencmd = tmp_path / "vcgencmd"
+    vcgencmd.write_text("#!/bin/sh\n")
+    os.chmod(vcgencmd, 0o755)
+    reader = GpuTempReader(logger, sys_root=str(tmp_path), vcgencmd_path=str(vcgencmd))
+    with patch("monitoring_service.gpu_temp.subprocess.run") as mock_run:
+        mock_run.return_value.returncode = 0
+        mock_run.return_value.stdout = "temp=55.0'C\n"
+        assert reader.read() == 55.0
+
+
+def test_missing_source_is_detected_once(tmp_path, logger):
+    reader = GpuTempReader(logger, sys_root=str(tmp_path), vcgencmd_path=str(tmp_path / "missing"))
+    with patch("monitoring_service.gpu_temp.subprocess.run") as mock_run:
+        assert reader.read() is None
+        assert reader.read() is None
+        mock_run.assert_not_called()
+    assert len(logger.messages) == 1
+
+
+def test_vcgencmd_timeout_reads_as_none(tmp_path, logger):
+    vcgencmd = tmp_path / "vcgencmd"
+    vcgencmd.write_text("#!/bin/sh\n")
+    os.chmod(vcgencmd, 0o755)
+    reader = GpuTempReader(logger, sys_root=str(tmp_path), vcgencmd_path=str(vcgencmd), vcgencmd_timeout=0.5)
+    with patch("monitoring_service.gpu_temp.subprocess.run",
+               side_effect=subprocess.TimeoutExpired(str(vcgencmd), 0.5)) as mock_run:
+        assert reader.read() is None
+    assert mock_run.call_args[1]["timeout"] == 0.5
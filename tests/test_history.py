@@ -0,0 +1,112 @@
+import math
+
+import pytest
+
+from monitoring_service.history import TelemetryHistory, main
+
+BASE = 1_700_000_000_000
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "history.bin")
+
+
+def fill(history, seconds, start=BASE):
+    for second in range(seconds):
+        history.append(start + second * 1000, {"cpu": float(second), "temp": 40.0 + second % 10})
+
+
+def test_query_returns_samples_in_range(path):
+    history = TelemetryHistory(path, ("cpu", "temp"), capacity=100)
+    fill(history, 10)
+
+    ts, columns = history.query(BASE + 2000, BASE + 5000)
+    assert ts == [BASE + 2000, BASE + 3000, BASE + 4000]
+    assert columns == {"cpu": [2.0, 3.0, 4.0], "temp": [42.0, 43.0, 44.0]}
+    history.close()
+
+
+def test_full_ring_keeps_newest_records(path):
+    history = TelemetryHistory(path, ("cpu", "temp"), capacity=5)
+    fill(history, 12)
+
+    ts, columns = history.query(metrics=["cpu"])
+    assert len(history) == 5
+    assert columns["cpu"] == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert history.span() == (BASE + 7000, BASE + 11000)
+    history.close()
+
+
+def test_missing_values_are_nan_and_skipped_by_aggregates(path):
+    history = TelemetryHistory(path, ("cpu", "temp"), capacity=10)
+    history.append(BASE, {"cpu": 1.0, "temp": None})
+    history.append(BASE + 1000, {"cpu": 3.0})
+
+    _, columns = history.query()
+    assert math.isnan(columns["temp"][0])
+    _, columns = history.query(step=60_000)
+    assert columns["cpu"] == [2.0]
+    assert math.isnan(columns["temp"][0])
+    history.close()
+
+
+def test_downsampling_from_rollups_matches_raw_records(path):
+    history = TelemetryHistory(path, ("cpu", "temp"), capacity=4000, rollup_period=60)
+    fill(history, 3600)
+    start, end = BASE + 1500, BASE + 3_000_500
+
+    for aggregate in ("mean", "min", "max"):
+        ts, columns = history.query(start, end, step=600_000, aggregate=aggregate)
+        raw_ts, raw = history.query(start, end, step=600_000 + 1, aggregate=aggregate)
+        expected = {}
+        for second in range(2, 3001):
+            expected.setdefault((BASE + second * 1000) // 600_000 * 600_000, []).append(float(second))
+        assert ts == sorted(expected)
+        reduce = {"mean": lambda values: sum(values) / len(values), "min": min, "max": max}[aggregate]
+        assert columns["cpu"] == pytest.approx([reduce(values) for values in expected.values()])
+        assert len(raw_ts) == len(ts)
+    history.close()
+
+
+def test_reopening_continues_and_rebuilds_current_rollup(path):
+    history = TelemetryHistory(path, ("cpu", "temp"), capacity=1000)
+    fill(history, 90)
+    history.close()
+
+    history = TelemetryHistory(path, ("cpu", "temp"), capacity=1000)
+    fill(history, 90, start=BASE + 90_000)
+    _, columns = history.query(step=60_000, metrics=["cpu"], aggregate="max")
+    assert len(history) == 180
+    assert columns["cpu"] == [39.0, 89.0, 69.0, 89.0]
+    history.close()
+
+
+def test_layout_change_starts_new_file(path, tmp_path):
+    TelemetryHistory(path, ("cpu",), capacity=10).close()
+    history = TelemetryHistory(path, ("cpu", "temp"), capacity=10)
+    assert len(history) == 0
+    assert (tmp_path / "history.bin.old").exists()
+    history.close()
+
+
+def test_older_samples_are_skipped(path):
+    history = TelemetryHistory(path, ("cpu",), capacity=10)
+    history.append(BASE + 1000, {"cpu": 1.0})
+    history.append(BASE, {"cpu": 0.0})
+    assert len(history) == 1
+    assert history.skipped == 1
+    history.close()
+
+
+def test_cli_exports_csv(path, tmp_path):
+    history = TelemetryHistory(path, ("cpu", "temp"), capacity=1000)
+    fill(history, 120)
+    history.close()
+
+    output = tmp_path / "out.csv"
+    main([path, "--start", str(BASE / 1000), "--step", "1m", "--metrics", "cpu", "--format", "csv",
+          "--output", str(output)])
+    assert output.read_text().splitlines() == ["ts,cpu", f"{BASE // 60_000 * 60_000},{sum(range(40)) / 40}",
+                                               f"{BASE // 60_000 * 60_000 + 60_000},{sum(range(40, 100)) / 60}",
+                                               f"{BASE // 60_000 * 60_000 + 120_000},{sum(range(100, 120)) / 20}"]
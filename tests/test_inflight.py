@@ -0,0 +1,69 @@
+from monitoring_service.inflight import InflightWindow
+
+
+def sample(ts):
+    return {"ts": ts, "values": {"cpu": ts}}
+
+
+def test_publish_is_delivered_once_every_message_is_acknowledged(clock):
+    window = InflightWindow(max_inflight=2, clock=clock)
+    window.track([1, 2], [sample(1)])
+    assert len(window) == 1
+
+    clock.now = 0.2
+    assert window.ack(1) == []
+    assert len(window) == 1
+    window.ack(2)
+
+    stats = window.stats()
+    assert stats["inflight"] == 0
+    assert stats["delivered"] == 1
+    assert stats["delivery_p50_ms"] == 250.0
+
+
+def test_window_is_full_at_max_inflight():
+    window = InflightWindow(max_inflight=2)
+    window.track([1], [sample(1)])
+    assert not window.full
+    window.track([2], [sample(2)])
+    assert window.full
+    window.ack(1)
+    assert not window.full
+
+
+def test_zero_max_inflight_is_unbounded():
+    window = InflightWindow(max_inflight=0)
+    for mid in range(100):
+        window.track([mid], [sample(mid)])
+    assert not window.full
+
+
+def test_rejected_and_expired_publishes_return_their_samples(clock):
+    window = InflightWindow(ack_timeout=30.0, clock=clock)
+    window.track([1], [sample(1)])
+    window.track([2], [sample(2), sample(3)])
+    assert window.ack(1, success=False) == [sample(1)]
+
+    clock.now = 29.0
+    assert window.expire() == []
+    clock.now = 30.0
+    assert window.expire() == [sample(2), sample(3)]
+    assert window.stats()["delivery_failures"] == 2
+    assert len(window) == 0
+
+
+def test_acknowledgement_before_tracking_is_not_lost():
+    window = InflightWindow()
+    window.ack(7)
+    window.track([7], [sample(1)])
+    assert len(window) == 0
+    assert window.delivered == 1
+
+
+def test_fail_all_returns_every_sample_in_flight():
+    window = InflightWindow()
+    window.track([1], [sample(1)])
+    window.track([2, 3], [sample(2)])
+    assert window.fail_all() == [sample(1), sample(2)]
+    assert window.ack(3) == []
+    assert window.delivered == 0
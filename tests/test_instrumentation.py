@@ -0,0 +1,71 @@
+import urllib.request
+
+import pytest
+from monitoring_service.instrumentation import Instrumentation, LatencyHistogram, MetricsServer
+
+
+def test_histogram_counts_into_fixed_buckets():
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    for seconds in (0.005, 0.01, 0.05, 0.5, 3.0):
+        histogram.observe(seconds)
+
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.total == pytest.approx(3.565)
+
+
+def test_quantile_reports_bucket_upper_bound():
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    for _ in range(90):
+        histogram.observe(0.005)
+    for _ in range(10):
+        histogram.observe(0.5)
+
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(0.95) == 1.0
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_telemetry_reports_window_and_resets_it():
+    instrumentation = Instrumentation(buckets=(0.01, 0.1))
+    instrumentation.observe("publish", 0.005)
+    instrumentation.observe("publish", 0.2)
+    instrumentation.increment("publish_failures")
+    instrumentation.set_gauge("outbox_depth", 12)
+
+    data = instrumentation.telemetry()
+    assert data["agent_publish_count"] == 2
+    assert data["agent_publish_p50_ms"] == 10
+    assert data["agent_publish_p95_ms"] == 200
+    assert data["agent_publish_max_ms"] == 200
+    assert data["agent_publish_failures"] == 1
+    assert data["agent_outbox_depth"] == 12
+
+    assert instrumentation.telemetry()["agent_publish_count"] == 0
+
+
+def test_time_records_duration_even_when_block_raises():
+    ticks = iter([1.0, 1.25])
+    instrumentation = Instrumentation(clock=lambda: next(ticks))
+    with pytest.raises(OSError):
+        with instrumentation.time("collector_disk_usage"):
+            raise OSError("stale mount")
+
+    assert instrumentation.histograms["collector_disk_usage"].total == 0.25
+
+
+def test_metrics_server_serves_prometheus_text():
+    instrumentation = Instrumentation(buckets=(0.01,))
+    instrumentation.observe("cycle", 0.002)
+    instrumentation.increment("publish_failures", 3)
+    server = MetricsServer(instrumentation, port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+    finally:
+        server.close()
+
+    assert 'monitoring_agent_latency_seconds_bucket{operation="cycle",le="0.01"} 1' in body
+    assert 'monitoring_agent_latency_seconds_count{operation="cycle"} 1' in body
+    assert "monitoring_agent_publish_failures_total 3" in body
@@ -0,0 +1,79 @@
+import pytest
+from monitoring_service.outbox import TelemetryOutbox
+
+
+class DummyLogger:
+    def __init__(self):
+        self.messages = []
+
+    def info(self, msg, *args):
+        self.messages.append(msg % args)
+
+    def warning(self, msg, *args):
+        self.messages.append(msg % args)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "data" / "outbox.db")
+
+
+def test_put_and_peek_returns_oldest_first(db_path):
+    outbox = TelemetryOutbox(db_path, DummyLogger())
+    outbox.put(1000, {"cpu_usage": 10.0})
+    outbox.put(2000, {"cpu_usage": 20.0})
+
+    batch = outbox.peek(10)
+    assert [payload for _, payload in batch] == [
+        {"ts": 1000, "values": {"cpu_usage": 10.0}},
+        {"ts": 2000, "values": {"cpu_usage": 20.0}},
+    ]
+    assert len(outbox) == 2
+
+
+def test_ack_removes_delivered_samples(db_path):
+    outbox = TelemetryOutbox(db_path, DummyLogger())
+    for ts in range(5):
+        outbox.put(ts, {"cpu_usage": float(ts)})
+
+    batch = outbox.peek(3)
+    outbox.ack(batch[-1][0])
+
+    assert len(outbox) == 2
+    assert [payload["ts"] for _, payload in outbox.peek(10)] == [3, 4]
+
+
+def test_samples_survive_reopen(db_path):
+    outbox = TelemetryOutbox(db_path, DummyLogger())
+    outbox.put(1000, {"cpu_usage": 10.0})
+    outbox.close()
+
+    logger = DummyLogger()
+    reopened = TelemetryOutbox(db_path, logger)
+    assert len(reopened) == 1
+    assert reopened.peek(1)[0][1]["ts"] == 1000
+    assert "Recovered 1" in logger.messages[0]
+
+
+def test_size_cap_evicts_oldest_samples(db_path):
+    outbox = TelemetryOutbox(db_path, DummyLogger(), max_bytes=200)
+    for ts in range(20):
+        outbox.put(ts, {"cpu_usage": float(ts)})
+
+    remaining = [payload["ts"] for _, payload in outbox.peek(100)]
+    assert len(remaining) == len(outbox)
+    assert remaining[-1] == 19
+    assert remaining[0] > 0
+    assert outbox._bytes <= 200
+
+
+def test_encoder_compresses_large_payloads_transparently(db_path):
+    from monitoring_service.encoding import PayloadEncoder
+    outbox = TelemetryOutbox(db_path, DummyLogger(), encoder=PayloadEncoder(compress_threshold=64))
+    small = {"cpu": 1.5}
+    large = {f"key{i}": float(i) for i in range(40)}
+    outbox.put(1, small)
+    outbox.put(2, large)
+
+    assert [payload["values"] for _, payload in outbox.peek(10)] == [small, large]
+    assert outbox._bytes < len(str(large))
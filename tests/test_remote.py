@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock
+from monitoring_service.TBClientWrapper import STATE_CONNECTED, STATE_CONNECTING
+from monitoring_service.remote import SET_POLL_PERIOD, SNAPSHOT, START_BURST, Command, RemoteControl
+
+
+class DummyLogger:
+    def info(self, msg, *args):
+        pass
+
+    def warning(self, msg, *args):
+        print(f"LOG WARNING: {msg % args}")
+
+    def error(self, msg, *args):
+        print(f"LOG ERROR: {msg % args}")
+
+
+def make_remote(**options):
+    tb_client = MagicMock()
+    tb_client.state_callbacks = []
+    remote = RemoteControl(tb_client, DummyLogger(), **options)
+    remote.register()
+    rpc = tb_client.set_rpc_handler.call_args[0][0]
+    attributes = tb_client.subscribe_to_shared_attributes.call_args[0][0]
+    return remote, tb_client, rpc, attributes
+
+
+def test_rpc_requests_are_queued_as_commands():
+    remote, tb_client, rpc, _ = make_remote()
+    rpc("1", {"method": "setPollPeriod", "params": {"poll_period": 30}})
+    rpc("2", {"method": "getTelemetry", "params": {}})
+    rpc("3", {"method": "startBurst", "params": {"rate_hz": 10, "duration": 60}})
+
+    assert remote.pending() == [
+        Command(SET_POLL_PERIOD, {"poll_period": 30.0}, "1"),
+        Command(SNAPSHOT, {}, "2"),
+        Command(START_BURST, {"rate_hz": 10.0, "duration": 60.0, "metrics": None, "max_samples": 601}, "3"),
+    ]
+    assert remote.pending() == []
+    tb_client.send_rpc_reply.assert_not_called()
+
+
+def test_invalid_rpc_requests_are_answered_with_an_error():
+    remote, tb_client, rpc, _ = make_remote(max_burst_rate=20)
+    rpc("1", {"method": "reboot"})
+    rpc("2", {"method": "startBurst", "params": {"rate_hz": 100, "duration": 60}})
+    rpc("3", {"method": "setPollPeriod", "params": "soon"})
+
+    assert remote.pending() == []
+    replies = {call[0][0]: call[0][1] for call in tb_client.send_rpc_reply.call_args_list}
+    assert replies["1"] == {"error": "Unknown method reboot"}
+    assert "rate_hz" in replies["2"]["error"]
+    assert "error" in replies["3"]
+
+
+def test_poll_period_attribute_is_applied_and_requested_on_connect():
+    remote, tb_client, _, attributes = make_remote()
+    attributes({"pollPeriod": 15}, None)
+    # The response to a request nests the values under "shared"
+    attributes({"shared": {"pollPeriod": 45}}, None)
+    attributes({"unrelated": 1}, None)
+
+    assert remote.pending() == [Command(SET_POLL_PERIOD, {"poll_period": 15.0}, None),
+                                Command(SET_POLL_PERIOD, {"poll_period": 45.0}, None)]
+
+    state_callback = tb_client.state_callbacks[0]
+    state_callback(STATE_CONNECTING, STATE_CONNECTED)
+    assert tb_client.request_shared_attributes.call_args[0][0] == ["pollPeriod"]
+
+
+def test_burst_samples_are_capped():
+    remote, _, rpc, _ = make_remote(max_burst_samples=100)
+    rpc("1", {"method": "startBurst", "params": {"rate_hz": 10, "duration": 60, "metrics": ["cpu_usage"]}})
+    command = remote.pending()[0]
+    assert command.params["max_samples"] == 100
+    assert command.params["metrics"] == ["cpu_usage"]
+
+
+def test_rpc_poll_period_survives_reconnects_until_the_attribute_changes():
+    remote, tb_client, rpc, attributes = make_remote()
+    rpc("1", {"method": "setPollPeriod", "params": {"poll_period": 30}})
+    remote.pending()
+
+    tb_client.state_callbacks[0](STATE_CONNECTING, STATE_CONNECTED)
+    requested = tb_client.request_shared_attributes.call_args[0][1]
+    requested({"shared": {"pollPeriod": 45}}, None)
+    assert remote.pending() == []
+
+    attributes({"pollPeriod": 15}, None)
+    assert remote.pending() == [Command(SET_POLL_PERIOD, {"poll_period": 15.0}, None)]
+    requested({"shared": {"pollPeriod": 15}}, None)
+    assert remote.pending() == [Command(SET_POLL_PERIOD, {"poll_period": 15.0}, None)]
@@ -0,0 +1,73 @@
+import json
+from monitoring_service.sample_buffer import SampleBuffer
+
+
+def test_drain_batches_returns_timestamped_samples_in_order():
+    buffer = SampleBuffer()
+    buffer.append(1000, {"cpu_usage": 10.0, "ram_usage": 50.0})
+    buffer.append(2000, {"cpu_usage": 11.0, "ram_usage": 51.0})
+
+    assert buffer.drain_batches() == [[
+        {"ts": 1000, "values": {"cpu_usage": 10.0, "ram_usage": 50.0}},
+        {"ts": 2000, "values": {"cpu_usage": 11.0, "ram_usage": 51.0}},
+    ]]
+    assert len(buffer) == 0
+
+
+def test_batches_are_bounded_by_sample_count():
+    buffer = SampleBuffer(max_batch_samples=3)
+    for ts in range(7):
+        buffer.append(ts, {"cpu_usage": 1.0})
+
+    assert [len(batch) for batch in buffer.drain_batches()] == [3, 3, 1]
+
+
+def test_batches_are_bounded_by_encoded_size():
+    buffer = SampleBuffer(max_batch_bytes=200)
+    for ts in range(20):
+        buffer.append(ts, {"cpu_usage": 12.5, "ram_usage": 40.0})
+
+    batches = buffer.drain_batches()
+    assert sum(len(batch) for batch in batches) == 20
+    for batch in batches:
+        assert len(json.dumps(batch, separators=(",", ":"))) <= 200
+
+
+def test_full_buffer_overwrites_oldest_and_counts_drops():
+    buffer = SampleBuffer(capacity=2)
+    overwritten = [buffer.append(ts, {"cpu_usage": float(ts)}) for ts in range(5)]
+
+    assert overwritten[:3] == [None, None, {"ts": 0, "values": {"cpu_usage": 0.0}}]
+    assert buffer.dropped == 3
+    assert [sample["ts"] for sample in buffer.drain_batches()[0]] == [3, 4]
+
+
+def test_requeued_samples_are_drained_first_and_oldest_dropped_when_full():
+    buffer = SampleBuffer(capacity=3)
+    buffer.append(10, {"cpu_usage": 10.0})
+    dropped = buffer.requeue([{"ts": ts, "values": {"cpu_usage": float(ts)}} for ts in range(3)])
+
+    assert dropped == [{"ts": 0, "values": {"cpu_usage": 0.0}}]
+    assert buffer.dropped == 1
+    assert [sample["ts"] for sample in buffer.drain_batches()[0]] == [1, 2, 10]
+
+
+def test_consecutive_samples_share_key_tuple():
+    buffer = SampleBuffer()
+    buffer.append(1, {"a": 1, "b": 2})
+    buffer.append(2, {"a": 3, "b": 4})
+
+    first, second = buffer._samples
+    assert first[1] is second[1]
+
+
+def test_batch_size_is_measured_after_encoding():
+    from monitoring_service.encoding import PayloadEncoder
+    encoder = PayloadEncoder(aliases={"cpu_usage": "c", "ram_usage": "r"}, precision={"cpu_usage": 0, "ram_usage": 0})
+    plain = SampleBuffer(max_batch_bytes=400)
+    encoded = SampleBuffer(max_batch_bytes=400, encoder=encoder)
+    for buffer in (plain, encoded):
+        for ts in range(20):
+            buffer.append(ts, {"cpu_usage": 12.5678, "ram_usage": 40.1234})
+
+    assert len(encoded.drain_batches()) < len(plain.drain_batches())
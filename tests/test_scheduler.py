@@ -0,0 +1,78 @@
+import pytest
+from monitoring_service.scheduler import Scheduler
+
+
+@pytest.fixture
+def clock(clock):
+    # Start away from zero so deadlines are clearly absolute
+    clock.now = 100.0
+    return clock
+
+
+def test_jobs_run_on_their_own_intervals(clock):
+    scheduler = Scheduler(clock=clock, sleep=clock.sleep)
+    scheduler.add("fast", 5)
+    scheduler.add("slow", 15)
+
+    ticks = [scheduler.wait() for _ in range(4)]
+    assert ticks == [["fast", "slow"], ["fast"], ["fast"], ["fast", "slow"]]
+    assert clock.now == 115.0
+
+
+def test_work_time_does_not_shift_deadlines(clock):
+    scheduler = Scheduler(clock=clock, sleep=clock.sleep)
+    scheduler.add("job", 10)
+
+    scheduler.wait()
+    clock.now += 3.7  # time spent doing the work
+    scheduler.wait()
+    assert clock.now == 110.0
+    assert clock.sleeps == [pytest.approx(6.3)]
+
+
+def test_missed_ticks_are_skipped_and_counted(clock):
+    scheduler = Scheduler(clock=clock, sleep=clock.sleep)
+    scheduler.add("job", 10)
+
+    scheduler.wait()
+    clock.now += 25  # cycle overran past the 110 and 120 deadlines
+    assert scheduler.wait() == ["job"]
+    assert scheduler.overruns == 1
+    scheduler.wait()
+    assert clock.now == 130.0
+
+
+def test_jobs_due_within_coalesce_window_run_together(clock):
+    scheduler = Scheduler(clock=clock, sleep=clock.sleep, coalesce_window=0.1)
+    scheduler.add("a", 1.0)
+    scheduler.wait()
+    scheduler.add("b", 1.0)
+    scheduler._jobs["b"][1] = 101.05
+
+    assert scheduler.wait() == ["a", "b"]
+
+
+def test_set_interval_brings_next_run_forward(clock):
+    scheduler = Scheduler(clock=clock, sleep=clock.sleep)
+    scheduler.add("job", 60)
+    scheduler.wait()
+    scheduler.set_interval("job", 5)
+
+    scheduler.wait()
+    assert clock.now == 105.0
+    assert scheduler.interval("job") == 5
+
+
+def test_job_added_later_starts_after_delay_and_can_be_removed(clock):
+    scheduler = Scheduler(clock=clock, sleep=clock.sleep)
+    scheduler.add("slow", 60)
+    scheduler.wait()
+    clock.now += 7
+    scheduler.add("burst", 0.5, delay=0)
+
+    assert scheduler.wait() == ["burst"]
+    assert scheduler.wait() == ["burst"]
+    assert clock.now == 107.5
+    scheduler.remove("burst")
+    assert scheduler.wait() == ["slow"]
+    assert scheduler.overruns == 0
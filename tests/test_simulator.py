@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from monitoring_service.simulator import FakeBroker, FakeBrokerClient, main
+
+
+def test_client_reconnects_with_doubling_delay_after_broker_restart():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        broker = FakeBroker(loop)
+        client = FakeBrokerClient(broker=broker, min_delay=0.01, max_delay=0.04, auto_reconnect=True)
+        client.connect()
+        await broker.restart(0.05)
+        assert not client.is_connected()
+        await asyncio.sleep(0.1)
+        return broker, client
+
+    broker, client = asyncio.run(scenario())
+    assert client.is_connected()
+    # retries at 0.01, 0.03 and 0.07s after the drop; only the last succeeds
+    assert broker.refused >= 1
+    assert broker.recovered_at is not None
+
+
+def test_publish_requires_connection():
+    async def scenario():
+        broker = FakeBroker(asyncio.get_running_loop())
+        with pytest.raises(ConnectionError):
+            broker.publish(FakeBrokerClient(broker=broker), {"cpu_usage": 1.0})
+
+    asyncio.run(scenario())
+
+
+def test_simulation_reports_throughput_latency_and_reconnect_storm(capsys):
+    report = main(["--agents", "20", "--duration", "0.6", "--poll-period", "0.1", "--jitter", "0.05",
+                   "--restart-at", "0.2", "--downtime", "0.1", "--min-delay", "0.05", "--max-delay", "0.2"])
+
+    assert report["agents"] == 20
+    assert report["messages"] > 20
+    assert report["latency_ms"]["p50"] is not None
+    assert report["restart"]["clients_dropped"] == 20
+    assert report["restart"]["connect_attempts"] >= 20
+    assert report["restart"]["recovered_after_s"] is not None
+
+
+def test_paho_style_reconnect_storms_in_lockstep():
+    args = ["--agents", "20", "--duration", "0.6", "--poll-period", "0.1", "--jitter", "0.05",
+            "--restart-at", "0.2", "--downtime", "0.1", "--min-delay", "0.05", "--max-delay", "0.2"]
+    report = main(args + ["--reconnect", "paho"])
+
+    assert report["restart"]["refused"] == 20
+    assert report["restart"]["recovered_after_s"] is not None
@@ -0,0 +1,227 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from monitoring_service.encoding import PayloadEncoder
+from monitoring_service.inflight import PublishWindowFull
+from monitoring_service.instrumentation import Instrumentation
+from monitoring_service.sinks import (DROP_NEWEST, DROP_OLDEST, FileSink, MqttSink, Sink, SinkBusy, SinkFanout,
+                                      SinkWorker, ThingsBoardSink)
+
+
+class DummyLogger:
+    def debug(self, msg, *args):
+        pass
+
+    def warning(self, msg, *args):
+        print(f"LOG WARNING: {msg % args}")
+
+    def error(self, msg, *args):
+        print(f"LOG ERROR: {msg % args}")
+
+
+class FakeBroker:
+    """In-process broker stand-in recording what paho-like clients publish."""
+    def __init__(self):
+        self.up = True
+        self.messages = []
+
+    def client(self):
+        return FakeClient(self)
+
+
+class FakeClient:
+    def __init__(self, broker):
+        self.broker = broker
+        self.credentials = None
+
+    def username_pw_set(self, username, password):
+        self.credentials = (username, password)
+
+    def connect_async(self, host, port, keepalive):
+        self.address = (host, port)
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def is_connected(self):
+        return self.broker.up
+
+    def publish(self, topic, payload, qos=0):
+        self.broker.messages.append((topic, json.loads(payload), qos))
+        return SimpleNamespace(rc=0)
+
+
+class BlockedSink(Sink):
+    """Sink whose writes block until released."""
+    def __init__(self, name="blocked"):
+        super().__init__(name)
+        self.release = threading.Event()
+        self.written = []
+
+    def write(self, batch):
+        self.release.wait(5)
+        self.written.append(batch)
+        return True
+
+
+def batch(*timestamps):
+    return [{"ts": ts, "values": {"cpu_usage": 10.0, "cpu_temp": None}} for ts in timestamps]
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_file_sink_writes_ndjson_and_rotates(tmp_path):
+    path = tmp_path / "out" / "telemetry.ndjson"
+    sink = FileSink(str(path), max_bytes=100, encoder=PayloadEncoder(aliases={"cpu_usage": "cpu"}))
+    sink.write(batch(1))
+    assert [json.loads(line) for line in path.read_text().splitlines()] == \
+        [{"ts": 1, "values": {"cpu": 10.0, "cpu_temp": None}}]
+
+    sink.write(batch(2, 3))
+    sink.close()
+    assert len((tmp_path / "out" / "telemetry.ndjson.1").read_text().splitlines()) == 3
+    assert path.read_text() == ""
+
+
+def test_file_sink_writes_long_csv(tmp_path):
+    path = tmp_path / "telemetry.csv"
+    sink = FileSink(str(path), file_format="csv")
+    sink.write(batch(1))
+    sink.close()
+    sink = FileSink(str(path), file_format="csv")
+    sink.write(batch(2))
+    sink.close()
+    assert path.read_text().splitlines() == ["ts,key,value", "1,cpu_usage,10.0", "1,cpu_temp,",
+                                             "2,cpu_usage,10.0", "2,cpu_temp,"]
+
+
+def test_mqtt_sink_holds_batches_while_broker_is_down():
+    broker = FakeBroker()
+    broker.up = False
+    sink = MqttSink("broker", "devices/pi/telemetry", qos=1, username="pi", password="secret",
+                    client_factory=broker.client)
+    worker = SinkWorker(sink, DummyLogger(), retry_delay=0.01)
+    worker.start()
+    worker.put(batch(1))
+    worker.put(batch(2))
+    time.sleep(0.05)
+    assert broker.messages == []
+
+    broker.up = True
+    wait_until(lambda: len(broker.messages) == 2)
+    worker.close()
+    assert sink.client.credentials == ("pi", "secret")
+    assert [message[1][0]["ts"] for message in broker.messages] == [1, 2]
+    assert broker.messages[0][0] == "devices/pi/telemetry" and broker.messages[0][2] == 1
+    assert worker.stats()["samples"] == 2
+
+
+def test_slow_sink_does_not_delay_publishing_or_other_sinks():
+    broker = FakeBroker()
+    blocked = BlockedSink()
+    fanout = SinkFanout([SinkWorker(blocked, DummyLogger(), queue_size=2, drop_policy=DROP_OLDEST),
+                         SinkWorker(MqttSink("broker", "t", client_factory=broker.client), DummyLogger())],
+                        DummyLogger())
+    fanout.start()
+
+    start = time.monotonic()
+    fanout.publish([batch(0)])
+    wait_until(lambda: len(fanout.workers[0]) == 0)
+    for ts in range(1, 5):
+        fanout.publish([batch(ts)])
+    assert time.monotonic() - start < 0.5
+    wait_until(lambda: len(broker.messages) == 5)
+
+    blocked.release.set()
+    fanout.close()
+    # The first batch was already being written; of the rest only the newest two fit the queue
+    assert [written[0]["ts"] for written in blocked.written] == [0, 3, 4]
+    stats = fanout.stats()
+    assert stats["sink_blocked_dropped"] == 2
+    assert stats["sink_blocked_samples"] == 3
+    assert stats["sink_mqtt_samples"] == 5
+    assert stats["sink_mqtt_dropped"] == 0
+
+
+def test_drop_newest_keeps_the_queued_batches():
+    worker = SinkWorker(BlockedSink(), DummyLogger(), queue_size=2, drop_policy=DROP_NEWEST)
+    assert worker.put(batch(1)) and worker.put(batch(2))
+    assert not worker.put(batch(3))
+    assert [queued[0]["ts"] for queued in worker._queue] == [1, 2]
+    assert worker.stats()["dropped"] == 1
+
+
+def test_thingsboard_sink_retries_while_publish_window_is_full():
+    tb_client = MagicMock()
+    tb_client.outbox = None
+    tb_client.send_telemetry_batch.side_effect = [PublishWindowFull("full"), True, False]
+    instrumentation = Instrumentation()
+    worker = SinkWorker(ThingsBoardSink(tb_client), DummyLogger(), retry_delay=0.01,
+                        instrumentation=instrumentation)
+    worker.start()
+    worker.put(batch(1))
+    worker.put(batch(2))
+    wait_until(lambda: worker.batches + worker.failures == 2)
+    worker.close()
+    assert tb_client.send_telemetry_batch.call_count == 3
+    tb_client.drain_outbox.assert_not_called()
+    telemetry = instrumentation.telemetry()
+    assert telemetry["agent_publish_count"] == 2
+    assert telemetry["agent_publish_deferred"] == 1
+    assert telemetry["agent_publish_failures"] == 1
+
+
+def test_busy_sink_waits_the_full_retry_delay_while_batches_arrive():
+    attempts = []
+
+    class BusySink(Sink):
+        def write(self, batch):
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise SinkBusy("busy")
+            return True
+
+    worker = SinkWorker(BusySink("busy"), DummyLogger(), retry_delay=0.2)
+    worker.start()
+    worker.put(batch(1))
+    wait_until(lambda: attempts)
+    # Each put() notifies the worker, which must not cut the retry delay short
+    for ts in range(2, 6):
+        worker.put(batch(ts))
+        time.sleep(0.02)
+    wait_until(lambda: len(attempts) == 6)
+    worker.close()
+    assert attempts[1] - attempts[0] >= 0.19
+
+
+def test_fanout_rejects_duplicate_sink_names():
+    with pytest.raises(ValueError):
+        SinkFanout([SinkWorker(BlockedSink("a"), DummyLogger()), SinkWorker(BlockedSink("a"), DummyLogger())],
+                   DummyLogger())
+
+
+def test_thingsboard_sink_counts_batches_stored_in_the_outbox_as_delivered():
+    tb_client = MagicMock()
+    tb_client.send_telemetry_batch.return_value = False
+    assert ThingsBoardSink(tb_client).write(batch(1)) is True
+
+    tb_client.outbox = None
+    tb_client.is_connected.return_value = False
+    with pytest.raises(SinkBusy):
+        ThingsBoardSink(tb_client).write(batch(2))
+    assert tb_client.send_telemetry_batch.call_count == 1
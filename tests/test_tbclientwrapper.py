@@ -1,16 +1,25 @@
+import threading
+import time
+
 import pytest
 from unittest.mock import patch, MagicMock
-from monitoring_service.TBClientWrapper import TBClientWrapper
+from monitoring_service.TBClientWrapper import (
+    TBClientWrapper, STATE_CONNECTED, STATE_DISCONNECTED, STATE_CONNECTING
+)
+from monitoring_service.inflight import PublishWindowFull
 
 
 @pytest.fixture
 def dummy_logger():
     class DummyLogger:
-        def error(self, msg):
-            print(f"LOG ERROR: {msg}")
+        def info(self, msg, *args):
+            print(f"LOG INFO: {msg % args}")
+
+        def error(self, msg, *args):
+            print(f"LOG ERROR: {msg % args}")
 
-        def warning(self, msg):
-            print(f"LOG WARNING: {msg}")
+        def warning(self, msg, *args):
+            print(f"LOG WARNING: {msg % args}")
 
     return DummyLogger()
 
@@ -22,17 +31,126 @@ def client(dummy_logger):
 
 def test_connect_success(dummy_logger):
     mock_client = MagicMock()
+    mock_client.is_connected.return_value = False
+    mock_client.connect.side_effect = lambda: setattr(mock_client.is_connected, "return_value", True)
     client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client)
-    client.connect()
+    assert client.connect(background=False)
     mock_client.connect.assert_called_once()
+    assert client.state == STATE_CONNECTED
 
 
-@patch("monitoring_service.TBClientWrapper.TBDeviceMqttClient")
-def test_connect_failure_logs_and_raises(mock_mqtt, client):
-    mock_mqtt.return_value.connect.side_effect = Exception("connection failed")
+def make_flaky_client(dummy_logger, clock, **kwargs):
+    mock_client = MagicMock()
+    mock_client.is_connected.return_value = False
+    mock_client.connect.side_effect = ConnectionRefusedError("connection failed")
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             backoff_base=1.0, backoff_max=4.0, clock=clock, **kwargs)
+    return client, mock_client
+
+
+def test_connect_failure_does_not_raise_and_backs_off_exponentially(dummy_logger, clock):
+    client, mock_client = make_flaky_client(dummy_logger, clock)
+
+    with patch("monitoring_service.TBClientWrapper.random.uniform", side_effect=lambda low, high: high):
+        assert client.connect(background=False) is False
+        delays = []
+        for _ in range(4):
+            delay = client.poll_connection()
+            delays.append(delay)
+            clock.now += delay
+            client.poll_connection()
+
+    assert client.state == STATE_DISCONNECTED
+    assert delays == [1.0, 2.0, 4.0, 4.0]
+    assert mock_client.connect.call_count == 5
+    assert client.connection_stats()["connect_attempts"] == 5
+
+
+def test_backoff_delay_uses_full_jitter(dummy_logger, clock):
+    client, _ = make_flaky_client(dummy_logger, clock)
+    delays = [client.backoff_delay(3) for _ in range(200)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert min(delays) < 1.0 < 3.0 < max(delays)
+
+
+def test_lost_connection_is_torn_down_retried_and_reported(dummy_logger, clock):
+    transitions = []
+    client, mock_client = make_flaky_client(dummy_logger, clock, state_callbacks=[lambda *t: transitions.append(t)])
+    mock_client.connect.side_effect = lambda: setattr(mock_client.is_connected, "return_value", True)
+    client.connect(background=False)
+
+    clock.now = 10.0
+    mock_client.is_connected.return_value = False
+    delay = client.poll_connection()
+    mock_client.disconnect.assert_called_once()
+    assert client.state == STATE_DISCONNECTED
+    assert 0 <= delay <= 1.0
+
+    clock.now += delay
+    client.poll_connection()
+
+    assert client.state == STATE_CONNECTED
+    assert transitions == [(STATE_DISCONNECTED, STATE_CONNECTING), (STATE_CONNECTING, STATE_CONNECTED),
+                           (STATE_CONNECTED, STATE_DISCONNECTED), (STATE_DISCONNECTED, STATE_CONNECTING),
+                           (STATE_CONNECTING, STATE_CONNECTED)]
+    stats = client.connection_stats()
+    assert stats["connected"] == 1
+    assert stats["outages"] == 1
+    assert client.last_outage_seconds == pytest.approx(delay)
+
+
+def test_connect_waits_for_broker_acceptance_then_times_out(dummy_logger, clock):
+    client, mock_client = make_flaky_client(dummy_logger, clock, connect_timeout=5.0)
+    mock_client.connect.side_effect = None
+
+    client.connect(background=False)
+    assert client.state == STATE_CONNECTING
+    clock.now = 6.0
+    client.poll_connection()
+
+    assert client.state == STATE_DISCONNECTED
+    mock_client.disconnect.assert_called_once()
 
-    with pytest.raises(Exception):
-        client.connect()
+
+def test_background_connect_does_not_block(dummy_logger):
+    release = threading.Event()
+    mock_client = MagicMock()
+    mock_client.is_connected.side_effect = lambda: release.is_set()
+    mock_client.connect.side_effect = lambda: release.wait(5)
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             check_interval=0.01)
+
+    assert client.connect() is False
+    assert client.send_telemetry({"cpu_usage": 1.0}) is False
+    release.set()
+    for _ in range(200):
+        if client.state == STATE_CONNECTED:
+            break
+        time.sleep(0.01)
+    client.disconnect()
+    assert client.connection_stats()["connect_attempts"] == 1
+
+
+def test_blocking_connect_does_not_block_connection_stats(dummy_logger):
+    attempting = threading.Event()
+    release = threading.Event()
+    mock_client = MagicMock()
+    mock_client.is_connected.return_value = False
+    mock_client.connect.side_effect = lambda: attempting.set() or release.wait(5)
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client)
+
+    poller = threading.Thread(target=client.poll_connection)
+    poller.start()
+    assert attempting.wait(5)
+    started = time.monotonic()
+    stats = client.connection_stats()
+    elapsed = time.monotonic() - started
+    release.set()
+    poller.join()
+
+    assert elapsed < 1.0
+    assert stats["connect_attempts"] == 1
+    assert stats["connected"] == 0
 
 
 @patch("monitoring_service.TBClientWrapper.TBDeviceMqttClient")
@@ -60,3 +178,179 @@ def test_disconnect_success(dummy_logger):
     client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client)
     client.disconnect()
     mock_client.disconnect.assert_called_once()
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.samples = []
+
+    def __len__(self):
+        return len(self.samples)
+
+    def put(self, ts, values):
+        self.samples.append((len(self.samples), {"ts": ts, "values": values}))
+
+    def peek(self, limit):
+        return self.samples[:limit]
+
+    def ack(self, last_id):
+        self.samples = [s for s in self.samples if s[0] > last_id]
+
+
+def test_send_telemetry_stores_in_outbox_when_disconnected(dummy_logger):
+    mock_client = MagicMock()
+    mock_client.is_connected.return_value = False
+    outbox = FakeOutbox()
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             outbox=outbox)
+    client.send_telemetry({"cpu": 50}, ts=1234)
+    mock_client.send_telemetry.assert_not_called()
+    assert outbox.peek(1)[0][1] == {"ts": 1234, "values": {"cpu": 50}}
+
+
+def test_send_telemetry_stores_in_outbox_on_failure(dummy_logger):
+    mock_client = MagicMock()
+    mock_client.send_telemetry.side_effect = Exception("broker gone")
+    outbox = FakeOutbox()
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             outbox=outbox)
+    client.send_telemetry({"cpu": 50}, ts=1234)
+    assert len(outbox) == 1
+
+
+def test_drain_outbox_replays_batch_and_acks(dummy_logger):
+    mock_client = MagicMock()
+    outbox = FakeOutbox()
+    for ts in range(3):
+        outbox.put(ts, {"cpu": ts})
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             outbox=outbox, replay_batch_size=2, replay_interval=0)
+
+    assert client.drain_outbox() == 2
+    mock_client.send_telemetry.assert_called_once_with([{"ts": 0, "values": {"cpu": 0}},
+                                                        {"ts": 1, "values": {"cpu": 1}}])
+    assert len(outbox) == 1
+
+
+def test_drain_outbox_is_rate_limited(dummy_logger, clock):
+    mock_client = MagicMock()
+    outbox = FakeOutbox()
+    for ts in range(4):
+        outbox.put(ts, {"cpu": ts})
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             outbox=outbox, replay_batch_size=2, replay_interval=60, clock=clock)
+
+    assert client.drain_outbox() == 2
+    clock.now = 59.0
+    assert client.drain_outbox() == 0
+    assert len(outbox) == 2
+    clock.now = 60.0
+    assert client.drain_outbox() == 2
+
+
+def test_drain_outbox_skips_while_another_replay_runs(dummy_logger):
+    mock_client = MagicMock()
+    outbox = FakeOutbox()
+    outbox.put(0, {"cpu": 0})
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             outbox=outbox, replay_interval=0)
+
+    with client._replay_lock:
+        assert client.drain_outbox() == 0
+    assert client.drain_outbox() == 1
+
+
+def test_send_telemetry_batch_sends_single_message(dummy_logger):
+    mock_client = MagicMock()
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client)
+    samples = [{"ts": 1, "values": {"cpu": 1}}, {"ts": 2, "values": {"cpu": 2}}]
+    client.send_telemetry_batch(samples)
+    mock_client.send_telemetry.assert_called_once_with(samples)
+
+
+def test_send_telemetry_batch_stores_all_samples_when_disconnected(dummy_logger):
+    mock_client = MagicMock()
+    mock_client.is_connected.return_value = False
+    outbox = FakeOutbox()
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             outbox=outbox)
+    client.send_telemetry_batch([{"ts": 1, "values": {"cpu": 1}}, {"ts": 2, "values": {"cpu": 2}}])
+    assert len(outbox) == 2
+
+
+def test_encoder_transforms_sent_and_stored_telemetry(dummy_logger):
+    from monitoring_service.encoding import PayloadEncoder
+    mock_client = MagicMock()
+    mock_client.is_connected.return_value = True
+    outbox = FakeOutbox()
+    encoder = PayloadEncoder(aliases={"cpu_usage": "cpu"}, precision={"cpu_usage": 1})
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             outbox=outbox, encoder=encoder)
+
+    client.send_telemetry_batch([{"ts": 1, "values": {"cpu_usage": 12.345}}])
+    mock_client.send_telemetry.assert_called_once_with([{"ts": 1, "values": {"cpu": 12.3}}])
+
+    mock_client.is_connected.return_value = False
+    client.send_telemetry({"cpu_usage": 50.55}, ts=2)
+    assert outbox.samples[-1][1] == {"ts": 2, "values": {"cpu": 50.5}}
+
+
+def make_acked_client(dummy_logger, **kwargs):
+    from tb_device_mqtt import TBPublishInfo
+    mock_client = MagicMock()
+    mids = iter(range(1, 1000))
+    mock_client.send_telemetry.side_effect = lambda payload: TBPublishInfo([MagicMock(mid=next(mids), rc=0)])
+    client = TBClientWrapper("server", "token", dummy_logger, client_class=lambda *args, **kwargs: mock_client,
+                             **kwargs)
+    return client, mock_client
+
+
+def test_full_window_raises_without_sending_or_storing(dummy_logger):
+    outbox = FakeOutbox()
+    client, mock_client = make_acked_client(dummy_logger, outbox=outbox, max_inflight=2)
+    samples = [{"ts": 1, "values": {"cpu": 1}}]
+    assert client.send_telemetry_batch(samples)
+    assert client.send_telemetry_batch(samples)
+    with pytest.raises(PublishWindowFull):
+        client.send_telemetry_batch(samples)
+    assert mock_client.send_telemetry.call_count == 2
+    assert len(outbox) == 0
+
+    client.window.ack(1)
+    assert client.send_telemetry_batch(samples)
+    assert client.publish_stats()["delivered"] == 1
+
+
+def test_unacknowledged_publishes_are_stored_after_timeout(dummy_logger, clock):
+    outbox = FakeOutbox()
+    client, _ = make_acked_client(dummy_logger, outbox=outbox, ack_timeout=30.0, clock=clock)
+    client.send_telemetry_batch([{"ts": 1, "values": {"cpu": 1}}])
+
+    clock.now = 31.0
+    client.send_telemetry_batch([{"ts": 2, "values": {"cpu": 2}}])
+    assert outbox.peek(5)[0][1] == {"ts": 1, "values": {"cpu": 1}}
+    assert client.publish_stats()["delivery_failures"] == 1
+
+
+def test_publishes_in_flight_are_stored_when_connection_is_lost(dummy_logger):
+    outbox = FakeOutbox()
+    client, mock_client = make_acked_client(dummy_logger, outbox=outbox)
+    client.connect(background=False)
+    client.send_telemetry_batch([{"ts": 1, "values": {"cpu": 1}}])
+
+    mock_client.is_connected.return_value = False
+    client.poll_connection()
+    assert len(outbox) == 1
+    assert client.publish_stats()["inflight"] == 0
+
+
+def test_broker_acknowledgements_reach_the_window(dummy_logger):
+    from paho.mqtt.packettypes import PacketTypes
+    from paho.mqtt.reasoncodes import ReasonCode
+    client = TBClientWrapper("localhost", "token", dummy_logger)
+    client.window.track([5], [{"ts": 1, "values": {"cpu": 1}}])
+
+    paho_client = client.client._client
+    paho_client.on_publish(paho_client, None, 5, ReasonCode(PacketTypes.PUBACK, "Success"), None)
+    assert client.publish_stats()["delivered"] == 1
+
@@ -1,66 +1,83 @@
 import pytest
-from unittest.mock import patch,mock_open
+from monitoring_service.collectors.base import Collector, CollectorError
+from monitoring_service.collectors.registry import CollectorRegistry
 from monitoring_service.telemetry import TelemetryCollector
 
 
+class DummyLogger:
+    def warning(self, msg):
+        print(f"LOG WARNING: {msg}")
+
+
+class FixedCollector(Collector):
+    keys = ("fixed",)
+
+    def __init__(self, name, logger, value=1.0, **options):
+        super().__init__(name, logger, **options)
+        self.value = value
+
+    def collect(self):
+        return {"fixed": self.value}
+
+
+class BrokenCollector(Collector):
+    keys = ("broken_a", "broken_b")
+    default_interval = 600
+
+    def collect(self):
+        raise OSError("sensor unplugged")
+
+
+@pytest.fixture
+def registry():
+    return CollectorRegistry(DummyLogger(), builtins={
+        "fixed": f"{__name__}:FixedCollector",
+        "broken": f"{__name__}:BrokenCollector",
+    })
+
+
 @pytest.fixture
-def collector():
-    return TelemetryCollector(mount_path="/")
-
-
-def test_get_cpu_usage_returns_float(collector):
-    with patch("monitoring_service.telemetry.psutil.cpu_percent", return_value=25.5):
-        result = collector._get_cpu_usage()
-        assert isinstance(result, float)
-        assert result == 25.5
-
-
-def test_get_cpu_temp_returns_float(collector):
-    with patch("builtins.open", new_callable=mock_open, read_data="50000"):
-        result = collector._get_cpu_temp()
-        assert isinstance(result, float)
-        assert result == 50.0
-
-
-def test_get_gpu_temp_returns_float(collector):
-    with patch("monitoring_service.telemetry.subprocess.run") as mock_run:
-        mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "temp=55.0'C\n"
-        result = collector._get_gpu_temp()
-        assert isinstance(result, float)
-        assert result == 55.0
-
-
-def test_get_mem_usage_returns_float(collector):
-    with patch("monitoring_service.telemetry.psutil.virtual_memory") as mock_vm:
-        mock_vm.return_value.percent = 60.0
-        result = collector._get_mem_usage()
-        assert isinstance(result, float)
-        assert result == 60.0
-
-
-def test_get_disk_usage_returns_float(collector):
-    with patch("monitoring_service.telemetry.psutil.disk_usage") as mock_du:
-        mock_du.return_value.percent = 75.0
-        result = collector._get_disk_usage()
-        assert isinstance(result, float)
-        assert result == 75.0
-
-
-def test_get_telemetry_returns_data_and_no_errors(collector):
-    # Patch all methods inside TelemetryCollector
-    with patch.object(collector, "_get_cpu_usage", return_value=10.0), \
-         patch.object(collector, "_get_cpu_temp", return_value=40.0), \
-         patch.object(collector, "_get_gpu_temp", return_value=45.0), \
-         patch.object(collector, "_get_mem_usage", return_value=55.0), \
-         patch.object(collector, "_get_disk_usage", return_value=65.0):
-
-        telemetry, errors = collector.get_telemetry()
-        assert telemetry == {
-            "cpu_usage": 10.0,
-            "cpu_temp": 40.0,
-            "gpu_temp": 45.0,
-            "ram_usage": 55.0,
-            "disk_usage": 65.0,
-        }
-        assert errors == []
+def collector(registry):
+    return TelemetryCollector(collectors={"fixed": {"value": 40.0}, "broken": {}}, registry=registry)
+
+
+def test_get_telemetry_returns_data_and_no_errors(registry):
+    collector = TelemetryCollector(collectors=["fixed"], registry=registry)
+    telemetry, errors = collector.get_telemetry()
+    assert telemetry == {"fixed": 1.0}
+    assert errors == []
+
+
+def test_collect_metric_reports_structured_error_and_none(collector):
+    values, error = collector.collect_metric("broken")
+    assert values == {"broken_a": None, "broken_b": None}
+    assert isinstance(error, CollectorError)
+    assert error.collector == "broken"
+    assert error.message == "OSError: sensor unplugged"
+    assert str(error) == "broken: OSError: sensor unplugged"
+
+
+def test_get_telemetry_collects_selected_metrics(collector):
+    telemetry, errors = collector.get_telemetry(["fixed"])
+    assert telemetry == {"fixed": 40.0}
+    assert errors == []
+
+
+def test_metrics_and_default_intervals_come_from_collectors(collector):
+    assert collector.metrics == ("fixed", "broken")
+    assert collector.default_intervals() == {"broken": 600}
+
+
+def test_unknown_collector_raises(registry):
+    with pytest.raises(KeyError):
+        TelemetryCollector(collectors=["missing"], registry=registry)
+
+
+def test_collector_calls_are_timed_when_instrumented(registry):
+    from monitoring_service.instrumentation import Instrumentation
+    instrumentation = Instrumentation()
+    collector = TelemetryCollector(collectors=["fixed", "broken"], registry=registry, instrumentation=instrumentation)
+    collector.get_telemetry()
+
+    assert instrumentation.histograms["collector_fixed"].count == 1
+    assert instrumentation.histograms["collector_broken"].count == 1